@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Compares the small-batch latency of scikit-learn tree models with their
+`zoo.models` compiled version.
+
+Each model is fitted on synthetic data with the hyper-parameters its
+project's train_model uses (or loaded from `--model`), checked to give the
+same predictions once compiled, and both are timed at batch sizes 1 to 100:
+scikit-learn dispatches every tree through joblib, the compiled predictor
+moves every (row, tree) pair down one level per NumPy step.
+
+    python benchmarks/compiled_forest.py
+    python benchmarks/compiled_forest.py --model bias-loan/models/bias-loan.joblib
+"""
+import os
+import sys
+import time
+import warnings
+
+import click
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from zoo.models import compile_model  # noqa: E402
+
+BATCH_SIZES = [1, 2, 5, 10, 20, 50, 100]
+
+
+def project_models():
+    """(name, estimator, features, outputs) as the projects train them."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.tree import DecisionTreeRegressor
+
+    return [
+        (
+            "credit-card-approval",
+            RandomForestClassifier(max_depth=6, n_jobs=-1, random_state=0),
+            7,
+            1,
+        ),
+        (
+            "bias-loan",
+            RandomForestClassifier(
+                n_estimators=20, max_depth=4, n_jobs=-1, random_state=0
+            ),
+            9,
+            1,
+        ),
+        (
+            "minimal-numerical",
+            RandomForestClassifier(
+                max_depth=8,
+                max_leaf_nodes=64,
+                max_samples=0.5,
+                n_estimators=10,
+                n_jobs=-1,
+                random_state=0,
+            ),
+            4,
+            1,
+        ),
+        ("pima-indians-diabetes-multi", DecisionTreeRegressor(random_state=0), 7, 2),
+    ]
+
+
+def latency(function, X, seconds: float) -> float:
+    """Median latency of `function(X)` in ms."""
+    for _ in range(3):
+        function(X)
+    times = []
+    deadline = time.perf_counter() + seconds
+    while len(times) < 5 or time.perf_counter() < deadline:
+        start = time.perf_counter_ns()
+        function(X)
+        times.append(time.perf_counter_ns() - start)
+    return float(np.median(times)) / 1e6
+
+
+def score(model):
+    if getattr(model, "classes_", None) is None:
+        return model.predict
+    return model.predict_proba
+
+
+@click.command()
+@click.option("--model", type=click.Path(exists=True), help="joblib tree model.")
+@click.option("--rows", type=int, default=10_000, help="Rows of the synthetic data.")
+@click.option("--seconds", type=float, default=0.5, help="Time per measurement.")
+def main(model, rows, seconds):
+    rng = np.random.default_rng(0)
+    if model is None:
+        models = []
+        for name, estimator, features, outputs in project_models():
+            X = rng.normal(size=(rows, features)).astype(np.float32)
+            y = X @ rng.normal(size=(features, outputs)) + rng.normal(size=(rows, 1))
+            if outputs == 1:
+                y = y[:, 0] > 0
+            models.append((name, estimator.fit(X, y)))
+    else:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            models = [(os.path.basename(model), joblib.load(model))]
+
+    print(
+        f"{'model':<30}{'batch':>6}{'sklearn (ms)':>14}{'compiled (ms)':>15}"
+        f"{'speed-up':>10}"
+    )
+    for name, estimator in models:
+        compiled = compile_model(estimator)
+        X = rng.normal(size=(rows, compiled.n_features)).astype(np.float32)
+        difference = np.abs(score(compiled)(X) - score(estimator)(X)).max()
+        if difference > 1e-9:
+            raise click.ClickException(f"{name}: predictions differ by {difference}")
+        for batch in BATCH_SIZES:
+            before = latency(score(estimator), X[:batch], seconds)
+            after = latency(score(compiled), X[:batch], seconds)
+            print(
+                f"{name:<30}{batch:>6}{before:>14.3f}{after:>15.3f}"
+                f"{before / after:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
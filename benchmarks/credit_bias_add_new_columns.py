@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Times credit-bias `add_new_columns` + the derived-column casts of
+`reformat_columns` against the previous per-row lambda implementation.
+
+    python benchmarks/credit_bias_add_new_columns.py --rows 1000000
+"""
+import os
+import sys
+import timeit
+
+import click
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "credit-bias"))
+
+from src.data.make_dataset import add_new_columns  # noqa: E402
+
+
+def add_new_columns_apply(df_: pd.DataFrame) -> pd.DataFrame:
+    df_["Defaulted"] = df_["DefaultDate"].apply(lambda x: 0 if pd.isnull(x) else 1)
+    df_["PaidLoan"] = df_["Defaulted"].replace({0: 1, 1: 0})
+    df_["LoanStatus"] = df_["PaidLoan"].apply(
+        lambda x: "Paid back" if x == 1 else "Defaulted"
+    )
+    df_["AgeGroup"] = df_["Age"].apply(lambda x: "Under 40" if x < 40 else "Over 40")
+    df_["Defaulted"] = df_["Defaulted"].astype(bool)
+    df_["PaidLoan"] = df_["PaidLoan"].astype(bool)
+
+    return df_
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    default_date = pd.Series(pd.Timestamp("2019-01-01"), index=range(rows))
+    default_date[rng.random(rows) < 0.7] = pd.NaT
+    age = rng.integers(18, 75, rows).astype(float)
+    age[rng.random(rows) < 0.01] = np.nan
+    return pd.DataFrame({"DefaultDate": default_date, "Age": age})
+
+
+@click.command()
+@click.option("--rows", type=int, default=1_000_000)
+@click.option("--repeat", type=int, default=3)
+def main(rows, repeat):
+    df = make_frame(rows)
+    for name, function in [
+        ("apply", add_new_columns_apply),
+        ("vectorized", add_new_columns),
+    ]:
+        best = min(
+            timeit.repeat(lambda: function(df.copy()), number=1, repeat=repeat)
+        )
+        print(f"{name:>10}: {best / rows * 1e6:.3f} s per million rows")
+
+
+if __name__ == "__main__":
+    main()
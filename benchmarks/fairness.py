@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Times `zoo.fairness` on large synthetic scored data sets with the
+protected attributes of the fairness projects, against a pandas groupby
+per threshold.
+
+    python benchmarks/fairness.py --rows 10000000 -t 21
+"""
+import os
+import sys
+import time
+
+import click
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from zoo.fairness import PROTECTED, fairness_report  # noqa: E402
+
+# groups of the credit-bias categorical columns
+CATEGORIES = {
+    "Gender": ["Male", "Female", "Unknown"],
+    "AgeGroup": ["Under 40", "Over 40"],
+}
+
+
+def scored_data(project: str, rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Random labels and scores with every protected column of `project`;
+    the scores lean towards the favorable label.
+    """
+    data = {}
+    for spec in PROTECTED[project].values():
+        columns = spec["columns"]
+        if len(columns) > 1:
+            hot = rng.integers(0, len(columns), rows)
+            for code, column in enumerate(columns):
+                data[column] = (hot == code).astype(np.uint8)
+        elif isinstance(spec["reference"], str):
+            groups = CATEGORIES[columns[0]]
+            codes = rng.integers(0, len(groups), rows).astype(np.int8)
+            data[columns[0]] = pd.Categorical.from_codes(codes, groups)
+        else:
+            data[columns[0]] = rng.integers(0, 2, rows).astype(np.int8)
+    label = rng.integers(0, 2, rows).astype(np.int8)
+    data["label"] = label
+    data["score"] = np.clip(rng.random(rows) * 0.8 + label * 0.2, 0, 1)
+    return pd.DataFrame(data)
+
+
+def groupby_metrics(frame, spec, thresholds):
+    """Selection and positive rates per group, one groupby per threshold."""
+    columns = spec["columns"]
+    if len(columns) > 1:
+        group = frame[columns].idxmax(axis=1)
+    else:
+        group = frame[columns[0]]
+    results = []
+    for threshold in thresholds:
+        predicted = frame["score"] >= threshold
+        table = predicted.groupby([group, frame["label"]], observed=True).agg(
+            ["sum", "count"]
+        )
+        results.append(table)
+    return results
+
+
+@click.command()
+@click.option("--rows", type=int, default=10_000_000)
+@click.option("-t", "--thresholds", type=int, default=21, help="Evenly spaced.")
+@click.option("--baseline/--no-baseline", default=True, help="Time pandas too.")
+def main(rows, thresholds, baseline):
+    rng = np.random.default_rng(0)
+    grid = np.linspace(0, 1, thresholds)
+    click.echo(
+        f"{'project':<14}{'rows':>12}{'thresholds':>12}{'zoo (s)':>10}"
+        f"{'groupby (s)':>13}"
+    )
+    for project, attributes in PROTECTED.items():
+        frame = scored_data(project, rows, rng)
+        start = time.perf_counter()
+        fairness_report(frame, "label", "score", attributes, grid)
+        seconds = time.perf_counter() - start
+        reference = float("nan")
+        if baseline:
+            start = time.perf_counter()
+            for spec in attributes.values():
+                groupby_metrics(frame, spec, grid)
+            reference = time.perf_counter() - start
+        click.echo(
+            f"{project:<14}{rows:>12}{thresholds:>12}{seconds:>10.2f}"
+            f"{reference:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Compares N scoring processes that each `joblib.load` a scikit-learn forest
+with N processes that memory-map the compiled artifact of `zoo.models`.
+
+Every worker loads the model, scores one batch and waits for the others, so
+that the proportional set size (PSS, shared pages divided between the
+processes that map them) is measured while all of them are alive.
+
+    python benchmarks/forest_mmap.py --workers 16
+    python benchmarks/forest_mmap.py --model bias-loan/models/model.joblib
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import click
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from zoo.models import compile_model, load_model, save_model  # noqa: E402
+
+
+def memory() -> dict:
+    """Returns the RSS and PSS of the current process in MiB (Linux only)."""
+    usage = {}
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss"):
+                usage[name.lower()] = int(value.split()[0]) / 1024
+    return usage
+
+
+def worker(path, mmap, batch, start, done, results):
+    t0 = time.perf_counter()
+    model = load_model(path) if mmap else joblib.load(path)
+    loaded = time.perf_counter() - t0
+    model.predict(batch)
+    scored = time.perf_counter() - t0
+    start.wait()
+    results.put({"load": loaded, "first_batch": scored, **memory()})
+    done.wait()
+
+
+def run(path, mmap, workers, batch):
+    context = multiprocessing.get_context("spawn")
+    start, done = context.Barrier(workers + 1), context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(path, mmap, batch, start, done, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    start.wait()
+    stats = [results.get() for _ in processes]
+    done.wait()
+    for process in processes:
+        process.join()
+    return {name: [s[name] for s in stats] for name in stats[0]}
+
+
+@click.command()
+@click.option("--model", type=click.Path(exists=True), help="joblib forest.")
+@click.option("--workers", type=int, default=8)
+@click.option("--trees", type=int, default=100, help="Trees of the synthetic forest.")
+@click.option("--rows", type=int, default=100_000, help="Rows of the synthetic data.")
+def main(model, workers, trees, rows):
+    from sklearn.ensemble import RandomForestClassifier
+
+    with tempfile.TemporaryDirectory() as directory:
+        rng = np.random.default_rng(0)
+        if model is None:
+            X = rng.normal(size=(rows, 10)).astype(np.float32)
+            y = X[:, 0] + rng.normal(size=rows) > 0
+            estimator = RandomForestClassifier(trees, n_jobs=-1, random_state=0)
+            estimator.fit(X, y)
+            model = os.path.join(directory, "model.joblib")
+            joblib.dump(estimator, model)
+        else:
+            estimator = joblib.load(model)
+        compiled = compile_model(estimator)
+        compiled_model = save_model(
+            compiled, os.path.join(directory, "model.trees.joblib")
+        )
+        batch = rng.normal(size=(1000, compiled.n_features)).astype(np.float32)
+
+        print(
+            f"{compiled.ensemble.n_trees} trees, "
+            f"{len(compiled.ensemble.feature)} nodes | "
+            f"joblib {os.path.getsize(model) / 2**20:.1f} MiB, "
+            f"compiled {os.path.getsize(compiled_model) / 2**20:.1f} MiB | "
+            f"{workers} workers"
+        )
+        for name, path, mmap in [
+            ("joblib.load", model, False),
+            ("mmap", compiled_model, True),
+        ]:
+            stats = run(path, mmap, workers, batch)
+            print(
+                f"{name:>12}: load {np.mean(stats['load']) * 1000:7.1f} ms, "
+                f"load + 1000 rows {np.mean(stats['first_batch']) * 1000:7.1f} ms, "
+                f"RSS/worker {np.mean(stats['rss']):6.1f} MiB, "
+                f"total PSS {np.sum(stats['pss']):7.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Measures the start-up cost of the train_model CLIs with
+`python -X importtime` and fails when it regresses.
+
+Every project's `src/models/train_model.py` is imported in a fresh
+interpreter (from the project directory, as the Makefiles run it). The
+script exits with status 1 when an exporter backend listed in `--forbid` is
+imported at start-up, or when importing a project's train_model (with all
+of its imports) takes longer than `--budget` ms in total.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py -p credit-bias --top 10
+"""
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+import click
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODULE = "src.models.train_model"
+EXPORTERS = ["nyoka", "sklearn2pmml"]
+
+
+def import_times(project: str, module: str = MODULE) -> List[Tuple[str, int]]:
+    """Returns the (indented module, cumulative microseconds) pairs reported
+    by `-X importtime`, children before their parent.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.join(ROOT, project),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise click.ClickException(f"{project}: {result.stderr.splitlines()[-1]}")
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # keep the indentation, two spaces per nesting level
+        times.append((name[1:], int(cumulative)))
+    return times
+
+
+def packages(times: List[Tuple[str, int]]) -> Dict[str, int]:
+    """Cumulative time of every top-level package, counted where another
+    package first imports it (so numpy's time is also part of pandas').
+    """
+    totals: Dict[str, int] = {}
+    parents: List[str] = []
+    for name, cumulative in reversed(times):
+        depth = (len(name) - len(name.lstrip())) // 2
+        package = name.strip().split(".")[0]
+        parents = parents[:depth]
+        if not parents or parents[-1] != package:
+            totals[package] = totals.get(package, 0) + cumulative
+        parents.append(package)
+    return totals
+
+
+@click.command()
+@click.option(
+    "-p",
+    "--project",
+    "projects",
+    multiple=True,
+    help="Project directory, can be repeated (defaults to every project).",
+)
+@click.option("--repeat", type=int, default=3, help="Best of N interpreters.")
+@click.option("--top", type=int, default=5, help="Heaviest packages to list.")
+@click.option(
+    "--forbid",
+    multiple=True,
+    default=EXPORTERS,
+    help="Package that must not be imported at start-up, can be repeated.",
+)
+@click.option("--budget", type=float, help="Maximum total import time of a project in ms.")
+def main(projects, repeat, top, forbid, budget):
+    projects = projects or sorted(
+        name
+        for name in os.listdir(ROOT)
+        if os.path.exists(os.path.join(ROOT, name, *MODULE.split(".")) + ".py")
+    )
+    failures = []
+    for project in projects:
+        runs = [import_times(project) for _ in range(repeat)]
+        totals = [dict(run)[MODULE] for run in runs]
+        times = runs[totals.index(min(totals))]
+        total = min(totals) / 1000
+        heaviest = sorted(
+            (item for item in packages(times).items() if item[0] != "src"),
+            key=lambda item: -item[1],
+        )[:top]
+        print(f"{project:>28}: {total:8.1f} ms")
+        for package, cumulative in heaviest:
+            print(f"{'':>30}{package:<20}{cumulative / 1000:8.1f} ms")
+
+        imported = {name.strip().split(".")[0] for name, _ in times}
+        for package in sorted(imported.intersection(forbid)):
+            failures.append(f"{project} imports {package} at start-up")
+        if budget is not None and total > budget:
+            failures.append(f"{project} takes {total:.0f} ms > {budget:.0f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""Measures the scoring latency of every model artifact of the projects.
+
+Every file of a project's `models` directory is loaded with the runtime of
+its format (see `zoo.artifacts`), in a fresh interpreter started from the
+project directory.
+
+Batches of each size are scored back to back, after a few warm-up calls,
+until `--seconds` have passed (or `--calls` batches were scored), and the
+report gives the p50/p99 latency of one call, the throughput, the load time
+and the RSS that loading the model added (its runtime libraries are
+imported first and reported apart). The rows come from the project's
+processed inputs, upscaled with `zoo.upscale` when there are not enough of
+them, or are random when the project has no processed data.
+
+    python benchmarks/latency.py
+    python benchmarks/latency.py -p credit-bias -b 1 -b 64 -o latency.json
+"""
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+import click
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+sys.path.insert(0, ROOT)
+
+from zoo.artifacts import (  # noqa: E402
+    RUNTIMES,
+    artifact_format,
+    find_artifacts,
+    load_artifact,
+    processed_inputs,
+)
+from zoo.pipeline import environment  # noqa: E402
+
+BATCH_SIZES = [1, 8, 64, 1024, 65536]
+
+
+def rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def rows_pool(
+    project_dir: str,
+    rows: int,
+    feature_names: Optional[List[str]],
+    n_features: Optional[int],
+) -> pd.DataFrame:
+    """`rows` rows with the features of the model."""
+    from zoo.upscale import Synthesizer
+
+    data = processed_inputs(project_dir, feature_names, n_features)
+    rng = np.random.default_rng(0)
+    if data is None:
+        columns = feature_names or [f"x{i}" for i in range(n_features or 1)]
+        return pd.DataFrame(rng.normal(size=(rows, len(columns))), columns=columns)
+    if len(data) < rows:
+        data = Synthesizer.fit(data).sample(rows, rng)
+    return data.iloc[:rows].reset_index(drop=True)
+
+
+def measure(
+    path: str, batch_sizes: List[int], seconds: float, calls: int
+) -> List[dict]:
+    """Loads one artifact and times its batches, in this process."""
+    project_dir = os.getcwd()
+    start_rss = rss_mib()
+    for module in RUNTIMES[artifact_format(path)]:
+        importlib.import_module(module)
+    runtime_mib = rss_mib() - start_rss
+
+    start_rss = rss_mib()
+    start = time.perf_counter()
+    artifact = load_artifact(path)
+    load_seconds = time.perf_counter() - start
+    model_mib = rss_mib() - start_rss
+    score = artifact.score
+
+    pool = rows_pool(
+        project_dir, max(batch_sizes), artifact.feature_names, artifact.n_features
+    )
+    # the xgboost booster is given an array, the other runtimes a data frame
+    inputs = pool.to_numpy() if artifact_format(path) == "xgboost" else pool
+
+    results = []
+    for batch in batch_sizes:
+        offsets = np.arange(0, len(pool) - batch + 1, batch)
+        times = []
+        for i in range(3):
+            offset = offsets[i % len(offsets)]
+            score(inputs[offset : offset + batch])
+        deadline = time.perf_counter() + seconds
+        while len(times) < calls and (
+            len(times) < 5 or time.perf_counter() < deadline
+        ):
+            offset = offsets[len(times) % len(offsets)]
+            X = inputs[offset : offset + batch]
+            t0 = time.perf_counter_ns()
+            score(X)
+            times.append(time.perf_counter_ns() - t0)
+        times = np.asarray(times) / 1e6
+        results.append(
+            {
+                "batch": batch,
+                "calls": len(times),
+                "p50_ms": float(np.percentile(times, 50)),
+                "p99_ms": float(np.percentile(times, 99)),
+                "mean_ms": float(times.mean()),
+                "rows_per_s": float(batch / times.mean() * 1000),
+                "load_s": load_seconds,
+                "model_mib": model_mib,
+                "runtime_mib": runtime_mib,
+            }
+        )
+    return results
+
+
+def run_artifact(
+    project: str, path: str, batch_sizes, seconds, calls, cores
+) -> List[dict]:
+    directory = os.path.join(ROOT, project)
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        arguments = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "measure",
+            path,
+            output.name,
+            "--seconds",
+            str(seconds),
+            "--calls",
+            str(calls),
+        ]
+        for batch in batch_sizes:
+            arguments += ["-b", str(batch)]
+        result = subprocess.run(
+            arguments,
+            cwd=directory,
+            env=environment(directory, cores),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        if result.returncode != 0:
+            lines = result.stdout.strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else "failed")
+        with open(output.name) as f:
+            return json.load(f)
+
+
+@click.group(invoke_without_command=True)
+@click.option(
+    "-p",
+    "--project",
+    "projects",
+    multiple=True,
+    help="Project directory, can be repeated (defaults to every project).",
+)
+@click.option(
+    "-b",
+    "--batch",
+    "batch_sizes",
+    type=int,
+    multiple=True,
+    default=BATCH_SIZES,
+    help="Batch size, can be repeated.",
+)
+@click.option("--seconds", type=float, default=2.0, help="Time per batch size.")
+@click.option("--calls", type=int, default=10_000, help="Calls per batch size.")
+@click.option("-j", "--cores", type=int, help="Threads of the BLAS/joblib pools.")
+@click.option("-o", "--output", type=click.Path(), help="JSON report.")
+@click.pass_context
+def cli(ctx, projects, batch_sizes, seconds, calls, cores, output):
+    """Times every model artifact of PROJECTS at each batch size."""
+    if ctx.invoked_subcommand is not None:
+        return
+    projects = projects or sorted(
+        name
+        for name in os.listdir(ROOT)
+        if os.path.isdir(os.path.join(ROOT, name, "models"))
+    )
+    click.echo(
+        f"{'artifact':<52}{'batch':>7}{'p50 (ms)':>10}{'p99 (ms)':>10}"
+        f"{'rows/s':>12}{'load (s)':>10}{'MiB':>7}{'runtime':>9}"
+    )
+    report = []
+    for project in projects:
+        for path in find_artifacts(os.path.join(ROOT, project)):
+            name = os.path.relpath(path, ROOT)
+            try:
+                results = run_artifact(
+                    project, path, batch_sizes, seconds, calls, cores
+                )
+            except RuntimeError as e:
+                click.echo(f"{name:<52}  {e}")
+                report.append({"project": project, "artifact": name, "error": str(e)})
+                continue
+            for r in results:
+                click.echo(
+                    f"{name:<52}{r['batch']:>7}{r['p50_ms']:>10.3f}"
+                    f"{r['p99_ms']:>10.3f}{r['rows_per_s']:>12.0f}"
+                    f"{r['load_s']:>10.2f}{r['model_mib']:>7.1f}"
+                    f"{r['runtime_mib']:>9.1f}"
+                )
+                report.append(
+                    {
+                        "project": project,
+                        "artifact": name,
+                        "format": artifact_format(path),
+                        **r,
+                    }
+                )
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+@cli.command("measure", hidden=True)
+@click.argument("path")
+@click.argument("output")
+@click.option("-b", "batch_sizes", type=int, multiple=True)
+@click.option("--seconds", type=float)
+@click.option("--calls", type=int)
+def measure_command(path, output, batch_sizes, seconds, calls):
+    sys.path.insert(0, os.getcwd())
+    results = measure(path, list(batch_sizes), seconds, calls)
+    with open(output, "w") as f:
+        json.dump(results, f)
+
+
+if __name__ == "__main__":
+    cli()
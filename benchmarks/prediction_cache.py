@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Measures the hit rate and the time saved by `zoo.cache.CachedModel` on
+an explainer-like workload.
+
+Every instance of `--instances` processed input rows of the project is
+explained with SHAP style background masking (`zoo.perturb`), so that the
+same rows come back within and across explanations. The workload is scored
+by the plain artifact and by the cached one, whose predictions must match.
+
+    python benchmarks/prediction_cache.py minimal-numerical
+    python benchmarks/prediction_cache.py pima-indians-diabetes-multi --background 10
+"""
+import os
+import sys
+import time
+
+import click
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from zoo.artifacts import processed_inputs  # noqa: E402
+from zoo.cache import CachedModel  # noqa: E402
+from zoo.perturb import (  # noqa: E402
+    FeatureStats,
+    PerturbationScorer,
+    PerturbationSpec,
+)
+
+
+@click.command()
+@click.argument("project_dir", type=click.Path(exists=True, file_okay=False))
+@click.option("--model", type=click.Path(exists=True), help="Artifact to score.")
+@click.option("--instances", type=int, default=20, help="Rows to explain.")
+@click.option("-n", "--samples", type=int, default=2000, help="Per instance.")
+@click.option("--background", type=int, default=20, help="Background rows.")
+@click.option("--maxsize", type=int, default=100_000, help="Rows of the cache.")
+def main(project_dir, model, instances, samples, background, maxsize):
+    try:
+        scorer = PerturbationScorer.from_project(project_dir, model)
+    except (FileNotFoundError, ValueError) as e:
+        raise click.ClickException(str(e))
+    data = processed_inputs(project_dir, scorer.stats.names)
+    stats = FeatureStats.fit(data, background_rows=background)
+    scorer = PerturbationScorer(scorer.artifact, stats)
+    batches = [
+        scorer.perturb(
+            data.iloc[i], PerturbationSpec("background", samples, seed=i)
+        ).rows
+        for i in range(min(instances, len(data)))
+    ]
+
+    cached = CachedModel(scorer.artifact, maxsize)
+    timings = {}
+    results = {}
+    for name, model in [("artifact", scorer.artifact), ("cached", cached)]:
+        start = time.perf_counter()
+        results[name] = [model.score(rows) for rows in batches]
+        timings[name] = time.perf_counter() - start
+    for plain, memoized in zip(results["artifact"], results["cached"]):
+        if np.abs(plain - memoized).max() > 1e-9:
+            raise click.ClickException("The cached predictions differ.")
+
+    info = cached.info()
+    click.echo(
+        f"{len(batches)} explanations of {samples} rows: hit rate "
+        f"{info['hit_rate']:.0%} ({info['hits']} hits, {info['misses']} misses, "
+        f"{info['evictions']} evictions)"
+    )
+    click.echo(
+        f"artifact {timings['artifact'] * 1000:.0f} ms, cached "
+        f"{timings['cached'] * 1000:.0f} ms "
+        f"({timings['artifact'] / timings['cached']:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Floods a `zoo.serve` server with concurrent single-row requests and
+compares micro-batching with scoring every request on its own.
+
+For each setting a server is started on a free localhost port with one
+model, `--clients` threads send one-row requests over keep-alive
+connections for `--seconds`, and the client-side throughput and latency
+are reported with the batch sizes the server saw (from `/metrics`).
+
+    python benchmarks/serve_load.py bias-loan/models/bias-loan.joblib
+    python benchmarks/serve_load.py MODEL --clients 64 --window_ms 1 --window_ms 5
+"""
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import click
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(port: int, path: str) -> dict:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    connection.request("GET", path)
+    body = json.loads(connection.getresponse().read())
+    connection.close()
+    return body
+
+
+def start_server(model: str, window_ms: float, max_rows: int):
+    port = free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "zoo.serve",
+            model,
+            "--port",
+            str(port),
+            "--window_ms",
+            str(window_ms),
+            "--max_rows",
+            str(max_rows),
+        ],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": ROOT},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    for _ in range(300):
+        try:
+            return process, port, get(port, "/models")
+        except OSError:
+            if process.poll() is not None:
+                raise click.ClickException(f"The server could not serve {model}.")
+            time.sleep(0.1)
+    process.kill()
+    raise click.ClickException("The server did not start.")
+
+
+def client(port, path, rows, seconds, latencies, errors):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/json"}
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        body = json.dumps({"rows": [rows[i % len(rows)]]})
+        start = time.perf_counter()
+        i += 1
+        try:
+            connection.request("POST", path, body, headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors.append(response.status)
+    connection.close()
+
+
+def load(port, name, n_features, clients, seconds) -> dict:
+    rng = np.random.default_rng(0)
+    rows = rng.normal(size=(1000, n_features)).tolist()
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(
+            target=client,
+            args=(port, f"/models/{name}/predict", rows, seconds, latencies, errors),
+        )
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies = np.asarray(latencies) * 1000
+    return {
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "errors": len(errors),
+    }
+
+
+@click.command()
+@click.argument("model", type=click.Path(exists=True))
+@click.option("--clients", type=int, default=32, help="Concurrent connections.")
+@click.option("--seconds", type=float, default=5.0, help="Duration of each run.")
+@click.option(
+    "--window_ms",
+    "windows",
+    type=float,
+    multiple=True,
+    default=[2.0],
+    help="Batching window to compare with no batching, can be repeated.",
+)
+@click.option("--max_rows", type=int, default=512)
+def main(model, clients, seconds, windows, max_rows):
+    """Load-tests MODEL, an artifact file, behind zoo.serve."""
+    print(
+        f"{'setting':<24}{'req/s':>9}{'p50 (ms)':>10}{'p99 (ms)':>10}"
+        f"{'rows/batch':>12}{'errors':>8}"
+    )
+    # max_rows=1 scores every request on its own
+    for window_ms, rows in [(0.0, 1)] + [(w, max_rows) for w in windows]:
+        process, port, models = start_server(model, window_ms, rows)
+        try:
+            name, spec = next(iter(models.items()))
+            result = load(port, name, spec["n_features"], clients, seconds)
+            metrics = get(port, "/metrics")[name]
+        finally:
+            process.kill()
+            process.wait()
+        setting = "unbatched" if rows == 1 else f"{window_ms:g} ms / {rows} rows"
+        print(
+            f"{setting:<24}{result['requests_per_s']:>9.0f}"
+            f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+            f"{metrics['mean_batch_rows']:>12.1f}{result['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
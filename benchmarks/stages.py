@@ -0,0 +1,600 @@
+# -*- coding: utf-8 -*-
+"""Times the make_dataset, build_features and train_model stages of the
+projects, and their main helpers, at several input sizes.
+
+Every case runs at every one of its scales in a fresh interpreter started
+from the project directory (the `src` packages of the projects cannot share
+one). Its setup builds the input outside of the timed region, then the case
+is run `--repeat` times and the best wall time is kept with its CPU time
+(`time.process_time`, threads included, joblib/loky worker processes not)
+and peak RSS. The peak is reset before each run (`/proc/self/clear_refs`),
+so it is the high-water mark of the run itself, also reported as the
+increase over the RSS at its start.
+
+The inputs are the raw data of the repository when it is there (bias-loan,
+tiled to the requested number of rows), and otherwise synthetic frames with
+the columns and codes that the stages expect. Models are exported as joblib
+only.
+
+Results are written to `benchmarks/results/<commit>.json` ("-dirty" when the
+tree has uncommitted changes), and `compare` lists the cases that got slower
+or bigger between two of them.
+
+    python benchmarks/stages.py list
+    python benchmarks/stages.py run -k credit-bias --max-rows 100000
+    python benchmarks/stages.py compare results/1f8cbe8.json results/6917046.json
+"""
+import datetime
+import fnmatch
+import functools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import click
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS = os.path.join(ROOT, "benchmarks", "results")
+
+sys.path.insert(0, ROOT)
+
+from zoo.pipeline import environment  # noqa: E402
+
+CASES: Dict[str, dict] = {}
+
+
+def case(project: str, scales: List[int]):
+    """Registers `setup(rows, directory)` as the case `project:name`.
+
+    The setup builds the input of the case (in `directory` when it needs
+    files) and returns the function to time.
+    """
+
+    def register(setup: Callable[[int, str], Callable[[], object]]):
+        CASES[f"{project}:{setup.__name__}"] = {
+            "project": project,
+            "scales": scales,
+            "setup": setup,
+        }
+        return setup
+
+    return register
+
+
+def key(name: str, rows: int) -> str:
+    return f"{name}[{rows}]"
+
+
+# synthetic and tiled inputs
+
+
+def tile(df: pd.DataFrame, rows: int) -> pd.DataFrame:
+    """The first `rows` rows of `df` repeated as many times as needed."""
+    repeats = -(-rows // len(df))
+    return pd.concat([df] * repeats, ignore_index=True).iloc[:rows]
+
+
+@functools.lru_cache(maxsize=None)
+def bias_loan_raw() -> tuple:
+    raw = os.path.join(ROOT, "bias-loan", "data", "raw")
+    return (
+        pd.read_csv(os.path.join(raw, "application_record.zip")),
+        pd.read_csv(os.path.join(raw, "credit_record.zip")),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def loan_data(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Raw credit-bias LoanData: coded categoricals with -1 and 0 for
+    missing values, dates as text, most rows from Estonia and not current.
+    """
+    from src.data.make_dataset import CATEGORY_CODES, SELECTED_COLUMNS
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {column: rng.integers(-1, 1000, rows) for column in SELECTED_COLUMNS}
+    )
+    for column in [
+        "ListedOnUTC",
+        "LoanDate",
+        "MaturityDate_Original",
+        "MaturityDate_Last",
+        "DateOfBirth",
+    ]:
+        days = pd.to_timedelta(rng.integers(0, 3000, rows), unit="D")
+        df[column] = (pd.Timestamp("2012-01-01") + days).strftime("%Y-%m-%d")
+    df["DefaultDate"] = np.where(rng.random(rows) < 0.3, "2019-05-01", None)
+    for column, codes in CATEGORY_CODES.items():
+        df[column] = rng.choice(list(codes) + [0, -1], rows)
+    df["NewCreditCustomer"] = rng.random(rows) < 0.5
+    df["Country"] = rng.choice(["EE", "FI", "ES"], rows, p=[0.8, 0.1, 0.1])
+    df["Status"] = rng.choice(["Current", "Late", "Repaid"], rows, p=[0.1, 0.3, 0.6])
+    df["Age"] = rng.integers(18, 70, rows)
+    df["LoanDuration"] = rng.choice([6, 12, 24, 36, 48, 60], rows)
+    df["NrOfDependants"] = rng.choice(["0", "1", "2", "3", "10Plus"], rows)
+    df["EmploymentDurationCurrentEmployer"] = rng.choice(
+        ["MoreThan5Years", "UpTo1Year", "UpTo3Years", "TrialPeriod", "Retiree"], rows
+    )
+    df["CreditScoreEeMini"] = rng.choice([0, 1000, 900, 800, 700], rows)
+    df["UserName"] = rng.choice(["a", "b", "c"], rows)
+    df["Interest"] = rng.uniform(5, 100, rows)
+    df["DebtToIncome"] = rng.uniform(0, 60, rows)
+    return df
+
+
+@functools.lru_cache(maxsize=None)
+def interim_loan_data(rows: int) -> pd.DataFrame:
+    """The credit-bias make_dataset output for `loan_data(rows)`."""
+    from src.data.make_dataset import process_frame
+
+    return process_frame(loan_data(rows))
+
+
+@functools.lru_cache(maxsize=None)
+def applications(rows: int) -> pd.DataFrame:
+    """The application records of bias-loan, as credit-card-approval uses
+    them before drawing its label.
+    """
+    df = tile(bias_loan_raw()[0], rows)
+    df["AGE"] = -df["DAYS_BIRTH"] / 365.0
+    df["DAYS_EMPLOYED"] = -df["DAYS_EMPLOYED"]
+    df["FLAG_OWN_CAR"] = df["FLAG_OWN_CAR"].eq("Y").mul(1)
+    df["FLAG_OWN_REALTY"] = df["FLAG_OWN_REALTY"].eq("Y").mul(1)
+    return df
+
+
+def training_data(
+    rows: int, features: int, targets: Dict[str, int], seed: int = 0
+) -> tuple:
+    """Numeric inputs and outputs; a target with n > 0 classes takes the
+    values 0..n-1, 0 classes makes it a regression target.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, features))
+    inputs = pd.DataFrame(X, columns=[f"x{i}" for i in range(features)])
+    outputs = pd.DataFrame(index=inputs.index)
+    for name, classes in targets.items():
+        signal = X @ rng.normal(size=features) + rng.normal(size=rows)
+        if classes:
+            edges = np.quantile(signal, np.linspace(0, 1, classes + 1)[1:-1])
+            outputs[name] = np.searchsorted(edges, signal)
+        else:
+            outputs[name] = signal
+    return inputs, outputs
+
+
+def write_csv(df: pd.DataFrame, directory: str, name: str) -> str:
+    path = os.path.join(directory, name)
+    if name.endswith(".zip"):
+        archive = name[: -len(".zip")] + ".csv"
+        compression = {"method": "zip", "archive_name": archive}
+        df.to_csv(path, index=False, compression=compression)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+# credit-bias
+
+LOAN_SCALES = [10_000, 100_000, 1_000_000]
+
+
+@case("credit-bias", LOAN_SCALES)
+def filter_columns(rows, directory):
+    from src.data.make_dataset import filter_columns
+
+    df = loan_data(rows)
+    return lambda: filter_columns(df)
+
+
+@case("credit-bias", LOAN_SCALES)
+def filter_rows(rows, directory):
+    from src.data.make_dataset import filter_rows
+
+    df = loan_data(rows)
+    return lambda: filter_rows(df)
+
+
+@case("credit-bias", LOAN_SCALES)
+def rename_columns(rows, directory):
+    from src.data.make_dataset import filter_columns, rename_columns
+
+    df = filter_columns(loan_data(rows))
+    return lambda: rename_columns(df)
+
+
+@case("credit-bias", LOAN_SCALES)
+def add_new_columns(rows, directory):
+    from src.data.make_dataset import add_new_columns, filter_columns, rename_columns
+
+    # add_new_columns modifies its argument, every repeat gets a new copy
+    df = rename_columns(filter_columns(loan_data(rows)))
+    return lambda: add_new_columns(df)
+
+
+@case("credit-bias", LOAN_SCALES)
+def process_frame(rows, directory):
+    from src.data.make_dataset import process_frame
+
+    df = loan_data(rows)
+    return lambda: process_frame(df)
+
+
+@case("credit-bias", [10_000, 100_000])
+def make_dataset(rows, directory):
+    from src.data.make_dataset import main
+
+    write_csv(loan_data(rows), directory, "LoanData.zip")
+    return lambda: main.callback(directory, directory, "csv", None)
+
+
+@case("credit-bias", LOAN_SCALES)
+def replace_columns(rows, directory):
+    from src.features.build_features import replace_columns
+
+    df = interim_loan_data(rows)
+    return lambda: replace_columns(df)
+
+
+@case("credit-bias", LOAN_SCALES)
+def transform_columns_into_binary(rows, directory):
+    from src.features.build_features import (
+        filter_rows,
+        replace_columns,
+        transform_columns_into_binary,
+    )
+
+    df = filter_rows(replace_columns(interim_loan_data(rows)))
+    columns = ["HomeOwnershipType", "EmploymentStatus"]
+    return lambda: transform_columns_into_binary(df, columns)
+
+
+@case("credit-bias", [10_000, 100_000])
+def build_features(rows, directory):
+    from src.features.build_features import main
+
+    interim_loan_data(rows).to_csv(os.path.join(directory, "data.csv"), index=False)
+    return lambda: main.callback(directory, directory, "csv")
+
+
+@case("credit-bias", [1_000, 5_000])
+def train_model(rows, directory):
+    from src.models.train_model import main
+
+    inputs, outputs = training_data(rows, 39, {"PaidLoan": 2})
+    inputs["PaidLoan"] = outputs["PaidLoan"]
+    inputs.to_csv(os.path.join(directory, "train.csv"), index=False)
+    model = os.path.join(directory, "model")
+    return lambda: main.callback(
+        directory, model, ("ubj",), "csv", "cached", -1, False
+    )
+
+
+# credit-card-approval
+
+APPLICATION_SCALES = [1_000, 10_000, 100_000]
+
+
+@case("credit-card-approval", APPLICATION_SCALES)
+def calculate_approval(rows, directory):
+    """The row-wise `apply` that `calculate_approvals` replaced."""
+    from src.data.make_dataset import calculate_approval
+
+    df = applications(rows)
+    return lambda: df.apply(calculate_approval, axis=1)
+
+
+@case("credit-card-approval", APPLICATION_SCALES + [1_000_000])
+def calculate_approvals(rows, directory):
+    from src.data.make_dataset import calculate_approvals
+
+    df = applications(rows)
+    return lambda: calculate_approvals(df, np.random.default_rng(42))
+
+
+@case("credit-card-approval", [10_000, 100_000, 1_000_000])
+def make_dataset(rows, directory):  # noqa: F811
+    from src.data.make_dataset import main
+
+    write_csv(tile(bias_loan_raw()[0], rows), directory, "application_record.zip")
+    return lambda: main.callback(directory, directory, 42, "csv")
+
+
+@case("credit-card-approval", [300, 1_000])
+def RF_estimation(rows, directory):
+    """The 100 x 3-fold randomized search of the notebook-era models."""
+    from src.models.train_model import RF_estimation
+
+    inputs, outputs = training_data(rows, 7, {"APPROVED": 2})
+    return lambda: RF_estimation(inputs, outputs["APPROVED"])
+
+
+# bias-loan
+
+CREDIT_SCALES = [10_000, 100_000, 1_000_000]
+
+
+@case("bias-loan", CREDIT_SCALES)
+def aggregate_credit_records(rows, directory):
+    from src.data.make_dataset import aggregate_credit_records
+
+    credit = tile(bias_loan_raw()[1], rows)
+    return lambda: aggregate_credit_records(credit, "worst")
+
+
+@case("bias-loan", CREDIT_SCALES)
+def build_features(rows, directory):  # noqa: F811
+    from src.features.build_features import build_features
+
+    app, credit = bias_loan_raw()
+    merged = tile(app.merge(credit, on="ID"), rows)
+    return lambda: build_features(merged)
+
+
+@case("bias-loan", CREDIT_SCALES)
+def balance_defaults(rows, directory):
+    from src.features.build_features import balance_defaults, build_features
+
+    app, credit = bias_loan_raw()
+    features = build_features(tile(app.merge(credit, on="ID"), rows))
+    return lambda: balance_defaults(features)
+
+
+@case("bias-loan", [30_000, 300_000])
+def make_dataset(rows, directory):  # noqa: F811
+    from src.data.make_dataset import main
+
+    raw = os.path.join(ROOT, "bias-loan", "data", "raw")
+    return lambda: main.callback(raw, directory, "csv", rows, "monthly", 0)
+
+
+# train_model of the scikit-learn projects: (features, targets, extra
+# arguments of main after the three paths)
+
+TRAIN_MODELS = {
+    "minimal-numerical": (4, {"Approved": 2}, (("joblib",),)),
+    "mobile-price": (14, {"price_range": 4}, (("joblib",),)),
+    "real-estate-price": (9, {"MEDV": 0}, (("joblib",),)),
+    "pima-indians-diabetes-multi": (7, {"diabetespdegreefunction": 0, "class": 2}, ()),
+    "credit-card-approval": (7, {"APPROVED": 2}, (("joblib",),)),
+    "bias-loan": (9, {"Default?": 2}, ()),
+}
+
+
+def train_case(features: int, targets: Dict[str, int], arguments: tuple):
+    def train_model(rows, directory):
+        from src.models.train_model import main
+
+        inputs, outputs = training_data(rows, features, targets)
+        inputs_path = write_csv(inputs, directory, "inputs.csv")
+        outputs_path = write_csv(outputs, directory, "outputs.csv")
+        model = os.path.join(directory, "model")
+        return lambda: main.callback(inputs_path, outputs_path, model, *arguments)
+
+    return train_model
+
+
+for _project, _spec in TRAIN_MODELS.items():
+    case(_project, [1_000, 10_000, 100_000])(train_case(*_spec))
+
+
+# measurement
+
+
+def rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def reset_peak() -> bool:
+    """Resets the peak RSS of the process (Linux >= 4.0)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_mib() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(name: str, rows: int, repeat: int) -> dict:
+    """Runs a case in this process, which has its project on sys.path."""
+    runs = []
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(repeat):
+            function = CASES[name]["setup"](rows, directory)
+            start_rss = rss_mib()
+            reset_peak()
+            wall, cpu = time.perf_counter(), time.process_time()
+            function()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            peak = max(peak_mib(), start_rss)
+            runs.append(
+                {"wall": wall, "cpu": cpu, "peak_mib": peak, "start_mib": start_rss}
+            )
+    best = min(runs, key=lambda run: run["wall"])
+    best["peak_mib"] = max(run["peak_mib"] for run in runs)
+    best["delta_mib"] = max(run["peak_mib"] - run["start_mib"] for run in runs)
+    best["rows"] = rows
+    best["walls"] = [run["wall"] for run in runs]
+    return best
+
+
+def run_case(name: str, rows: int, repeat: int, cores: Optional[int]) -> dict:
+    """Measures a case in a fresh interpreter from its project directory."""
+    directory = os.path.join(ROOT, CASES[name]["project"])
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        result = subprocess.run(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "measure",
+                name,
+                str(rows),
+                "--repeat",
+                str(repeat),
+                "--output",
+                output.name,
+            ],
+            cwd=directory,
+            env=environment(directory, cores),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        if result.returncode != 0:
+            lines = result.stdout.strip().splitlines()
+            return {"rows": rows, "error": lines[-1] if lines else "failed"}
+        with open(output.name) as f:
+            return json.load(f)
+
+
+def git(*arguments) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["git", *arguments], cwd=ROOT, capture_output=True, text=True
+    )
+
+
+def metadata() -> dict:
+    commit = git("rev-parse", "--short", "HEAD").stdout.strip() or "unknown"
+    return {
+        "commit": commit,
+        "dirty": git("diff", "--quiet", "HEAD").returncode != 0,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "versions": {
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+    }
+
+
+def selected(patterns) -> List[str]:
+    return [
+        name
+        for name in CASES
+        if not patterns or any(fnmatch.fnmatch(name, f"*{p}*") for p in patterns)
+    ]
+
+
+@click.group()
+def cli():
+    """Stage-level benchmarks of the projects."""
+
+
+@cli.command("list")
+def list_cases():
+    """Lists the cases and their scales."""
+    for name, spec in CASES.items():
+        click.echo(f"{name:<52}{', '.join(str(s) for s in spec['scales'])}")
+
+
+@cli.command()
+@click.option("-k", "patterns", multiple=True, help="Only the cases matching.")
+@click.option("--max-rows", type=int, help="Leave out the larger scales.")
+@click.option("--repeat", type=int, default=3, help="Best of N runs.")
+@click.option("-j", "--cores", type=int, help="Threads of the BLAS/joblib pools.")
+@click.option("-o", "--output", type=click.Path(), help="Results file.")
+def run(patterns, max_rows, repeat, cores, output):
+    """Runs the cases and stores their results."""
+    info = metadata()
+    if output is None:
+        name = info["commit"] + ("-dirty" if info["dirty"] else "")
+        output = os.path.join(RESULTS, f"{name}.json")
+    results = {}
+    if os.path.exists(output):
+        with open(output) as f:
+            results = json.load(f)["results"]
+
+    click.echo(
+        f"{'case':<60}{'wall (s)':>10}{'cpu (s)':>10}{'peak (MiB)':>12}{'+MiB':>8}"
+    )
+    for name in selected(patterns):
+        for rows in CASES[name]["scales"]:
+            if max_rows and rows > max_rows:
+                continue
+            result = run_case(name, rows, repeat, cores)
+            results[key(name, rows)] = result
+            if "error" in result:
+                click.echo(f"{key(name, rows):<60}  {result['error']}")
+                continue
+            click.echo(
+                f"{key(name, rows):<60}{result['wall']:>10.3f}{result['cpu']:>10.3f}"
+                f"{result['peak_mib']:>12.0f}{result['delta_mib']:>8.0f}"
+            )
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({**info, "repeat": repeat, "results": results}, f, indent=2)
+    click.echo(f"results in {output}")
+
+
+@cli.command("measure", hidden=True)
+@click.argument("name")
+@click.argument("rows", type=int)
+@click.option("--repeat", type=int, default=3)
+@click.option("--output", type=click.Path(), required=True)
+def measure_command(name, rows, repeat, output):
+    sys.path.insert(0, os.getcwd())
+    result = measure(name, rows, repeat)
+    with open(output, "w") as f:
+        json.dump(result, f)
+
+
+@cli.command()
+@click.argument("old", type=click.Path(exists=True))
+@click.argument("new", type=click.Path(exists=True))
+@click.option(
+    "--threshold", type=float, default=1.2, help="Ratio reported as a regression."
+)
+def compare(old, new, threshold):
+    """Compares two results files and exits with status 1 when a case got
+    `--threshold` times slower or bigger.
+    """
+    with open(old) as f:
+        before = json.load(f)
+    with open(new) as f:
+        after = json.load(f)
+    click.echo(f"{before['commit']} -> {after['commit']}")
+    click.echo(f"{'case':<60}{'wall':>10}{'cpu':>10}{'peak':>10}")
+    regressions = []
+    for name, result in after["results"].items():
+        previous = before["results"].get(name)
+        if previous is None or "error" in previous or "error" in result:
+            continue
+        ratios = {
+            column: result[column] / max(previous[column], 1e-9)
+            for column in ("wall", "cpu", "peak_mib")
+        }
+        flag = ratios["wall"] > threshold or ratios["peak_mib"] > threshold
+        if flag:
+            regressions.append(name)
+        click.echo(
+            f"{name:<60}{ratios['wall']:>9.2f}x{ratios['cpu']:>9.2f}x"
+            f"{ratios['peak_mib']:>9.2f}x{'  <-' if flag else ''}"
+        )
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    cli()
@@ -6,11 +6,63 @@ from pathlib import Path
 from dotenv import find_dotenv, load_dotenv
 import pandas as pd
 
+from src.data.formats import FORMATS, frame_path, write_frame
+from src.features.build_features import balance_defaults, build_features
+
+# credit_record STATUS from least to most severe: no loan for the month,
+# paid off, then 0-29 up to 150+ days past due
+STATUS_SEVERITY = ["X", "C", "0", "1", "2", "3", "4", "5"]
+
+
+def aggregate_credit_records(credit, join, months_balance=0):
+    """ Reduces the monthly credit records to one row per ID, either the
+        worst STATUS on record or the STATUS at `months_balance`.
+    """
+    if join == "worst":
+        severity = pd.Categorical(
+            credit["STATUS"], categories=STATUS_SEVERITY, ordered=True).codes
+        worst = pd.Series(severity, index=credit.index).groupby(
+            credit["ID"].to_numpy()).idxmax()
+        return credit.loc[worst.to_numpy()]
+    elif join == "month":
+        return credit[credit["MONTHS_BALANCE"].to_numpy() == months_balance]
+    else:
+        raise ValueError(f"Join {join} not supported.")
+
 
 @click.command()
 @click.argument('input_filepath', type=click.Path(exists=True))
 @click.argument('output_filepath', type=click.Path())
-def main(input_filepath, output_filepath):
+@click.option(
+    '-d',
+    '--data_format',
+    type=click.Choice(list(FORMATS)),
+    default='csv',
+    help='File format of the exported data sets.',
+)
+@click.option(
+    '-n',
+    '--max_rows',
+    type=int,
+    default=30000,
+    help='Only use the first rows of the merged records (0 uses all of them).',
+)
+@click.option(
+    '-j',
+    '--join',
+    type=click.Choice(["monthly", "worst", "month"]),
+    default="monthly",
+    help='Join every monthly credit record, or one record per ID: the worst '
+         'STATUS or the STATUS at --months_balance.',
+)
+@click.option(
+    '-m',
+    '--months_balance',
+    type=int,
+    default=0,
+    help='MONTHS_BALANCE used by the "month" join.',
+)
+def main(input_filepath, output_filepath, data_format, max_rows, join, months_balance):
     """ Runs data processing scripts to turn raw data from (../raw) into
         cleaned data ready to be analyzed (saved in ../processed).
     """
@@ -23,40 +75,23 @@ def main(input_filepath, output_filepath):
     app = pd.read_csv(os.path.join(input_filepath, "application_record.zip"))
     credit = pd.read_csv(os.path.join(input_filepath, "credit_record.zip"))
 
-    data = app.merge(credit, on="ID")
-    data = data[:30000]
-    data['Male?'] = data["CODE_GENDER"].apply(lambda x: 1 if x == "M" else 0)
-    data['Own Car?'] = data["FLAG_OWN_CAR"].apply(lambda x: 1 if x == "Y" else 0)
-    data['Own Realty?'] = data["FLAG_OWN_REALTY"].apply(lambda x: 1 if x == "Y" else 0)
-    data["Partnered?"] = data['NAME_FAMILY_STATUS'].apply(
-        lambda x: 0 if x in ["Single / not married", "Widowed", "Separated"] else 1)
-    data['Working?'] = data['NAME_INCOME_TYPE'].apply(lambda x: 0 if x in ["Pensioner", "Student"] else 1)
-    data['Live with Parents?'] = data['NAME_HOUSING_TYPE'].apply(lambda x: 1 if x == "With parents" else 0)
-    data['Days Old'] = data['DAYS_BIRTH'].apply(lambda x: -x)
-    data = data[data['DAYS_EMPLOYED']<0]
-    data['Days Employed'] = data['DAYS_EMPLOYED'].apply(lambda x: -x)
-
-    data["Default?"] = data["STATUS"].apply(lambda x: 0 if x in ["C", "X"] else 1)
-    data = data.drop(
-        ["ID", "STATUS", "MONTHS_BALANCE", "CODE_GENDER", "NAME_EDUCATION_TYPE", "FLAG_OWN_CAR", "FLAG_OWN_REALTY",
-         'NAME_FAMILY_STATUS', 'NAME_INCOME_TYPE', 'NAME_HOUSING_TYPE', "FLAG_MOBIL", "FLAG_WORK_PHONE", "FLAG_PHONE",
-         "FLAG_EMAIL", "OCCUPATION_TYPE", 'DAYS_BIRTH', "DAYS_EMPLOYED"], 1)
-    data = data.rename(
-        columns={"CNT_CHILDREN": "# Children", "AMT_INCOME_TOTAL": "Total Income", "DAYS_BIRTH": "Days Since Birth",
-                 "DAYS_EMPLOYED": "Days Employed", "CNT_FAM_MEMBERS": "# Family Members"})
-
-    debts = data[data["Default?"] == 1].index
-    nodebts = data[data["Default?"] == 0][:len(debts)].index
-
-    data = data.loc[[i for i in list(debts)+list(nodebts)]]
+    if join == "monthly":
+        data = app.merge(credit, on="ID")
+    else:
+        credit = aggregate_credit_records(credit, join, months_balance)
+        data = app.merge(credit, on="ID", validate="many_to_one")
+    logger.info(f"merged {len(data)} rows ({join} join)")
+    if max_rows:
+        data = data[:max_rows]
+    data = build_features(data)
+    data = balance_defaults(data)
 
-    data = data.reset_index(drop=True)
-    outputs_dest_file = os.path.join(output_filepath, "inputs.csv")
+    outputs_dest_file = frame_path(output_filepath, "inputs", data_format)
     X = data.drop('Default?', axis=1)
-    X.to_csv(outputs_dest_file, index=False)
-    outputs_dest_file = os.path.join(output_filepath, "outputs.csv")
+    write_frame(X, outputs_dest_file)
+    outputs_dest_file = frame_path(output_filepath, "outputs", data_format)
     Y = data[['Default?']]
-    Y.to_csv(outputs_dest_file, index=False)
+    write_frame(Y, outputs_dest_file)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+NOT_PARTNERED = ["Single / not married", "Widowed", "Separated"]
+NOT_WORKING = ["Pensioner", "Student"]
+NO_DEBT_STATUS = ["C", "X"]
+
+DROPPED_COLUMNS = [
+    "ID", "STATUS", "MONTHS_BALANCE", "CODE_GENDER", "NAME_EDUCATION_TYPE", "FLAG_OWN_CAR", "FLAG_OWN_REALTY",
+    'NAME_FAMILY_STATUS', 'NAME_INCOME_TYPE', 'NAME_HOUSING_TYPE', "FLAG_MOBIL", "FLAG_WORK_PHONE", "FLAG_PHONE",
+    "FLAG_EMAIL", "OCCUPATION_TYPE", 'DAYS_BIRTH', "DAYS_EMPLOYED"]
+
+RENAMED_COLUMNS = {
+    "CNT_CHILDREN": "# Children", "AMT_INCOME_TOTAL": "Total Income", "DAYS_BIRTH": "Days Since Birth",
+    "DAYS_EMPLOYED": "Days Employed", "CNT_FAM_MEMBERS": "# Family Members"}
+
+
+def flag(mask):
+    return mask.to_numpy().astype(np.int8)
+
+
+def build_features(data: pd.DataFrame) -> pd.DataFrame:
+    """ Turns the merged application and credit records into the model
+        features, keeping only applicants currently employed.
+    """
+    data = data[data['DAYS_EMPLOYED'].to_numpy() < 0].copy()
+
+    data['Male?'] = flag(data["CODE_GENDER"].eq("M"))
+    data['Own Car?'] = flag(data["FLAG_OWN_CAR"].eq("Y"))
+    data['Own Realty?'] = flag(data["FLAG_OWN_REALTY"].eq("Y"))
+    data["Partnered?"] = flag(~data['NAME_FAMILY_STATUS'].isin(NOT_PARTNERED))
+    data['Working?'] = flag(~data['NAME_INCOME_TYPE'].isin(NOT_WORKING))
+    data['Live with Parents?'] = flag(data['NAME_HOUSING_TYPE'].eq("With parents"))
+    data['Days Old'] = -data['DAYS_BIRTH']
+    data['Days Employed'] = -data['DAYS_EMPLOYED']
+    data["Default?"] = flag(~data["STATUS"].isin(NO_DEBT_STATUS))
+
+    data = data.drop(columns=DROPPED_COLUMNS)
+    return data.rename(columns=RENAMED_COLUMNS)
+
+
+def balance_defaults(data: pd.DataFrame) -> pd.DataFrame:
+    """ Keeps every defaulting row followed by the same number of
+        non-defaulting rows, in their original order.
+    """
+    default = data["Default?"].to_numpy() == 1
+    no_default = ~default
+    no_default &= np.cumsum(no_default) <= default.sum()
+    return pd.concat([data[default], data[no_default]], ignore_index=True)
@@ -8,6 +8,8 @@ import pandas as pd
 import numpy as np
 import os
 
+from src.data.formats import FORMATS, ChunkWriter, frame_path, write_frame
+
 handler = colorlog.StreamHandler()
 handler.setFormatter(
     colorlog.ColoredFormatter("%(log_color)s%(levelname)s:%(name)s:%(message)s")
@@ -15,169 +17,216 @@ handler.setFormatter(
 logger = colorlog.getLogger(__name__)
 
 
+SELECTED_COLUMNS = [
+    "LoanNumber",
+    "ListedOnUTC",
+    "UserName",
+    "NewCreditCustomer",
+    "LoanDate",
+    "MaturityDate_Original",
+    "MaturityDate_Last",
+    "Age",
+    "DateOfBirth",
+    "Gender",
+    "Country",
+    "AppliedAmount",
+    "Amount",
+    "Interest",
+    "LoanDuration",
+    "MonthlyPayment",
+    "UseOfLoan",
+    "Education",
+    "MaritalStatus",
+    "NrOfDependants",
+    "EmploymentStatus",
+    "EmploymentDurationCurrentEmployer",
+    "WorkExperience",
+    "OccupationArea",
+    "HomeOwnershipType",
+    "IncomeFromPrincipalEmployer",
+    "IncomeFromPension",
+    "IncomeFromFamilyAllowance",
+    "IncomeFromSocialWelfare",
+    "IncomeFromLeavePay",
+    "IncomeFromChildSupport",
+    "IncomeOther",
+    "IncomeTotal",
+    "ExistingLiabilities",
+    "RefinanceLiabilities",
+    "DebtToIncome",
+    "FreeCash",
+    "DefaultDate",
+    "Status",
+    "CreditScoreEeMini",
+    "NoOfPreviousLoansBeforeLoan",
+    "AmountOfPreviousLoansBeforeLoan",
+    "PreviousRepaymentsBeforeLoan",
+    "PreviousEarlyRepaymentsBefoleLoan",
+    "PreviousEarlyRepaymentsCountBeforeLoan",
+]
+
+# columns kept as text; read as such, so that a chunk without any value in
+# one of them does not turn it into a float column
+TEXT_COLUMNS = [
+    "UserName",
+    "Country",
+    "EmploymentDurationCurrentEmployer",
+    "WorkExperience",
+    "Status",
+]
+# the dtypes that must not depend on the rows read at once: the scores are
+# written as text, and "640" and "640.0" would both turn up in chunks with
+# and without missing scores
+DTYPES = {
+    **{column: str for column in TEXT_COLUMNS},
+    "CreditScoreEeMini": np.float64,
+}
+
+
 def filter_columns(df_: pd.DataFrame) -> pd.DataFrame:
-    selected_columns = [
-        "LoanNumber",
-        "ListedOnUTC",
-        "UserName",
-        "NewCreditCustomer",
-        "LoanDate",
-        "MaturityDate_Original",
-        "MaturityDate_Last",
-        "Age",
-        "DateOfBirth",
-        "Gender",
-        "Country",
-        "AppliedAmount",
-        "Amount",
-        "Interest",
-        "LoanDuration",
-        "MonthlyPayment",
-        "UseOfLoan",
-        "Education",
-        "MaritalStatus",
-        "NrOfDependants",
-        "EmploymentStatus",
-        "EmploymentDurationCurrentEmployer",
-        "WorkExperience",
-        "OccupationArea",
-        "HomeOwnershipType",
-        "IncomeFromPrincipalEmployer",
-        "IncomeFromPension",
-        "IncomeFromFamilyAllowance",
-        "IncomeFromSocialWelfare",
-        "IncomeFromLeavePay",
-        "IncomeFromChildSupport",
-        "IncomeOther",
-        "IncomeTotal",
-        "ExistingLiabilities",
-        "RefinanceLiabilities",
-        "DebtToIncome",
-        "FreeCash",
-        "DefaultDate",
-        "Status",
-        "CreditScoreEeMini",
-        "NoOfPreviousLoansBeforeLoan",
-        "AmountOfPreviousLoansBeforeLoan",
-        "PreviousRepaymentsBeforeLoan",
-        "PreviousEarlyRepaymentsBefoleLoan",
-        "PreviousEarlyRepaymentsCountBeforeLoan",
-    ]
-
-    return df_[selected_columns]
+    return df_[SELECTED_COLUMNS]
 
 
 def filter_rows(df_: pd.DataFrame) -> pd.DataFrame:
     return df_[(df_["Country"] == "EE") & (df_["Status"] != "Current")]
 
 
+CATEGORY_CODES = {
+    "UseOfLoan": {
+        0: "Loan_consolidation",
+        1: "Real_estate",
+        2: "Home_improvement",
+        3: "Business",
+        4: "Education",
+        5: "Travel",
+        6: "Vehicle",
+        7: "Other",
+        8: "Health",
+        101: "Working_capital_financing",
+        102: "Purchase_of_machinery_equipment",
+        103: "Renovation_of_real_estate",
+        104: "Accounts_receivable_financing ",
+        105: "Acquisition_of_means_of_transport",
+        106: "Construction_finance",
+        107: "Acquisition_of_stocks",
+        108: "Acquisition_of_real_estate",
+        109: "Guaranteeing_obligation ",
+        110: "Other_business",
+    },
+    "Education": {
+        1: "Primary",
+        2: "Basic",
+        3: "Vocational",
+        4: "Secondary",
+        5: "Higher",
+    },
+    "MaritalStatus": {
+        1: "Married",
+        2: "Cohabitant",
+        3: "Single",
+        4: "Divorced",
+        5: "Widow",
+    },
+    "EmploymentStatus": {
+        1: "Unemployed",
+        2: "Partially",
+        3: "Fully",
+        4: "Self_employed",
+        5: "Entrepreneur",
+        6: "Retiree",
+    },
+    "OccupationArea": {
+        1: "Other",
+        2: "Mining",
+        3: "Processing",
+        4: "Energy",
+        5: "Utilities",
+        6: "Construction",
+        7: "Retail_and_wholesale",
+        8: "Transport_and_warehousing",
+        9: "Hospitality_and_catering",
+        10: "Info_and_telecom",
+        11: "Finance_and_insurance",
+        12: "Real_estate",
+        13: "Research",
+        14: "Administrative",
+        15: "Civil_service_and_military",
+        16: "Education",
+        17: "Healthcare_and_social_help",
+        18: "Art_and_entertainment",
+        19: "Agriculture_forestry_and_fishing",
+    },
+    "HomeOwnershipType": {
+        0: "Homeless",
+        1: "Owner",
+        2: "Living_with_parents",
+        3: "Tenant_pre_furnished_property",
+        4: "Tenant_unfurnished_property",
+        5: "Council_house",
+        6: "Joint_tenant",
+        7: "Joint_ownership",
+        8: "Mortgage",
+        9: "Owner_with_encumbrance",
+        10: "Other",
+    },
+    "Gender": {0: "Male", 1: "Female", 2: "Unknown"},
+}
+
+
+def build_decoder(codes: dict) -> tuple:
+    """Precomputes a code -> category index lookup array for `codes`."""
+    categories = list(codes.values())
+    lookup = np.full(max(codes) + 1, -1, dtype=np.int16)
+    for index, code in enumerate(codes):
+        lookup[code] = index
+    return lookup, categories
+
+
+DECODERS = {column: build_decoder(codes) for column, codes in CATEGORY_CODES.items()}
+
+
+def decode_column(values: pd.Series, decoder: tuple) -> pd.Categorical:
+    """Maps integer codes to a categorical with a single indexed lookup.
+    Missing and unknown codes become NaN.
+    """
+    lookup, categories = decoder
+    codes = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+    known = (codes >= 0) & (codes < len(lookup)) & (codes == np.floor(codes))
+    category_codes = np.full(len(codes), -1, dtype=lookup.dtype)
+    category_codes[known] = lookup[codes[known].astype(int)]
+    return pd.Categorical.from_codes(category_codes, categories)
+
+
 def rename_columns(df_: pd.DataFrame) -> pd.DataFrame:
-    df_ = df_.replace(-1, np.nan)
-
-    zero_replacements = [
-        "Age",
-        "Education",
-        "MaritalStatus",
-        "EmploymentStatus",
-        "OccupationArea",
-        "CreditScoreEeMini",
-    ]
-    df_[zero_replacements] = df_[zero_replacements].replace(0.0, np.nan)
-
-    value_replacements = {
-        "UseOfLoan": {
-            0: "Loan_consolidation",
-            1: "Real_estate",
-            2: "Home_improvement",
-            3: "Business",
-            4: "Education",
-            5: "Travel",
-            6: "Vehicle",
-            7: "Other",
-            8: "Health",
-            101: "Working_capital_financing",
-            102: "Purchase_of_machinery_equipment",
-            103: "Renovation_of_real_estate",
-            104: "Accounts_receivable_financing ",
-            105: "Acquisition_of_means_of_transport",
-            106: "Construction_finance",
-            107: "Acquisition_of_stocks",
-            108: "Acquisition_of_real_estate",
-            109: "Guaranteeing_obligation ",
-            110: "Other_business",
-        },
-        "Education": {
-            1: "Primary",
-            2: "Basic",
-            3: "Vocational",
-            4: "Secondary",
-            5: "Higher",
-        },
-        "MaritalStatus": {
-            1: "Married",
-            2: "Cohabitant",
-            3: "Single",
-            4: "Divorced",
-            5: "Widow",
-        },
-        "EmploymentStatus": {
-            1: "Unemployed",
-            2: "Partially",
-            3: "Fully",
-            4: "Self_employed",
-            5: "Entrepreneur",
-            6: "Retiree",
-        },
-        "NewCreditCustomer": {0: "Existing_credit_customer", 1: "New_credit_Customer"},
-        "OccupationArea": {
-            1: "Other",
-            2: "Mining",
-            3: "Processing",
-            4: "Energy",
-            5: "Utilities",
-            6: "Construction",
-            7: "Retail_and_wholesale",
-            8: "Transport_and_warehousing",
-            9: "Hospitality_and_catering",
-            10: "Info_and_telecom",
-            11: "Finance_and_insurance",
-            12: "Real_estate",
-            13: "Research",
-            14: "Administrative",
-            15: "Civil_service_and_military",
-            16: "Education",
-            17: "Healthcare_and_social_help",
-            18: "Art_and_entertainment",
-            19: "Agriculture_forestry_and_fishing",
-        },
-        "HomeOwnershipType": {
-            0: "Homeless",
-            1: "Owner",
-            2: "Living_with_parents",
-            3: "Tenant_pre_furnished_property",
-            4: "Tenant_unfurnished_property",
-            5: "Council_house",
-            6: "Joint_tenant",
-            7: "Joint_ownership",
-            8: "Mortgage",
-            9: "Owner_with_encumbrance",
-            10: "Other",
-        },
-        "NrOfDependants": {"10Plus": 11},
-        "Gender": {0: "Male", 1: "Female", 2: "Unknown"},
-    }
-    df_ = df_.replace(value_replacements)
+    df_ = df_.copy()
+
+    numeric = df_.select_dtypes("number").columns.difference(list(DECODERS))
+    df_[numeric] = df_[numeric].mask(df_[numeric] == -1)
+
+    # codes 0 and -1 in the categorical columns are not in CATEGORY_CODES and
+    # are decoded as NaN, so only the numeric ones need replacing here
+    zero_replacements = ["Age", "CreditScoreEeMini"]
+    df_[zero_replacements] = df_[zero_replacements].mask(df_[zero_replacements] == 0)
+
+    for column, decoder in DECODERS.items():
+        df_[column] = decode_column(df_[column], decoder)
+
+    df_["NrOfDependants"] = df_["NrOfDependants"].replace({"10Plus": 11})
 
     return df_
 
 
 def add_new_columns(df_: pd.DataFrame) -> pd.DataFrame:
-    df_["Defaulted"] = df_["DefaultDate"].apply(lambda x: 0 if pd.isnull(x) else 1)
-    df_["PaidLoan"] = df_["Defaulted"].replace({0: 1, 1: 0})
-    df_["LoanStatus"] = df_["PaidLoan"].apply(
-        lambda x: "Paid back" if x == 1 else "Defaulted"
+    defaulted = df_["DefaultDate"].notna().to_numpy()
+    df_["Defaulted"] = defaulted
+    df_["PaidLoan"] = ~defaulted
+    df_["LoanStatus"] = pd.Categorical.from_codes(
+        defaulted.astype(np.int8), ["Paid back", "Defaulted"]
+    )
+    # a missing Age falls in "Over 40", as it always has
+    df_["AgeGroup"] = pd.Categorical.from_codes(
+        (~(df_["Age"] < 40)).to_numpy(dtype=np.int8), ["Under 40", "Over 40"]
     )
-    df_["AgeGroup"] = df_["Age"].apply(lambda x: "Under 40" if x < 40 else "Over 40")
 
     return df_
 
@@ -194,35 +243,71 @@ def reformat_columns(df_: pd.DataFrame) -> pd.DataFrame:
     df_["NrOfDependants"] = pd.to_numeric(df_["NrOfDependants"])
 
     df_["CreditScoreEeMini"] = df_["CreditScoreEeMini"].astype(str)
-    df_["Defaulted"] = df_["Defaulted"].astype(bool)
-    df_["PaidLoan"] = df_["PaidLoan"].astype(bool)
 
     return df_
 
 
+def process_frame(df_: pd.DataFrame) -> pd.DataFrame:
+    # Filter not used columns
+    df_ = filter_columns(df_)
+    # Filter not used rows
+    df_ = filter_rows(df_)
+    # Rename columns
+    df_ = rename_columns(df_)
+    # Add new columns
+    df_ = add_new_columns(df_)
+    # Reformat columns
+    return reformat_columns(df_)
+
+
 @click.command()
 @click.argument("input_filepath", type=click.Path(exists=True))
 @click.argument("output_filepath", type=click.Path())
-def main(input_filepath, output_filepath):
+@click.option(
+    "-d",
+    "--data_format",
+    type=click.Choice(list(FORMATS)),
+    default="csv",
+    help="File format of the exported data sets.",
+)
+@click.option(
+    "-c",
+    "--chunksize",
+    type=int,
+    default=None,
+    help="Stream the raw data in chunks of this many rows (csv or parquet only).",
+)
+def main(input_filepath, output_filepath, data_format, chunksize):
     """Runs data processing scripts to turn raw data from (../raw) into
     cleaned data ready to be analyzed (saved in ../processed).
     """
     logger.info("making interim data set from raw data")
 
-    # load raw dataset
-    _df = pd.read_csv(os.path.join(input_filepath, "LoanData.zip"))
-    # Filter not used columns
-    _df = filter_columns(_df)
-    # Filter not used rows
-    _df = filter_rows(_df)
-    # Rename columns
-    _df = rename_columns(_df)
-    # Add new columns
-    _df = add_new_columns(_df)
-    # Reformat columns
-    _df = reformat_columns(_df)
+    input_file = os.path.join(input_filepath, "LoanData.zip")
+    output_file = frame_path(output_filepath, "data", data_format)
 
-    _df.to_csv(os.path.join(output_filepath, "data.csv"), index=False)
+    if chunksize:
+        # bound memory by the chunk size: every chunk goes through the full
+        # set of transformations and is appended to the output
+        logger.info(f"streaming raw dataset in chunks of {chunksize} rows")
+        chunks = pd.read_csv(
+            input_file,
+            usecols=SELECTED_COLUMNS,
+            dtype=DTYPES,
+            chunksize=chunksize,
+        )
+        with ChunkWriter(output_file, TEXT_COLUMNS) as writer:
+            for chunk in chunks:
+                writer.write(process_frame(chunk))
+        logger.info(f"wrote {writer.rows} rows to {output_file}")
+    else:
+        # load raw dataset
+        _df = pd.read_csv(
+            input_file,
+            usecols=SELECTED_COLUMNS,
+            dtype=DTYPES,
+        )
+        write_frame(process_frame(_df), output_file)
 
 
 if __name__ == "__main__":
@@ -8,6 +8,8 @@ import pandas as pd
 from dotenv import find_dotenv, load_dotenv
 from sklearn.preprocessing import LabelBinarizer
 
+from src.data.formats import FORMATS, frame_path, read_frame, write_frame
+
 
 def filter_training_columns(df_):
     training_columns = ['NewCreditCustomer', 'Amount',
@@ -39,7 +41,12 @@ def replace_columns(df_):
                                               'Other': 0},
         "HomeOwnershipType": {'Tenant_unfurnished_property': 'Tenant', 'Tenant_pre_furnished_property': 'Tenant'}
     }
-    return df_.replace(new_values)
+    # decoded columns may arrive as categoricals from a parquet/feather handoff
+    df_ = df_.astype({column: object for column in new_values})
+    df_ = df_.replace(new_values)
+    # CreditScoreEeMini is written as text by make_dataset
+    df_["CreditScoreEeMini"] = pd.to_numeric(df_["CreditScoreEeMini"], errors="coerce")
+    return df_
 
 
 def filter_rows(df_):
@@ -59,7 +66,14 @@ def transform_columns_into_binary(df_, columns: list):
 @click.command()
 @click.argument("input_filepath", type=click.Path(exists=True))
 @click.argument("output_filepath", type=click.Path())
-def main(input_filepath, output_filepath):
+@click.option(
+    "-d",
+    "--data_format",
+    type=click.Choice(list(FORMATS)),
+    default="csv",
+    help="File format of the interim and training data sets.",
+)
+def main(input_filepath, output_filepath, data_format):
     """Runs data processing scripts to turn raw data from (../raw) into
     cleaned data ready to be analyzed (saved in ../processed).
     """
@@ -67,13 +81,13 @@ def main(input_filepath, output_filepath):
     logger.info("making training data set from interim data")
 
     # load iterim dataset
-    _df = pd.read_csv(os.path.join(input_filepath, "data.csv"))
+    _df = read_frame(frame_path(input_filepath, "data", data_format))
     _df = replace_columns(_df)
     _df = filter_rows(_df)
     _df = transform_columns_into_binary(_df, ['HomeOwnershipType', 'EmploymentStatus'])
     _df = filter_training_columns(_df)
 
-    _df.to_csv(os.path.join(output_filepath, "train.csv"), index=False)
+    write_frame(_df, frame_path(output_filepath, "train", data_format))
 
 
 if __name__ == "__main__":
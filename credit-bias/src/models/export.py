@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Generated from zoo/export.py by `python -m zoo.vendor`, do not edit.
+"""Writes one fitted model to every requested artifact format.
+
+This is the one implementation of the `src/models/export.py` of the
+projects that train scikit-learn or xgboost models; `python -m zoo.vendor`
+copies it into them (see `zoo.frames`).
+"""
+import logging
+from typing import Iterable, List, Optional
+
+import numpy as np
+from joblib import dump
+from pandas.core.frame import DataFrame
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "joblib": ".joblib",
+    "pmml": ".pmml",
+    "json": ".json",
+    "ubj": ".ubj",
+    "dill": ".dill",
+}
+PMML_BACKENDS = ["nyoka", "sklearn2pmml"]
+
+
+def pmml_pipeline(model, feature_names: List[str], target: str):
+    """Wraps an already fitted estimator in a PMMLPipeline, without fitting
+    it again.
+    """
+    from sklearn2pmml.pipeline import PMMLPipeline
+
+    pipeline = PMMLPipeline([("classifier", model)])
+    pipeline.active_fields = np.asarray(feature_names)
+    pipeline.target_fields = np.asarray([target])
+    return pipeline
+
+
+def export_model(
+    model,
+    model_dest: str,
+    formats: Iterable[str],
+    feature_names: List[str],
+    target: str,
+    pmml_backend: str = "nyoka",
+    verification: Optional[DataFrame] = None,
+) -> List[str]:
+    """Writes one fitted model to `model_dest` plus the extension of every
+    requested format and returns the written paths.
+
+    "json" and "ubj" are the native xgboost formats and need an xgboost
+    model. `verification` rows are embedded in the PMML document when the
+    sklearn2pmml backend is used.
+
+    The PMML backends (and dill) are imported only when their file is
+    written: they take seconds to import and most runs do not need them.
+    """
+    paths = []
+    for output_format in formats:
+        if output_format not in EXPORT_FORMATS:
+            raise ValueError(f"Format {output_format} not supported.")
+        path = model_dest + EXPORT_FORMATS[output_format]
+
+        if output_format == "joblib":
+            logger.info(f"Saving joblib model to {path}")
+            dump(model, path)
+        elif output_format == "pmml":
+            logger.info(f"Saving PMML model to {path} with {pmml_backend}")
+            pipeline = pmml_pipeline(model, feature_names, target)
+            if pmml_backend == "sklearn2pmml":
+                from sklearn2pmml import sklearn2pmml
+
+                if verification is not None:
+                    pipeline.verify(verification)
+                sklearn2pmml(pipeline, path)
+            elif pmml_backend == "nyoka":
+                from nyoka import skl_to_pmml
+
+                skl_to_pmml(pipeline, feature_names, target, path)
+            else:
+                raise ValueError(f"PMML backend {pmml_backend} not supported.")
+        elif output_format == "dill":
+            import dill
+
+            logger.info(f"Saving dill model to {path}")
+            with open(path, "wb") as f:
+                dill.dump(model, f)
+        else:
+            if not hasattr(model, "save_model"):
+                raise ValueError(f"Format {output_format} requires an xgboost model.")
+            logger.info(f"Saving xgboost model to {path}")
+            model.save_model(path)
+        paths.append(path)
+    return paths
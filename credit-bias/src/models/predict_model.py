@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import click
+import colorlog
+import logging
+import time
+from pathlib import Path
+from dotenv import find_dotenv, load_dotenv
+import pandas as pd
+from pandas.core.frame import DataFrame
+from xgboost.sklearn import XGBClassifier
+
+from src.data.formats import ChunkWriter, iter_frames
+
+handler = colorlog.StreamHandler()
+handler.setFormatter(
+    colorlog.ColoredFormatter("%(log_color)s%(levelname)s:%(name)s:%(message)s")
+)
+logger = colorlog.getLogger(__name__)
+
+TARGET = "PaidLoan"
+
+
+def load_model(model_filepath: str) -> XGBClassifier:
+    """Loads a JSON or UBJ model written by train_model.py"""
+    model = XGBClassifier()
+    model.load_model(model_filepath)
+    return model
+
+
+def predict_chunk(model: XGBClassifier, chunk: DataFrame) -> DataFrame:
+    columns = [f"P({TARGET}={c})" for c in model.classes_]
+    if chunk.empty:
+        return pd.DataFrame(columns=columns, dtype=float)
+    features = model.get_booster().feature_names
+    if features:
+        inputs = chunk[features]
+    else:
+        inputs = chunk.drop(TARGET, axis=1, errors="ignore")
+    return pd.DataFrame(model.predict_proba(inputs), columns=columns)
+
+
+@click.command()
+@click.option("-m", "--model_filepath", type=click.Path(exists=True))
+@click.option("-i", "--input_filepath", type=click.Path(exists=True))
+@click.option("-o", "--output_filepath", type=click.Path())
+@click.option(
+    "-c",
+    "--chunksize",
+    type=int,
+    default=100000,
+    help="Number of rows scored at a time.",
+)
+def main(model_filepath, input_filepath, output_filepath, chunksize):
+    """Scores a data set with a trained model, one chunk at a time, and
+    streams the predictions to a csv or parquet file.
+    """
+    logger.info(f"Loading model {model_filepath}")
+    model = load_model(model_filepath)
+
+    logger.info(f"Scoring {input_filepath} in chunks of {chunksize} rows")
+    start = time.perf_counter()
+    with ChunkWriter(output_filepath) as writer:
+        for chunk in iter_frames(input_filepath, chunksize):
+            writer.write(predict_chunk(model, chunk))
+        if not writer.rows:
+            # an empty input still gets its (empty) predictions file
+            writer.write(predict_chunk(model, pd.DataFrame()))
+    elapsed = time.perf_counter() - start
+    rate = f" ({writer.rows / elapsed:.0f} rows/s)" if writer.rows else ""
+    logger.info(f"Scored {writer.rows} rows in {elapsed:.2f} s{rate}")
+
+
+if __name__ == "__main__":
+    log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    # not used in this stub but often useful for finding various files
+    project_dir = Path(__file__).resolve().parents[2]
+
+    # find .env automagically by walking up directories until it's found, then
+    # load up the .env entries as environment variables
+    load_dotenv(find_dotenv())
+
+    main()
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+from typing import Dict, List, Tuple
+
+import colorlog
+import numpy as np
+import xgboost as xgb
+from joblib import Parallel, cpu_count, delayed
+from sklearn.base import clone
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from xgboost.sklearn import XGBClassifier
+
+logger = colorlog.getLogger(__name__)
+
+
+def split_jobs(n_jobs: int, n_tasks: int) -> Tuple[int, int]:
+    """Splits a core budget between outer parallelism (concurrent fits) and
+    inner parallelism (xgboost threads per fit) so that the two levels never
+    ask for more than `n_jobs` cores in total.
+    """
+    # joblib's count honours LOKY_MAX_CPU_COUNT, set by zoo.orchestrate
+    cores = cpu_count()
+    if n_jobs is not None and n_jobs > 0:
+        cores = n_jobs
+    outer = max(1, min(cores, n_tasks))
+    inner = max(1, cores // outer)
+    return outer, inner
+
+
+class XGBSearch:
+    """Exhaustive search over `param_grid` for an `XGBClassifier`, scored by
+    ROC AUC with stratified k-fold cross-validation.
+
+    Compared with a `GridSearchCV`:
+
+    - the `n_estimators` axis is not fitted separately: every (parameters,
+      fold) pair is boosted once up to the largest `n_estimators` and the
+      smaller values are scored from the same booster with `iteration_range`;
+    - the training and validation `DMatrix` of each fold are built once and
+      shared by every candidate;
+    - the `n_jobs` core budget is split between concurrent fits and xgboost
+      threads (see `split_jobs`).
+
+    After `fit`, `best_params_`, `best_score_` and `cv_results_` follow the
+    scikit-learn conventions, and `best_estimator_` is refit on the whole
+    data set when `refit` is set.
+    """
+
+    def __init__(
+        self,
+        estimator: XGBClassifier,
+        param_grid: Dict[str, List],
+        cv: int = 8,
+        n_jobs: int = -1,
+        refit: bool = True,
+    ):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.refit = refit
+
+    def fit(self, X, y):
+        grid = dict(self.param_grid)
+        n_estimators = sorted(grid.pop("n_estimators", [self.estimator.n_estimators]))
+        candidates = list(ParameterGrid(grid))
+
+        data = np.asarray(X, dtype=np.float32)
+        labels = np.asarray(y).astype(int)
+        splits = list(StratifiedKFold(n_splits=self.cv).split(data, labels))
+        outer, inner = split_jobs(self.n_jobs, len(candidates) * len(splits))
+        logger.info(
+            f"Fitting {len(candidates)} candidates x {len(splits)} folds "
+            f"({len(candidates) * len(n_estimators)} configurations) "
+            f"with {outer} concurrent fits of {inner} threads"
+        )
+
+        folds = [
+            (
+                xgb.DMatrix(data[train], label=labels[train], nthread=inner),
+                xgb.DMatrix(data[test], nthread=inner),
+                labels[test],
+            )
+            for train, test in splits
+        ]
+
+        params = self.estimator.get_xgb_params()
+        params["n_jobs"] = inner
+
+        def score(candidate, fold):
+            dtrain, dvalid, y_valid = folds[fold]
+            booster = xgb.train(
+                {**params, **candidate}, dtrain, num_boost_round=n_estimators[-1]
+            )
+            return [
+                roc_auc_score(y_valid, booster.predict(dvalid, iteration_range=(0, n)))
+                for n in n_estimators
+            ]
+
+        # xgboost releases the GIL, so threads can share the cached DMatrix
+        scores = Parallel(n_jobs=outer, prefer="threads")(
+            delayed(score)(candidate, fold)
+            for candidate in candidates
+            for fold in range(len(folds))
+        )
+        # (candidate, fold, n_estimators) -> (candidate, n_estimators, fold)
+        scores = np.asarray(scores).reshape(len(candidates), len(folds), -1)
+        scores = scores.transpose(0, 2, 1).reshape(-1, len(folds))
+
+        self.cv_results_ = self._cv_results(candidates, n_estimators, scores)
+        best = int(np.argmin(self.cv_results_["rank_test_score"]))
+        self.best_index_ = best
+        self.best_params_ = self.cv_results_["params"][best]
+        self.best_score_ = self.cv_results_["mean_test_score"][best]
+
+        if self.refit:
+            self.best_estimator_ = clone(self.estimator).set_params(
+                **self.best_params_, n_jobs=outer * inner
+            )
+            self.best_estimator_.fit(X, y)
+
+        return self
+
+    @staticmethod
+    def _cv_results(candidates, n_estimators, scores) -> Dict[str, List]:
+        params = [
+            {**candidate, "n_estimators": n}
+            for candidate in candidates
+            for n in n_estimators
+        ]
+        mean = scores.mean(axis=1)
+        # rank 1 is the best score, ties share the lowest rank
+        order = np.argsort(-mean, kind="stable")
+        rank = np.empty(len(mean), dtype=int)
+        rank[order] = np.arange(1, len(mean) + 1)
+        for i in range(1, len(order)):
+            if mean[order[i]] == mean[order[i - 1]]:
+                rank[order[i]] = rank[order[i - 1]]
+
+        results = {"params": params}
+        for name in params[0]:
+            results[f"param_{name}"] = [p[name] for p in params]
+        for fold in range(scores.shape[1]):
+            results[f"split{fold}_test_score"] = scores[:, fold].tolist()
+        results["mean_test_score"] = mean.tolist()
+        results["std_test_score"] = scores.std(axis=1).tolist()
+        results["rank_test_score"] = rank.tolist()
+        return results
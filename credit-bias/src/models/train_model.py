@@ -8,17 +8,20 @@ from pathlib import Path
 from dotenv import find_dotenv, load_dotenv
 import pandas as pd
 import os
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split
-from sklearn.model_selection import GridSearchCV
+from sklearn.model_selection import GridSearchCV, ParameterGrid
 
 
 from xgboost.sklearn import XGBClassifier
-from sklearn2pmml.pipeline import PMMLPipeline
-from nyoka.skl.skl_to_pmml import skl_to_pmml
 import joblib
 import numpy as np
 from typing import List, Optional
 
+from src.data.formats import FORMATS, frame_path, read_frame
+from src.models.export import EXPORT_FORMATS, export_model
+from src.models.search import XGBSearch, split_jobs
+
 handler = colorlog.StreamHandler()
 handler.setFormatter(
     colorlog.ColoredFormatter("%(log_color)s%(levelname)s:%(name)s:%(message)s")
@@ -29,8 +32,49 @@ logger = colorlog.getLogger(__name__)
 @click.command()
 @click.option("-i", "--input_filepath", type=click.Path(exists=True))
 @click.option("-o", "--output_filepath", type=click.Path())
-@click.option("-f", "--output_format")
-def main(input_filepath, output_filepath, output_format):
+@click.option(
+    "-f",
+    "--output_format",
+    type=click.Choice(list(EXPORT_FORMATS)),
+    multiple=True,
+    default=["ubj"],
+    help="Model format to export, can be repeated.",
+)
+@click.option(
+    "-d",
+    "--data_format",
+    type=click.Choice(list(FORMATS)),
+    default="csv",
+    help="File format of the processed training data set.",
+)
+@click.option(
+    "-s",
+    "--search",
+    type=click.Choice(["cached", "grid"]),
+    default="cached",
+    help="Hyper-parameter search engine: XGBSearch or a plain GridSearchCV.",
+)
+@click.option(
+    "-j",
+    "--n_jobs",
+    type=int,
+    default=-1,
+    help="Total number of cores used by the search (-1 uses all of them).",
+)
+@click.option(
+    "--refit_full",
+    is_flag=True,
+    help="Refit the best model on the full data set, not only the training split.",
+)
+def main(
+    input_filepath,
+    output_filepath,
+    output_format,
+    data_format,
+    search,
+    n_jobs,
+    refit_full,
+):
     print("Options")
     print(input_filepath)
     print(output_format)
@@ -39,7 +83,7 @@ def main(input_filepath, output_filepath, output_format):
 
     # load processed dataset
     logger.info("Loading processed dataset")
-    _df: DataFrame = pd.read_csv(os.path.join(input_filepath, "train.csv"))
+    _df: DataFrame = read_frame(frame_path(input_filepath, "train", data_format))
 
     if not _df.empty:
 
@@ -60,21 +104,27 @@ def main(input_filepath, output_filepath, output_format):
             "n_estimators": [10, 100, 200],
         }
 
-        gsearch = GridSearchCV(
-            estimator=XGBClassifier(
-                objective="binary:logistic",
-                eval_metric="error",
-                scale_pos_weight=scale_pos_weight,
-                seed=27,
-                use_label_encoder=False,
-            ),
-            param_grid=param_test,
-            scoring="roc_auc",
-            n_jobs=-1,
-            cv=8,
-            verbose=10,
+        estimator = XGBClassifier(
+            objective="binary:logistic",
+            eval_metric="error",
+            scale_pos_weight=scale_pos_weight,
+            seed=27,
+            use_label_encoder=False,
         )
 
+        if search == "grid":
+            outer, inner = split_jobs(n_jobs, len(ParameterGrid(param_test)) * 8)
+            gsearch = GridSearchCV(
+                estimator=estimator.set_params(n_jobs=inner),
+                param_grid=param_test,
+                scoring="roc_auc",
+                n_jobs=outer,
+                cv=8,
+                verbose=10,
+            )
+        else:
+            gsearch = XGBSearch(estimator, param_test, cv=8, n_jobs=n_jobs)
+
         gsearch.fit(train_x, train_y)
 
         best_params, best_score = gsearch.best_params_, gsearch.best_score_
@@ -82,79 +132,67 @@ def main(input_filepath, output_filepath, output_format):
             "Best Parameters: {} | Best AUC: {}".format(best_params, best_score)
         )
 
-        scale_pos_weight = (len(train_y) - train_y.sum()) / train_y.sum()
-        xgb_model = XGBClassifier(
-            objective="binary:logistic",
-            eval_metric="error",
-            scale_pos_weight=scale_pos_weight,
-            seed=27,
-            max_depth=best_params["max_depth"],
-            learning_rate=best_params["learning_rate"],
-            n_estimators=best_params["n_estimators"],
-            use_label_encoder=False,
+        cv_results_file = output_filepath + ".cv_results.csv"
+        logger.info(f"Saving search results to {cv_results_file}")
+        pd.DataFrame(gsearch.cv_results_).to_csv(cv_results_file, index=False)
+
+        # the search has already refit the best parameters on train_x
+        xgb_model: XGBClassifier = gsearch.best_estimator_
+
+        if refit_full:
+            logger.info("Refitting the best model on the full data set")
+            scale_pos_weight = (len(y_df) - y_df.sum()) / y_df.sum()
+            xgb_model = clone(xgb_model).set_params(scale_pos_weight=scale_pos_weight)
+            xgb_model.fit(X_df, y_df)
+
+        export_model(
+            xgb_model,
+            output_filepath,
+            output_format,
+            [
+                "NewCreditCustomer",
+                "Amount",
+                "Interest",
+                "LoanDuration",
+                "Education",
+                "NrOfDependants",
+                "EmploymentDurationCurrentEmployer",
+                "IncomeFromPrincipalEmployer",
+                "IncomeFromPension",
+                "IncomeFromFamilyAllowance",
+                "IncomeFromSocialWelfare",
+                "IncomeFromLeavePay",
+                "IncomeFromChildSupport",
+                "IncomeOther",
+                "ExistingLiabilities",
+                "RefinanceLiabilities",
+                "DebtToIncome",
+                "FreeCash",
+                "CreditScoreEeMini",
+                "NoOfPreviousLoansBeforeLoan",
+                "AmountOfPreviousLoansBeforeLoan",
+                "PreviousRepaymentsBeforeLoan",
+                "PreviousEarlyRepaymentsBefoleLoan",
+                "PreviousEarlyRepaymentsCountBeforeLoan",
+                "Council_house",
+                "Homeless",
+                "Joint_ownership",
+                "Joint_tenant",
+                "Living_with_parents",
+                "Mortgage",
+                "Other",
+                "Owner",
+                "Owner_with_encumbrance",
+                "Tenant",
+                "Entrepreneur",
+                "Fully",
+                "Partially",
+                "Retiree",
+                "Self_employed",
+            ],
+            "PaidLoan",
         )
 
-        xgb_model.fit(train_x, train_y)
-
-        if output_format == "json":
-            xgb_model.save_model(output_filepath + ".json")
-            logger.info("Saving model as JSON")
-        elif output_format == "ubj":
-            logger.info("Saving model as Universal Binary JSON (UBJ)")
-            xgb_model.save_model(output_filepath + ".ubj")
-        elif output_format == "pmml":
-            logger.info("Saving model as PMML")
-            pipeline = PMMLPipeline([("classifier", xgb_model)])
-            logger.info("Saving PMML model")
-            skl_to_pmml(
-                pipeline,
-                [
-                    "NewCreditCustomer",
-                    "Amount",
-                    "Interest",
-                    "LoanDuration",
-                    "Education",
-                    "NrOfDependants",
-                    "EmploymentDurationCurrentEmployer",
-                    "IncomeFromPrincipalEmployer",
-                    "IncomeFromPension",
-                    "IncomeFromFamilyAllowance",
-                    "IncomeFromSocialWelfare",
-                    "IncomeFromLeavePay",
-                    "IncomeFromChildSupport",
-                    "IncomeOther",
-                    "ExistingLiabilities",
-                    "RefinanceLiabilities",
-                    "DebtToIncome",
-                    "FreeCash",
-                    "CreditScoreEeMini",
-                    "NoOfPreviousLoansBeforeLoan",
-                    "AmountOfPreviousLoansBeforeLoan",
-                    "PreviousRepaymentsBeforeLoan",
-                    "PreviousEarlyRepaymentsBefoleLoan",
-                    "PreviousEarlyRepaymentsCountBeforeLoan",
-                    "Council_house",
-                    "Homeless",
-                    "Joint_ownership",
-                    "Joint_tenant",
-                    "Living_with_parents",
-                    "Mortgage",
-                    "Other",
-                    "Owner",
-                    "Owner_with_encumbrance",
-                    "Tenant",
-                    "Entrepreneur",
-                    "Fully",
-                    "Partially",
-                    "Retiree",
-                    "Self_employed",
-                ],
-                "PaidLoan",
-                output_filepath + ".pmml",
-            )
-        else:
-            raise ValueError(f"Format {output_format} not supported.")
-
 
 if __name__ == "__main__":
     log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
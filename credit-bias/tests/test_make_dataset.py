@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+
+from src.data.formats import frame_path, read_frame
+from src.data.make_dataset import CATEGORY_CODES, SELECTED_COLUMNS, main
+from src.features.build_features import replace_columns
+
+ROWS = 400
+CHUNKSIZE = 50
+
+
+def loan_data(rows=ROWS, seed=0):
+    """Raw LoanData with coded categoricals, -1 and 0 for missing values,
+    bool flags, dates as text and no WorkExperience in the first chunk.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {column: rng.integers(-1, 1000, rows) for column in SELECTED_COLUMNS}
+    )
+    for column in [
+        "ListedOnUTC",
+        "LoanDate",
+        "MaturityDate_Original",
+        "MaturityDate_Last",
+        "DateOfBirth",
+    ]:
+        days = pd.to_timedelta(rng.integers(0, 3000, rows), unit="D")
+        df[column] = (pd.Timestamp("2012-01-01") + days).strftime("%Y-%m-%d")
+    df["DefaultDate"] = np.where(rng.random(rows) < 0.3, "2019-05-01", None)
+    for column, codes in CATEGORY_CODES.items():
+        df[column] = rng.choice(list(codes) + [0, -1], rows)
+    df["LoanNumber"] = np.arange(rows)
+    df["NewCreditCustomer"] = rng.random(rows) < 0.5
+    df["Country"] = rng.choice(["EE", "FI"], rows, p=[0.9, 0.1])
+    df["Status"] = rng.choice(["Current", "Late", "Repaid"], rows, p=[0.1, 0.3, 0.6])
+    df["Age"] = rng.integers(18, 70, rows)
+    df["NrOfDependants"] = rng.choice(["0", "1", "2", "10Plus"], rows)
+    df["EmploymentDurationCurrentEmployer"] = rng.choice(
+        ["MoreThan5Years", "UpTo1Year", "TrialPeriod"], rows
+    )
+    df["WorkExperience"] = rng.choice(["LessThan2Years", "10To15Years"], rows)
+    df.loc[: CHUNKSIZE - 1, "WorkExperience"] = None
+    df["UserName"] = rng.choice(["a", "b", "c"], rows)
+    df["Interest"] = rng.uniform(5, 100, rows)
+    return df
+
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    loan_data().to_csv(raw / "LoanData.zip", index=False)
+    return raw
+
+
+@pytest.mark.parametrize("data_format", ["csv", "parquet"])
+def test_chunked_output_matches_one_shot(tmp_path, raw_dir, data_format):
+    frames = {}
+    for name, options in [("one_shot", []), ("chunked", ["-c", str(CHUNKSIZE)])]:
+        output = tmp_path / name
+        output.mkdir()
+        result = CliRunner().invoke(
+            main, [str(raw_dir), str(output), "-d", data_format, *options]
+        )
+        assert result.exit_code == 0, result.output
+        frames[name] = read_frame(frame_path(str(output), "data", data_format))
+    pd.testing.assert_frame_equal(frames["chunked"], frames["one_shot"])
+
+
+def test_new_credit_customers_encode_as_1(tmp_path, raw_dir):
+    result = CliRunner().invoke(main, [str(raw_dir), str(tmp_path)])
+    assert result.exit_code == 0, result.output
+    interim = read_frame(frame_path(str(tmp_path), "data"))
+    raw = loan_data().set_index("LoanNumber")
+    expected = raw.loc[interim["LoanNumber"], "NewCreditCustomer"].to_numpy()
+    encoded = replace_columns(interim)["NewCreditCustomer"]
+    np.testing.assert_array_equal(encoded.astype(int), expected.astype(int))
@@ -3,20 +3,19 @@ from pathlib import Path
 from dotenv import find_dotenv, load_dotenv
 import os
 import click
-from nyoka.skl.skl_to_pmml import skl_to_pmml
-import pandas as pd
 from sklearn.model_selection import train_test_split, RandomizedSearchCV
 from sklearn import preprocessing
 from sklearn.ensemble import RandomForestClassifier
-from sklearn2pmml.pipeline import PMMLPipeline
-from sklearn_pandas import DataFrameMapper
 from sklearn.pipeline import Pipeline
-from joblib import dump
 import numpy as np
-from sklearn2pmml import sklearn2pmml
+
+from src.data.formats import read_frame
+from src.models.export import EXPORT_FORMATS, export_model
 
 
 def build_RF_pipeline(inputs, outputs, categorical, numerical, rf=None):
+    from sklearn_pandas import DataFrameMapper
+
     if not rf:
         rf = RandomForestClassifier()
     pipeline = Pipeline(
@@ -81,27 +80,31 @@ def RF_estimation(
 @click.argument("input_data", type=click.Path(exists=True))
 @click.argument("output_data", type=click.Path())
 @click.argument("model_dest", type=click.Path())
-def main(input_data, output_data, model_dest):
+@click.option(
+    "-f",
+    "--format",
+    "formats",
+    type=click.Choice(list(EXPORT_FORMATS)),
+    multiple=True,
+    default=["joblib", "pmml"],
+    help="Model format to export, can be repeated.",
+)
+def main(input_data, output_data, model_dest, formats):
     logger = logging.getLogger(__name__)
     logger.info("Loading input and output data")
-    inputs = pd.read_csv(input_data)
-    outputs = pd.read_csv(output_data)
+    inputs = read_frame(input_data)
+    outputs = read_frame(output_data)
     X_train, X_test, y_train, y_test = train_test_split(
         inputs, outputs, test_size=0.4, random_state=23
     )
     model = RandomForestClassifier(verbose=True, max_depth=6, n_jobs=-1)
     logger.info("Fitting model")
     model.fit(X_train, y_train)
-    logger.info("Saving model")
-    dump(model, model_dest)
-
-    pipeline = PMMLPipeline(
-        [("classifier", model)]
-    )
 
-    logger.info("Saving PMML model")
-    skl_to_pmml(
-        pipeline,
+    export_model(
+        model,
+        model_dest,
+        formats,
         [
             "FLAG_OWN_CAR",
             "FLAG_OWN_REALTY",
@@ -112,7 +115,6 @@ def main(input_data, output_data, model_dest):
             "FLAG_WORK_PHONE",
         ],
         "APPROVED",
-        model_dest + ".pmml",
     )
 
 
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from src.data.make_dataset import (
+    calculate_approval_probabilities,
+    calculate_approval_probability,
+    calculate_approvals,
+)
+
+
+def applications(rows=2000, seed=0):
+    """Applicants on and around every boundary of the approval rules."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "AGE": rng.choice([18.0, 24.99, 25.0, 37.5, 49.99, 50.0, 70.0], rows),
+            "CNT_CHILDREN": rng.choice([0, 1, 2, 3, 5], rows),
+            "AMT_INCOME_TOTAL": rng.choice(
+                [5e4, 99999.0, 1e5, 199999.0, 2e5, 299999.0, 3e5, 9e5], rows
+            ),
+            "DAYS_EMPLOYED": rng.choice([-300, 0, 364, 365, 1999, 2000, 9000], rows),
+            "FLAG_OWN_REALTY": rng.choice([0.0, 1.0], rows),
+            "FLAG_OWN_CAR": rng.choice([0.0, 1.0], rows),
+        }
+    )
+
+
+def test_probabilities_match_row_wise():
+    df = applications()
+    expected = df.apply(calculate_approval_probability, axis=1).to_numpy()
+    np.testing.assert_array_equal(calculate_approval_probabilities(df), expected)
+
+
+def test_approvals_are_reproducible():
+    df = applications()
+    first = calculate_approvals(df, np.random.default_rng(42))
+    second = calculate_approvals(df, np.random.default_rng(42))
+    np.testing.assert_array_equal(first, second)
+    assert 0 < first.mean() < 1
@@ -6,11 +6,20 @@ from dotenv import find_dotenv, load_dotenv
 import os
 import pandas as pd
 
+from src.data.formats import FORMATS, frame_path, write_frame
+
 
 @click.command()
 @click.argument('input_filepath', type=click.Path(exists=True))
 @click.argument('output_filepath', type=click.Path())
-def main(input_filepath, output_filepath):
+@click.option(
+    '-d',
+    '--data_format',
+    type=click.Choice(list(FORMATS)),
+    default='csv',
+    help='File format of the exported data sets.',
+)
+def main(input_filepath, output_filepath, data_format):
     """ Runs data processing scripts to turn raw data from (../raw) into
         cleaned data ready to be analyzed (saved in ../processed).
     """
@@ -22,7 +31,7 @@ def main(input_filepath, output_filepath):
     df["female"] = df["sex"].map(lambda x: 1 if x == 1 else 0)
     df = df.drop(axis=1, columns=["sex"])
     df["LSAT"] = df["LSAT"].astype(int)
-    df.to_csv(os.path.join(output_filepath, "data.csv"), index=False)
+    write_frame(df, frame_path(output_filepath, "data", data_format))
 
 
 if __name__ == '__main__':
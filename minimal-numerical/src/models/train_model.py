@@ -2,26 +2,26 @@ import logging
 from pathlib import Path
 from dotenv import find_dotenv, load_dotenv
 import click
-import pandas as pd
 from sklearn.model_selection import train_test_split
-from joblib import dump
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn2pmml import sklearn2pmml
-from sklearn2pmml.pipeline import PMMLPipeline
-from nyoka import skl_to_pmml
+
+from src.data.formats import read_frame
+from src.models.export import EXPORT_FORMATS, export_model
 
 
 @click.command()
 @click.argument("input_data", type=click.Path(exists=True))
 @click.argument("output_data", type=click.Path())
 @click.argument("model_dest", type=click.Path())
-@click.argument("serialisation")
+@click.argument(
+    "serialisation", nargs=-1, required=True, type=click.Choice(list(EXPORT_FORMATS))
+)
 def main(input_data, output_data, model_dest, serialisation):
     logger = logging.getLogger(__name__)
     logger.info("Loading input and output data")
-    inputs = pd.read_csv(input_data)
-    outputs = pd.read_csv(output_data)
+    inputs = read_frame(input_data)
+    outputs = read_frame(output_data)
     X_train, X_test, y_train, y_test = train_test_split(
         inputs, outputs, test_size=0.4, random_state=23
     )
@@ -39,28 +39,13 @@ def main(input_data, output_data, model_dest, serialisation):
     logger.info("Fitting model")
     model = model.fit(X_train, y_train)
 
-
-    pipeline = PMMLPipeline(
-        [("classifier", RandomForestClassifier(verbose=True, n_jobs=-1))]
+    export_model(
+        model,
+        model_dest,
+        serialisation,
+        ["Age", "Debt", "YearsEmployed", "Income"],
+        "Approved",
     )
-    pipeline.fit(X_train, y_train)
-    pipeline.verify(X_test.sample(n=10))
-
-    if serialisation=="pmml":
-        logger.info("Saving PMML model")
-        # sklearn2pmml(pipeline, model_dest + ".pmml")
-        skl_to_pmml(
-            pipeline,
-            ["Age", "Debt", "YearsEmployed", "Income"],
-            "Approved",
-            model_dest + ".pmml",
-        )
-    elif serialisation=="joblib":
-        logger.info("Saving joblib model")
-        dump(model, model_dest + ".joblib")
-    elif serialisation=="dill":
-        pass
-
 
 
 if __name__ == "__main__":
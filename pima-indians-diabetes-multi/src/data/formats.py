@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# Generated from zoo/frames.py by `python -m zoo.vendor`, do not edit.
+"""Reading and writing the data sets of the projects, as CSV, Parquet or
+Feather files; the format follows the file extension.
+
+This is the one implementation of the projects' `src/data/formats.py`. They
+cannot import it (each is installed on its own, and every project package is
+called `src`), so `python -m zoo.vendor` copies it into every project and
+`python -m zoo.vendor --check` tells whether the copies are up to date.
+"""
+import os
+import shutil
+from typing import List, Sequence
+
+import pandas as pd
+
+FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+
+def frame_path(directory: str, name: str, data_format: str = "csv") -> str:
+    return os.path.join(directory, name + FORMATS[data_format])
+
+
+def find_frame(directory: str, name: str) -> str:
+    """The `name` data set of `directory` in whichever format it was written."""
+    for suffix in FORMATS.values():
+        path = os.path.join(directory, name + suffix)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No {name} data set in {directory}.")
+
+
+def read_frame(path: str, columns=None) -> pd.DataFrame:
+    suffix = os.path.splitext(path)[1]
+    if suffix == ".csv":
+        return pd.read_csv(path, usecols=columns)
+    elif suffix == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    elif suffix == ".feather":
+        return pd.read_feather(path, columns=columns)
+    else:
+        raise ValueError(f"Format {suffix} not supported.")
+
+
+def write_frame(df: pd.DataFrame, path: str, header: bool = True) -> str:
+    """Writes `df` to `path`, picking the format from the file extension.
+
+    Parquet and Feather keep the column dtypes (datetimes, bool, category),
+    so the next stage gets a binary read instead of re-parsing CSV text.
+    `header` only applies to CSV, whose parts written without one can be
+    concatenated by `join_parts`.
+    """
+    suffix = os.path.splitext(path)[1]
+    if suffix == ".csv":
+        df.to_csv(path, index=False, header=header)
+    elif suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    elif suffix == ".feather":
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        raise ValueError(f"Format {suffix} not supported.")
+    return path
+
+
+def iter_frames(path: str, chunksize: int, columns=None):
+    """Yields `path` as data frames of at most `chunksize` rows."""
+    suffix = os.path.splitext(path)[1]
+    if suffix == ".csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+    elif suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif suffix == ".feather":
+        import pyarrow.feather as feather
+
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Format {suffix} not supported.")
+
+
+class ChunkWriter:
+    """Appends data frames to a single CSV or Parquet file, one chunk at a
+    time, so a stage never has to hold its whole output in memory.
+
+    The Parquet schema is the one of the first chunk, later chunks are cast
+    to it. A text column without any value in the first chunk would be
+    typed null or double there, so the `text_columns` are always strings.
+    """
+
+    def __init__(self, path: str, text_columns: Sequence[str] = ()):
+        self.path = path
+        self.text_columns = list(text_columns)
+        self.suffix = os.path.splitext(path)[1]
+        if self.suffix not in (".csv", ".parquet"):
+            raise ValueError(f"Format {self.suffix} not supported for chunked output.")
+        self.rows = 0
+        self._writer = None
+
+    def write(self, df: pd.DataFrame):
+        if self.suffix == ".csv":
+            df.to_csv(
+                self.path,
+                mode="a" if self.rows else "w",
+                header=not self.rows,
+                index=False,
+            )
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                schema = table.schema
+                for column in self.text_columns:
+                    index = schema.get_field_index(column)
+                    schema = schema.set(index, pa.field(column, pa.string()))
+                self._writer = pq.ParquetWriter(self.path, schema)
+            table = table.cast(self._writer.schema)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def join_parts(parts: List[str], path: str, columns: List[str]) -> str:
+    """Concatenates data sets written by `write_frame` (CSV ones without
+    header) into `path`, in order, one part in memory at a time.
+    """
+    suffix = os.path.splitext(path)[1]
+    if suffix == ".csv":
+        with open(path, "w") as output:
+            output.write(pd.DataFrame(columns=columns).to_csv(index=False))
+        with open(path, "ab") as output:
+            for part in parts:
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, output, 1 << 20)
+        return path
+
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    writer, schema = None, None
+    try:
+        for part in parts:
+            if suffix == ".parquet":
+                table = pq.read_table(part)
+            else:
+                table = feather.read_table(part)
+            if writer is None:
+                schema = table.schema
+                if suffix == ".parquet":
+                    writer = pq.ParquetWriter(path, schema)
+                else:
+                    writer = pa.ipc.new_file(path, schema)
+            writer.write_table(table.cast(schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import click
+import logging
+import time
+from pathlib import Path
+from dotenv import find_dotenv, load_dotenv
+from joblib import load
+import pandas as pd
+
+from src.data.formats import ChunkWriter, iter_frames
+
+
+TARGETS = ["diabetespdegreefunction", "class"]
+
+
+def predict_chunk(model, chunk: pd.DataFrame) -> pd.DataFrame:
+    # regression model: there are no class probabilities to report
+    if chunk.empty:
+        return pd.DataFrame(columns=TARGETS, dtype=float)
+    features = getattr(model, "feature_names_in_", None)
+    inputs = chunk[features] if features is not None else chunk.to_numpy()
+    return pd.DataFrame(model.predict(inputs).reshape(len(chunk), -1), columns=TARGETS)
+
+
+@click.command()
+@click.argument("model_path", type=click.Path(exists=True))
+@click.argument("input_data", type=click.Path(exists=True))
+@click.argument("output_data", type=click.Path())
+@click.option(
+    "-c",
+    "--chunksize",
+    type=int,
+    default=100000,
+    help="Number of rows scored at a time.",
+)
+def main(model_path, input_data, output_data, chunksize):
+    """Scores `input_data` with a trained model, one chunk at a time, and
+    streams the predictions to `output_data` (csv or parquet).
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(f"Loading model {model_path}")
+    model = load(model_path)
+
+    logger.info(f"Scoring {input_data} in chunks of {chunksize} rows")
+    start = time.perf_counter()
+    with ChunkWriter(output_data) as writer:
+        for chunk in iter_frames(input_data, chunksize):
+            writer.write(predict_chunk(model, chunk))
+        if not writer.rows:
+            # an empty input still gets its (empty) predictions file
+            writer.write(predict_chunk(model, pd.DataFrame()))
+    elapsed = time.perf_counter() - start
+    rate = f" ({writer.rows / elapsed:.0f} rows/s)" if writer.rows else ""
+    logger.info(f"Scored {writer.rows} rows in {elapsed:.2f} s{rate}")
+
+
+if __name__ == "__main__":
+    log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    # not used in this stub but often useful for finding various files
+    project_dir = Path(__file__).resolve().parents[2]
+
+    # find .env automagically by walking up directories until it's found, then
+    # load up the .env entries as environment variables
+    load_dotenv(find_dotenv())
+
+    main()
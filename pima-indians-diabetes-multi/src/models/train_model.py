@@ -3,12 +3,13 @@ from pathlib import Path
 from dotenv import find_dotenv, load_dotenv
 import os
 import click
-import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.tree import DecisionTreeRegressor
 from joblib import dump
 import numpy as np
 
+from src.data.formats import read_frame
+
 
 @click.command()
 @click.argument("input_data", type=click.Path(exists=True))
@@ -17,8 +18,8 @@ import numpy as np
 def main(input_data, output_data, model_dest):
     logger = logging.getLogger(__name__)
     logger.info("Loading input and output data")
-    inputs = pd.read_csv(input_data)
-    outputs = pd.read_csv(output_data)
+    inputs = read_frame(input_data)
+    outputs = read_frame(output_data)
     X_train, X_test, y_train, y_test = train_test_split(
         inputs, outputs, test_size=0.4, random_state=23
     )
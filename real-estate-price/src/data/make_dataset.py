@@ -6,11 +6,20 @@ from dotenv import find_dotenv, load_dotenv
 import os
 import pandas as pd
 
+from src.data.formats import FORMATS, frame_path, write_frame
+
 
 @click.command()
 @click.argument("input_filepath", type=click.Path(exists=True))
 @click.argument("output_filepath", type=click.Path())
-def main(input_filepath, output_filepath):
+@click.option(
+    "-d",
+    "--data_format",
+    type=click.Choice(list(FORMATS)),
+    default="csv",
+    help="File format of the exported data sets.",
+)
+def main(input_filepath, output_filepath, data_format):
     """Runs data processing scripts to turn raw data from (../raw) into
     cleaned data ready to be analyzed (saved in ../processed).
     """
@@ -29,12 +38,12 @@ def main(input_filepath, output_filepath):
 
     outputs = df[["MEDV"]]
 
-    inputs_dest_file = os.path.join(output_filepath, "inputs.csv")
-    outputs_dest_file = os.path.join(output_filepath, "outputs.csv")
+    inputs_dest_file = frame_path(output_filepath, "inputs", data_format)
+    outputs_dest_file = frame_path(output_filepath, "outputs", data_format)
 
-    logger.info("exporting inputs.csv and outputs.csv")
-    inputs.to_csv(inputs_dest_file, index=False)
-    outputs.to_csv(outputs_dest_file, index=False)
+    logger.info(f"exporting inputs and outputs as {data_format}")
+    write_frame(inputs, inputs_dest_file)
+    write_frame(outputs, outputs_dest_file)
 
 
 if __name__ == "__main__":
@@ -3,24 +3,32 @@ from pathlib import Path
 from dotenv import find_dotenv, load_dotenv
 import os
 import click
-import pandas as pd
 from sklearn.model_selection import train_test_split
-from joblib import dump
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
-from sklearn2pmml import sklearn2pmml
-from sklearn2pmml.pipeline import PMMLPipeline
+
+from src.data.formats import read_frame
+from src.models.export import EXPORT_FORMATS, export_model
 
 
 @click.command()
 @click.argument("input_data", type=click.Path(exists=True))
 @click.argument("output_data", type=click.Path())
 @click.argument("model_dest", type=click.Path())
-def main(input_data, output_data, model_dest):
+@click.option(
+    "-f",
+    "--format",
+    "formats",
+    type=click.Choice(list(EXPORT_FORMATS)),
+    multiple=True,
+    default=["joblib", "pmml"],
+    help="Model format to export, can be repeated.",
+)
+def main(input_data, output_data, model_dest, formats):
     logger = logging.getLogger(__name__)
     logger.info("Loading input and output data")
-    inputs = pd.read_csv(input_data)
-    outputs = pd.read_csv(output_data)
+    inputs = read_frame(input_data)
+    outputs = read_frame(output_data)
     X_train, X_test, y_train, y_test = train_test_split(
         inputs, outputs, test_size=0.4, random_state=23
     )
@@ -30,18 +38,15 @@ def main(input_data, output_data, model_dest):
     logger.info("Fitting model")
     model.fit(X_train, y_train)
 
-    model.fit(X_train, y_train)
-    logger.info("Saving joblib model")
-    dump(model, model_dest + ".joblib")
-
-    pipeline = PMMLPipeline(
-        [("classifier", RandomForestRegressor(verbose=True, n_jobs=-1))]
+    export_model(
+        model,
+        model_dest,
+        formats,
+        list(inputs.columns),
+        outputs.columns[0],
+        pmml_backend="sklearn2pmml",
+        verification=X_test.sample(n=10),
     )
-    pipeline.fit(X_train, y_train)
-    pipeline.verify(X_test.sample(n=10))
-
-    logger.info("Saving PMML model")
-    sklearn2pmml(pipeline, model_dest + ".pmml")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from zoo.artifacts import Artifact
+from zoo.cache import CachedModel
+
+
+class Counting:
+    """A linear model that records the rows it scores."""
+
+    def __init__(self):
+        self.scored = []
+
+    def __call__(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        self.scored.append(len(X))
+        return X @ np.array([1.0, 10.0, 100.0])
+
+
+@pytest.fixture
+def model():
+    counting = Counting()
+    artifact = Artifact("model.joblib", counting, feature_names=["a", "b", "c"])
+    return CachedModel(artifact, maxsize=4), counting
+
+
+def test_hits_and_misses(model):
+    cached, counting = model
+    X = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+    np.testing.assert_allclose(cached.score(X), cached.artifact.score(X))
+    np.testing.assert_allclose(cached.score(X[::-1]), cached.artifact.score(X[::-1]))
+    assert counting.scored == [2, 2, 2]
+    info = cached.info()
+    assert (info["hits"], info["misses"], info["size"]) == (2, 2, 2)
+    assert info["hit_rate"] == 0.5
+
+
+def test_duplicate_rows_are_scored_once(model):
+    cached, counting = model
+    X = np.array([[1.0, 2.0, 3.0], [0.0, 0.0, 1.0], [1.0, 2.0, 3.0]])
+    np.testing.assert_allclose(cached.score(X), [[321.0], [100.0], [321.0]])
+    assert counting.scored == [2]
+    assert (cached.hits, cached.misses) == (1, 2)
+
+
+def test_least_recently_used_rows_are_evicted(model):
+    cached, counting = model
+    rows = np.arange(15, dtype=float).reshape(5, 3)
+    for i in range(4):
+        cached.score(rows[i : i + 1])
+    cached.score(rows[:1])  # row 0 becomes the most recently used
+    cached.score(rows[4:])  # evicts row 1
+    assert cached.info()["evictions"] == 1
+    counting.scored.clear()
+    cached.score(rows[[0, 2, 3, 4]])
+    assert counting.scored == []
+    cached.score(rows[1:2])
+    assert counting.scored == [1]
+
+
+def test_frames_are_matched_by_column_name(model):
+    cached, _ = model
+    X = pd.DataFrame([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], columns=["a", "b", "c"])
+    expected = cached.artifact.score(X)
+    np.testing.assert_allclose(cached.score(X[["c", "a", "b"]]), expected)
+    # answered from the cache, whatever the column order
+    np.testing.assert_allclose(cached.score(X), expected)
+    assert cached.info()["misses"] == 2
+    with pytest.raises(KeyError, match="'b'"):
+        cached.score(X[["a", "c"]])
+
+
+def test_empty_batch(model):
+    cached, _ = model
+    assert cached.score(np.empty((0, 3))).shape == (0, 1)
+    assert cached.info()["hits"] == cached.info()["misses"] == 0
+
+
+def test_clear(model):
+    cached, counting = model
+    X = np.ones((1, 3))
+    cached.score(X)
+    cached.clear()
+    assert cached.info()["size"] == cached.info()["hits"] == 0
+    cached.score(X)
+    assert counting.scored == [1, 1]
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import click
+import numpy as np
+import pandas as pd
+import pytest
+
+from zoo.fairness import (
+    encode_groups,
+    fairness_metrics,
+    fairness_report,
+    parse_attribute,
+)
+
+THRESHOLDS = [0.3, 0.5, 0.7]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(0)
+    rows = 2000
+    frame = pd.DataFrame(
+        {
+            "outcome": rng.integers(0, 2, size=rows),
+            "score": rng.random(rows).round(1),
+            "gender": rng.choice(["Male", "Female", "Unknown"], size=rows),
+        }
+    )
+    race = rng.choice(["Asian", "Black", "White"], size=rows)
+    for group in ["Asian", "Black", "White"]:
+        frame[group] = (race == group).astype(int)
+    frame.loc[::50, "score"] = np.nan
+    return frame
+
+
+def naive(labels, scores, groups, reference, thresholds):
+    """The metrics of every group and threshold, one comparison at a time."""
+    rows = {}
+    for threshold in thresholds:
+        rates = {}
+        for group in np.unique(groups):
+            y = labels[groups == group]
+            favorable = scores[groups == group] >= threshold
+            rates[group] = (
+                favorable.mean(),
+                favorable[y == 1].mean(),
+                favorable[y == 0].mean(),
+            )
+        selection, tpr, fpr = rates[reference]
+        for group, (s, t, f) in rates.items():
+            rows[group, threshold] = {
+                "selection_rate": s,
+                "tpr": t,
+                "fpr": f,
+                "spd": s - selection,
+                "di": s / selection,
+                "eod": t - tpr,
+                "aod": ((f - fpr) + (t - tpr)) / 2,
+            }
+    return rows
+
+
+def check(report, expected):
+    assert len(report) == len(expected)
+    for row in report.itertuples():
+        for name, value in expected[row.group, row.threshold].items():
+            assert getattr(row, name) == pytest.approx(value), (row.group, name)
+
+
+def test_metrics_match_a_naive_count(frame):
+    labels = frame["outcome"].to_numpy()
+    scores = frame["score"].fillna(0).to_numpy()
+    codes, names = encode_groups(
+        frame, {"columns": ["gender"], "groups": ["Male", "Female", "Unknown"]}
+    )
+    report = fairness_metrics(
+        labels, scores, {"gender": (codes, names, "Male")}, THRESHOLDS
+    )
+    groups = frame["gender"].to_numpy()
+    check(report, naive(labels, scores, groups, "Male", THRESHOLDS))
+    assert set(report["reference"]) == {"Male"}
+    reference = report[report["group"] == "Male"]
+    assert (reference["spd"] == 0).all() and (reference["di"] == 1).all()
+
+
+def test_report_leaves_out_rows_without_a_score(frame):
+    race = ["Asian", "Black", "White"]
+    attributes = {"race": {"columns": race, "reference": "White"}}
+    report = fairness_report(frame, "outcome", "score", attributes, THRESHOLDS)
+    scored = frame.dropna(subset=["score"])
+    groups = scored[race].idxmax(axis=1).to_numpy()
+    expected = naive(
+        scored["outcome"].to_numpy(),
+        scored["score"].to_numpy(),
+        groups,
+        "White",
+        THRESHOLDS,
+    )
+    check(report, expected)
+    assert report.groupby("group")["rows"].first().sum() == len(scored)
+
+
+def test_flipped_scores_and_favorable_label(frame):
+    flipped = frame.assign(score=1 - frame["score"], outcome=1 - frame["outcome"])
+    attributes = {"gender": {"columns": ["gender"], "reference": "Male"}}
+    expected = fairness_report(frame, "outcome", "score", attributes, THRESHOLDS)
+    report = fairness_report(
+        flipped, "outcome", "score", attributes, THRESHOLDS, favorable="0", flip=True
+    )
+    pd.testing.assert_frame_equal(report, expected)
+
+
+def test_encode_groups():
+    frame = pd.DataFrame(
+        {"sex": ["m", "f", "m", None], "a": [1, 0, 0, 0], "b": [0, 1, 0, 0]}
+    )
+    codes, names = encode_groups(frame, {"columns": ["sex"]})
+    assert names == ["f", "m"]
+    np.testing.assert_array_equal(codes, [1, 0, 1, -1])
+    codes, names = encode_groups(frame, {"columns": ["sex"], "groups": ["m", "x"]})
+    np.testing.assert_array_equal(codes, [0, -1, 0, -1])
+    # rows without a hot column have no group
+    codes, names = encode_groups(frame, {"columns": ["a", "b"]})
+    assert names == ["a", "b"]
+    np.testing.assert_array_equal(codes, [0, 1, -1, -1])
+
+
+def test_parse_attribute():
+    assert parse_attribute("Gender=Male") == (
+        "Gender",
+        {"columns": ["Gender"], "reference": "Male"},
+    )
+    assert parse_attribute("race=White:Asian,Black,White") == (
+        "race",
+        {"columns": ["Asian", "Black", "White"], "reference": "White"},
+    )
+    with pytest.raises(click.BadParameter):
+        parse_attribute("Gender")
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+
+from zoo.models import LAYOUT, compile_model, load_model, save_model
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(400, 5)), columns=list("abcde"))
+    X.iloc[::7, 2] = 0.0
+    return X, X["a"] + X["b"] * X["c"]
+
+
+@pytest.mark.parametrize(
+    "estimator",
+    [
+        RandomForestClassifier(20, max_depth=8, random_state=0),
+        Pipeline([("model", RandomForestClassifier(5, random_state=0))]),
+    ],
+)
+def test_classifier_matches_sklearn(data, estimator):
+    X, y = data
+    estimator.fit(X, (y > 0).astype(int) + (y > 1))
+    model = compile_model(estimator)
+    np.testing.assert_allclose(model.predict_proba(X), estimator.predict_proba(X))
+    np.testing.assert_array_equal(model.predict(X), estimator.predict(X))
+    # columns are matched by name
+    np.testing.assert_allclose(
+        model.predict_proba(X[X.columns[::-1]]), estimator.predict_proba(X)
+    )
+
+
+@pytest.mark.parametrize(
+    "estimator",
+    [ExtraTreesRegressor(10, random_state=0), DecisionTreeRegressor(random_state=0)],
+)
+def test_regressor_matches_sklearn(data, estimator):
+    X, y = data
+    estimator.fit(X.to_numpy(), y)
+    model = compile_model(estimator)
+    X = X.to_numpy()
+    np.testing.assert_allclose(model.predict(X), estimator.predict(X))
+
+
+def test_pipeline_with_transformers_is_refused(data):
+    X, y = data
+    pipeline = Pipeline(
+        [("scale", StandardScaler()), ("model", DecisionTreeRegressor())]
+    ).fit(X, y)
+    with pytest.raises(ValueError):
+        compile_model(pipeline)
+
+
+def test_saved_model_is_memory_mapped(tmp_path, data):
+    X, y = data
+    estimator = RandomForestClassifier(5, random_state=0).fit(X, y > 0)
+    path = save_model(compile_model(estimator), str(tmp_path / "model.trees.joblib"))
+    assert isinstance(joblib.load(path, mmap_mode="r")["ensemble"]["value"], np.memmap)
+    model = load_model(path)
+    # views of the read-only maps, not copies
+    for name, values in model.ensemble.to_arrays().items():
+        if isinstance(values, np.ndarray):
+            assert not values.flags.writeable, name
+    assert model.feature_names == list(X.columns)
+    np.testing.assert_allclose(model.predict_proba(X), estimator.predict_proba(X))
+
+
+def test_other_layouts_are_refused(tmp_path, data):
+    X, y = data
+    estimator = DecisionTreeRegressor(random_state=0).fit(X, y)
+    path = save_model(compile_model(estimator), str(tmp_path / "model.trees.joblib"))
+    artifact = joblib.load(path)
+    assert artifact["layout"] == LAYOUT
+    artifact["layout"] = "zoo.trees/1"
+    joblib.dump(artifact, path)
+    with pytest.raises(ValueError, match="compile it again"):
+        load_model(path)
+    # any other joblib file is returned as it was pickled
+    joblib.dump(estimator, str(tmp_path / "model.joblib"))
+    assert isinstance(load_model(str(tmp_path / "model.joblib")), DecisionTreeRegressor)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from zoo.fairness import fairness_report
+from zoo.monitor import ALL, FairnessMonitor
+
+ATTRIBUTES = {
+    "gender": {
+        "columns": ["gender"],
+        "groups": ["Male", "Female", "Unknown"],
+        "reference": "Male",
+    },
+    "race": {"columns": ["Asian", "Black", "White"], "reference": "White"},
+}
+
+
+def make_batch(rng, rows=200):
+    batch = pd.DataFrame(
+        {
+            "outcome": rng.integers(0, 2, size=rows),
+            "score": rng.random(rows),
+            "gender": rng.choice(["Male", "Female", "Unknown"], size=rows),
+        }
+    )
+    race = rng.choice(["Asian", "Black", "White"], size=rows)
+    for group in ["Asian", "Black", "White"]:
+        batch[group] = (race == group).astype(int)
+    batch.loc[rng.random(rows) < 0.05, "score"] = np.nan
+    return batch
+
+
+@pytest.fixture(scope="module")
+def batches():
+    rng = np.random.default_rng(0)
+    return [make_batch(rng) for _ in range(12)]
+
+
+def replay(batches, **kwargs):
+    monitor = FairnessMonitor(ATTRIBUTES, **kwargs)
+    for batch in batches:
+        monitor.update_frame(batch, "outcome", "score")
+    return monitor
+
+
+@pytest.mark.parametrize("window", [1, 3, 5])
+def test_windows_recount_the_last_batches(batches, window):
+    # the ring buffer wraps around more than once
+    monitor = replay(batches, capacity=5)
+    expected = replay(batches[-window:], capacity=5).counts()
+    np.testing.assert_array_equal(monitor.counts(window), expected)
+    np.testing.assert_array_equal(
+        monitor.counts(), replay(batches, capacity=20).counts()
+    )
+    with pytest.raises(ValueError):
+        monitor.counts(6)
+
+
+def test_metrics_match_the_fairness_report(batches):
+    monitor = replay(batches, capacity=5)
+    metrics = monitor.metrics(window=4).set_index(["attribute", "group"])
+    frame = pd.concat(batches[-4:], ignore_index=True)
+    report = fairness_report(frame, "outcome", "score", ATTRIBUTES, [0.5])
+    for row in report.itertuples():
+        found = metrics.loc[(row.attribute, row.group)]
+        assert found["rows"] == row.rows
+        for name, expected in [
+            ("selection_rate", row.selection_rate),
+            ("spd", row.spd),
+            ("dir", row.di),
+            ("eod", row.eod),
+        ]:
+            assert found[name] == pytest.approx(expected), (row.group, name)
+
+    scored = frame.dropna(subset=["score"])
+    overall = metrics.loc[(ALL, "all")]
+    assert overall["rows"] == len(scored)
+    accuracy = ((scored["score"] >= 0.5) == (scored["outcome"] == 1)).mean()
+    assert overall["accuracy"] == pytest.approx(accuracy)
+
+
+def test_rows_without_a_score_are_left_out(batches):
+    batch = batches[0]
+    monitor = replay([batch])
+    unscored = replay([batch.assign(score=np.nan)])
+    assert monitor.metrics().iloc[0]["rows"] == batch["score"].notna().sum()
+    assert not unscored.counts().any()
+
+
+def test_decayed_counts(batches):
+    monitor = replay(batches[:3], half_life=1)
+    expected = sum(
+        replay([batch]).counts() * 0.5**age
+        for age, batch in enumerate(reversed(batches[:3]))
+    )
+    np.testing.assert_allclose(monitor.decayed_counts(), expected)
+    with pytest.raises(ValueError):
+        replay(batches[:1]).decayed_counts()
+
+
+def test_missing_one_hot_columns_are_refused(batches):
+    monitor = FairnessMonitor(ATTRIBUTES)
+    with pytest.raises(KeyError, match=r"\['Black'\] of race"):
+        monitor.update_frame(batches[0].drop(columns="Black"), "outcome", "score")
+    assert monitor.batches == 0
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from zoo.orchestrate import Orchestrator
+
+# appends "<start> <end>" to a log shared by every stage
+STAGE = """import sys
+import time
+
+log, output, seconds = sys.argv[1:]
+start = time.time()
+time.sleep(float(seconds))
+with open(output, "w") as f:
+    f.write("done")
+with open(log, "a") as f:
+    f.write(f"{output} {start} {time.time()}\\n")
+"""
+
+
+def add_project(root, name, stages):
+    directory = root / name
+    directory.mkdir()
+    (directory / "stage.py").write_text(STAGE)
+    spec = {"stages": {}}
+    for stage, options in stages.items():
+        seconds = options.pop("seconds", 0.2)
+        spec["stages"][stage] = {
+            "cmd": f"{{python}} stage.py {root / 'runs.log'} {stage}.out {seconds}",
+            "deps": ["stage.py"],
+            "outs": [f"{stage}.out"],
+            **options,
+        }
+    (directory / "pipeline.json").write_text(json.dumps(spec))
+
+
+def intervals(root):
+    runs = {}
+    for line in (root / "runs.log").read_text().splitlines():
+        output, start, end = line.split()
+        runs.setdefault(output, []).append((float(start), float(end)))
+    return runs
+
+
+def overlap(a, b):
+    return a[0] < b[1] and b[0] < a[1]
+
+
+@pytest.fixture
+def root(tmp_path):
+    for name in ["one", "two", "three"]:
+        add_project(
+            tmp_path,
+            name,
+            {
+                "requirements": {"exclusive": True},
+                "data": {"needs": ["requirements"]},
+            },
+        )
+    return tmp_path
+
+
+def statuses(records):
+    return {(r["project"], r["stage"]): r["status"] for r in records}
+
+
+def test_installs_run_alone(root):
+    records = Orchestrator(["one", "two", "three"], cores=3, root=str(root)).run()
+    assert set(statuses(records).values()) == {"ran"}
+    runs = intervals(root)
+    installs = runs["requirements.out"]
+    assert len(installs) == 3
+    for i, install in enumerate(installs):
+        others = installs[i + 1 :] + runs["data.out"]
+        assert not any(overlap(install, other) for other in others)
+
+
+def test_projects_run_side_by_side(root):
+    for name in ["four", "five"]:
+        add_project(root, name, {"data": {"seconds": 0.5}})
+    Orchestrator(["four", "five"], cores=2, root=str(root)).run()
+    first, second = intervals(root)["data.out"]
+    assert overlap(first, second)
+
+
+def test_up_to_date_stages_are_skipped(root):
+    Orchestrator(["one"], root=str(root)).run()
+    records = Orchestrator(["one"], root=str(root)).run()
+    assert set(statuses(records).values()) == {"skipped"}
+
+
+def test_targets_only_build_their_projects(root):
+    add_project(root, "four", {"features": {}})
+    orchestrator = Orchestrator(
+        ["one", "four"], targets=["features"], root=str(root)
+    )
+    assert list(orchestrator.stages) == [("four", "features")]
+
+
+def test_failed_stage_blocks_what_needs_it(root):
+    (root / "two" / "stage.py").write_text("raise SystemExit(1)")
+    records = Orchestrator(["one", "two"], cores=2, root=str(root)).run()
+    assert statuses(records) == {
+        ("one", "requirements"): "ran",
+        ("one", "data"): "ran",
+        ("two", "requirements"): "failed",
+        ("two", "data"): "blocked",
+    }
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from zoo.artifacts import Artifact
+from zoo.perturb import FeatureStats, PerturbationScorer, PerturbationSpec
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(
+        {
+            "age": rng.integers(18, 80, size=500).astype(float),
+            "income": rng.normal(50.0, 10.0, size=500),
+            "flag": (rng.random(500) < 0.3).astype(float),
+        }
+    )
+    artifact = Artifact(
+        "model.joblib",
+        lambda X: np.asarray(X) @ np.array([1.0, 0.1, 5.0]),
+        feature_names=list(data.columns),
+    )
+    return PerturbationScorer(artifact, FeatureStats.fit(data))
+
+
+@pytest.mark.parametrize("kind", ["gaussian", "marginal", "background"])
+def test_first_row_is_the_instance(scorer, kind):
+    instance = {"age": 40.0, "income": 55.0, "flag": 1.0}
+    perturbations = scorer.perturb(instance, PerturbationSpec(kind, 200, seed=1))
+    np.testing.assert_array_equal(perturbations.rows[0], [40.0, 55.0, 1.0])
+    assert not perturbations.mask[0].any()
+    np.testing.assert_array_equal(
+        perturbations.mask, perturbations.rows != perturbations.rows[0]
+    )
+
+
+def test_only_the_selected_features_change(scorer):
+    # the instance is out of the range of the data in every feature
+    instance = [100.0, 500.0, 2.0]
+    spec = PerturbationSpec("gaussian", 500, features=["income"], seed=0)
+    perturbations = scorer.perturb(instance, spec)
+    rows, mask = perturbations.rows, perturbations.mask
+    np.testing.assert_array_equal(rows[:, [0, 2]], [[100.0, 2.0]] * 500)
+    assert not mask[:, [0, 2]].any()
+    stats = scorer.stats
+    assert rows[1:, 1].min() >= stats.minimum[1]
+    assert rows[1:, 1].max() <= stats.maximum[1]
+
+
+def test_gaussian_draws_discrete_and_integer_values(scorer):
+    perturbations = scorer.perturb(
+        [40.0, 55.0, 1.0], PerturbationSpec("gaussian", 1000, scale=0.5, seed=0)
+    )
+    rows = perturbations.rows
+    np.testing.assert_array_equal(rows[:, 0], np.rint(rows[:, 0]))
+    assert set(np.unique(rows[:, 2])) <= {0.0, 1.0}
+    assert rows[1:, 1].std() < scorer.stats.std[1]
+
+
+def test_background_values_come_from_background_rows(scorer):
+    spec = PerturbationSpec("background", 1000, probability=1.0, seed=0)
+    perturbations = scorer.perturb([40.0, 55.0, 1.0], spec)
+    background = {tuple(row) for row in scorer.stats.background}
+    assert {tuple(row) for row in perturbations.rows[1:]} <= background
+
+
+def test_seeds_are_reproducible(scorer):
+    instance = [40.0, 55.0, 1.0]
+    first = scorer.perturb(instance, PerturbationSpec("marginal", 100, seed=3))
+    second = scorer.perturb(instance, PerturbationSpec("marginal", 100, seed=3))
+    other = scorer.perturb(instance, PerturbationSpec("marginal", 100, seed=4))
+    np.testing.assert_array_equal(first.rows, second.rows)
+    assert not np.array_equal(first.rows, other.rows)
+
+
+def test_predictions_score_the_rows(scorer):
+    perturbations = scorer.score(
+        {"age": 40.0, "income": 55.0, "flag": 0.0}, PerturbationSpec(samples=300)
+    )
+    assert perturbations.predictions.shape == (300, 1)
+    np.testing.assert_allclose(
+        perturbations.predictions, scorer.artifact.score(perturbations.rows)
+    )
+
+
+def test_mismatched_features_are_refused(scorer):
+    artifact = Artifact("model.joblib", np.sum, feature_names=["age", "flag"])
+    with pytest.raises(ValueError):
+        PerturbationScorer(artifact, scorer.stats)
+    with pytest.raises(ValueError):
+        scorer.instance([1.0, 2.0])
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import pytest
+
+from zoo.pipeline import PipelineError, load_pipeline, plan, run
+
+STAGE = """import sys
+
+source, target, *suffix = sys.argv[1:]
+with open(source) as f:
+    text = f.read()
+with open(target, "w") as f:
+    f.write(text.upper() + "".join(suffix))
+with open("runs.log", "a") as f:
+    f.write(target + "\\n")
+"""
+
+
+@pytest.fixture
+def project(tmp_path):
+    spec = {
+        "params": {"suffix": "!"},
+        "stages": {
+            "data": {
+                "cmd": "{python} stage.py raw.txt data.txt {suffix}",
+                "deps": ["raw.txt", "stage.py"],
+                "outs": ["data.txt"],
+            },
+            "train": {
+                "cmd": "{python} stage.py data.txt model.txt",
+                "deps": ["data.txt"],
+                "outs": ["model.txt"],
+                "needs": ["data"],
+            },
+        },
+    }
+    (tmp_path / "pipeline.json").write_text(json.dumps(spec))
+    (tmp_path / "stage.py").write_text(STAGE)
+    (tmp_path / "raw.txt").write_text("rows")
+    return tmp_path
+
+
+def ran(project):
+    """The outputs written since the last call."""
+    log = project / "runs.log"
+    if not log.exists():
+        return []
+    runs = log.read_text().split()
+    log.unlink()
+    return runs
+
+
+def statuses(records):
+    return {record["stage"]: record["status"] for record in records}
+
+
+def test_unchanged_stages_are_skipped(project):
+    assert statuses(run(str(project))) == {"data": "ran", "train": "ran"}
+    assert ran(project) == ["data.txt", "model.txt"]
+    assert (project / "model.txt").read_text() == "ROWS!"
+
+    assert statuses(run(str(project))) == {"data": "skipped", "train": "skipped"}
+    assert ran(project) == []
+
+
+def test_only_changed_content_reruns(project):
+    run(str(project))
+    ran(project)
+    # a new mtime with the same content is not a change
+    os.utime(project / "raw.txt", (0, 0))
+    run(str(project))
+    assert ran(project) == []
+
+    (project / "raw.txt").write_text("more rows")
+    run(str(project))
+    assert ran(project) == ["data.txt", "model.txt"]
+
+
+def test_changed_outputs_rerun_their_stage(project):
+    run(str(project))
+    ran(project)
+    (project / "model.txt").write_text("edited")
+    assert statuses(run(str(project))) == {"data": "skipped", "train": "ran"}
+    (project / "data.txt").unlink()
+    run(str(project), ["data"])
+    assert ran(project) == ["model.txt", "data.txt"]
+
+
+def test_parameters_are_hashed(project):
+    run(str(project))
+    ran(project)
+    records = run(str(project), params={"suffix": "?"}, dry_run=True)
+    assert statuses(records) == {"data": "would run", "train": "skipped"}
+    assert ran(project) == []
+    run(str(project), params={"suffix": "?"})
+    assert (project / "model.txt").read_text() == "ROWS?"
+    # the outputs of "!" were overwritten, so they are built again
+    ran(project)
+    run(str(project))
+    assert ran(project) == ["data.txt", "model.txt"]
+
+
+def test_force_and_skip(project):
+    run(str(project))
+    ran(project)
+    records = run(str(project), force=True, skip=["data"])
+    assert statuses(records) == {"data": "skipped", "train": "ran"}
+    assert ran(project) == ["model.txt"]
+
+
+def test_failed_stage_is_not_recorded(project):
+    (project / "raw.txt").unlink()
+    with pytest.raises(PipelineError, match="data failed"):
+        run(str(project))
+    assert not (project / ".pipeline" / "data.json").exists()
+
+
+def test_plan_orders_needs_first(project):
+    stages = load_pipeline(str(project))["stages"]
+    assert plan(stages, ["train"]) == ["data", "train"]
+    assert plan(stages, ["data"]) == ["data"]
+    stages["data"]["needs"] = ["train"]
+    with pytest.raises(PipelineError, match="depends on itself"):
+        plan(stages)
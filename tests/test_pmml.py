@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+from zoo.pmml import load_pmml
+
+FEATURES = ["a", "b", "c", "d"]
+
+TREE = """<PMML xmlns="http://www.dmg.org/PMML-4_4" version="4.4">
+  <DataDictionary>
+    <DataField name="x" optype="continuous" dataType="double"/>
+    <DataField name="y" optype="continuous" dataType="double"/>
+  </DataDictionary>
+  <TreeModel functionName="regression">
+    <MiningSchema>
+      <MiningField name="x"/>
+      <MiningField name="y" usageType="target"/>
+    </MiningSchema>
+    <Node score="0">
+      <True/>
+      <Node score="1"><SimplePredicate field="x" operator="lessThan" value="1"/></Node>
+      <Node score="2">
+        <SimplePredicate field="x" operator="greaterOrEqual" value="3"/>
+      </Node>
+    </Node>
+  </TreeModel>
+</PMML>
+"""
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(500, len(FEATURES))), columns=FEATURES)
+    return X, X["a"] + X["b"] * X["c"]
+
+
+def export(model, path):
+    skl_to_pmml = pytest.importorskip("nyoka").skl_to_pmml
+    PMMLPipeline = pytest.importorskip("sklearn2pmml.pipeline").PMMLPipeline
+
+    skl_to_pmml(PMMLPipeline([("model", model)]), FEATURES, "y", str(path))
+    return load_pmml(str(path))
+
+
+def test_classifier_matches_sklearn(tmp_path, data):
+    X, y = data
+    model = RandomForestClassifier(10, max_depth=6, random_state=0).fit(X, y > 0)
+    pmml = export(model, tmp_path / "classifier.pmml")
+    assert pmml.ensemble.n_trees == 10
+    np.testing.assert_allclose(pmml.predict_proba(X), model.predict_proba(X))
+
+
+def test_regressor_matches_sklearn(tmp_path, data):
+    X, y = data
+    model = RandomForestRegressor(10, max_depth=6, random_state=0).fit(X, y)
+    pmml = export(model, tmp_path / "regressor.pmml")
+    np.testing.assert_allclose(pmml.predict(X), model.predict(X))
+
+
+def test_first_true_child_or_own_score(tmp_path):
+    path = tmp_path / "tree.pmml"
+    path.write_text(TREE)
+    model = load_pmml(str(path))
+    x = np.array([[0.5], [1.0], [2.0], [3.0], [5.0]])
+    np.testing.assert_array_equal(model.predict(x), [1, 0, 0, 2, 2])
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from zoo.artifacts import Artifact
+from zoo.serve import MicroBatcher, Server
+
+
+def weighted_sum(X):
+    return np.asarray(X) @ np.array([1.0, 2.0, 3.0])
+
+
+@pytest.fixture
+def artifact():
+    return Artifact("model.joblib", weighted_sum, feature_names=["a", "b", "c"])
+
+
+@pytest.fixture
+def server(artifact):
+    batchers = {"project/model.joblib": MicroBatcher(artifact, window_ms=20)}
+    server = Server(("127.0.0.1", 0), batchers)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def request(url, body=None):
+    data = None if body is None else json.dumps(body).encode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data)) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_concurrent_requests_are_batched(artifact):
+    batcher = MicroBatcher(artifact, window_ms=50)
+    rows = np.random.default_rng(0).normal(size=(16, 3))
+    results = [None] * len(rows)
+
+    def submit(i):
+        results[i] = batcher.submit(rows[i : i + 1])
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    np.testing.assert_allclose(np.concatenate(results), artifact.score(rows))
+    metrics = batcher.metrics()
+    assert metrics["requests"] == metrics["rows"] == len(rows)
+    assert metrics["batches"] < len(rows)
+    assert sum(metrics["batch_rows_histogram"].values()) == metrics["batches"]
+
+
+def test_batches_stop_at_max_rows(artifact):
+    batcher = MicroBatcher(artifact, window_ms=1000, max_rows=4)
+    result = batcher.submit(np.ones((4, 3)))
+    # a full batch is scored without waiting for the window
+    np.testing.assert_allclose(result, np.full((4, 1), 6.0))
+    assert batcher.metrics()["batches"] == 1
+
+
+def test_scoring_errors_reach_the_request():
+    def fail(X):
+        raise RuntimeError("broken model")
+
+    batcher = MicroBatcher(Artifact("model.joblib", fail), window_ms=0)
+    with pytest.raises(RuntimeError, match="broken model"):
+        batcher.submit(np.ones((1, 3)))
+
+
+def test_predict_rows_and_instances(server, artifact):
+    predict = f"{server}/models/project/model.joblib/predict"
+    rows = [[1.0, 0.0, 0.0], [0.5, 1.0, 2.0]]
+    status, body = request(predict, {"rows": rows})
+    assert status == 200
+    np.testing.assert_allclose(body["predictions"], artifact.score(np.array(rows)))
+
+    instances = [{"c": 2.0, "b": 1.0, "a": 0.5}]
+    status, body = request(predict, {"instances": instances})
+    assert status == 200
+    assert body["predictions"] == [[8.5]]
+
+
+def test_bad_requests(server):
+    predict = f"{server}/models/project/model.joblib/predict"
+    status, body = request(predict, {"rows": [[1.0, 2.0]]})
+    assert status == 400
+    assert "Expected 3 features" in body["error"]
+    assert request(predict, {"rows": []})[0] == 400
+    assert request(predict, {"instances": [{"a": 1.0}]})[0] == 400
+    assert request(f"{server}/models/other/predict", {"rows": [[1, 2, 3]]})[0] == 404
+
+
+def test_models_and_metrics(server):
+    request(f"{server}/models/project/model.joblib/predict", {"rows": [[1, 2, 3]]})
+    status, models = request(f"{server}/models")
+    assert status == 200
+    assert models["project/model.joblib"] == {
+        "format": "joblib",
+        "features": ["a", "b", "c"],
+        "n_features": 3,
+        "classes": None,
+    }
+    status, metrics = request(f"{server}/metrics")
+    assert status == 200
+    assert metrics["project/model.joblib"]["requests"] == 1
+    assert metrics["project/model.joblib"]["cache"] is None
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Loads the model artifacts written by the train_model stages, whatever
+their format, behind one scoring interface.
+
+    *.trees.joblib   zoo.models.load_model (memory-mapped compiled forest)
+    *.joblib         joblib.load, predict_proba (or predict)
+    *.json, *.ubj    xgboost.Booster, inplace_predict
+    *.pmml           zoo.pmml.load_pmml, NumPy evaluator
+"""
+import os
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+FORMATS = [
+    (".trees.joblib", "compiled"),
+    (".joblib", "joblib"),
+    (".json", "xgboost"),
+    (".ubj", "xgboost"),
+    (".pmml", "pmml"),
+]
+
+# modules that the runtime of each format imports
+RUNTIMES = {
+    "compiled": ["zoo.models"],
+    "joblib": ["joblib", "sklearn.ensemble", "sklearn.pipeline", "sklearn.tree"],
+    "xgboost": ["xgboost"],
+    "pmml": ["zoo.pmml"],
+}
+
+
+def artifact_format(path: str) -> Optional[str]:
+    for suffix, name in FORMATS:
+        if path.endswith(suffix):
+            return name
+    return None
+
+
+def find_artifacts(project_dir: str) -> List[str]:
+    """The model artifacts of a project's `models` directory."""
+    directory = os.path.join(project_dir, "models")
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if artifact_format(name) is not None
+    )
+
+
+class Artifact:
+    """A loaded model: `score` takes a 2-d array of rows (or a data frame)
+    and returns the class probabilities of a classifier, or the predictions
+    of a regressor, as a 2-d array.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        score: Callable,
+        feature_names: Optional[List[str]] = None,
+        n_features: Optional[int] = None,
+        classes: Optional[list] = None,
+        frame: bool = False,
+    ):
+        self.path = path
+        self.format = artifact_format(path)
+        self._score = score
+        self.feature_names = None if feature_names is None else list(feature_names)
+        if n_features is None and self.feature_names is not None:
+            n_features = len(self.feature_names)
+        self.n_features = n_features
+        self.classes = None if classes is None else np.asarray(classes).tolist()
+        # models fitted on named columns are given a data frame, so that
+        # scikit-learn does not warn on every call
+        self._frame = frame and self.feature_names is not None
+
+    def score(self, X) -> np.ndarray:
+        if self._frame and not isinstance(X, pd.DataFrame):
+            X = pd.DataFrame(X, columns=self.feature_names)
+        prediction = np.asarray(self._score(X))
+        if prediction.ndim == 1:
+            return prediction[:, None]
+        return prediction.reshape(len(prediction), np.prod(prediction.shape[1:]))
+
+
+def processed_inputs(
+    project_dir: str,
+    feature_names: Optional[List[str]],
+    n_features: Optional[int] = None,
+) -> Optional[pd.DataFrame]:
+    """The processed inputs (or training set) of a project with the features
+    of a model, in its order; None when the project has no such data.
+    """
+    from zoo.frames import find_frame, read_frame
+
+    processed = os.path.join(project_dir, "data", "processed")
+    for name in ("inputs", "train"):
+        try:
+            data = read_frame(find_frame(processed, name))
+            break
+        except FileNotFoundError:
+            continue
+    else:
+        return None
+    if feature_names is not None:
+        if set(feature_names).difference(data.columns):
+            return None
+        return data[list(feature_names)]
+    data = data.select_dtypes("number")
+    if n_features is not None and data.shape[1] != n_features:
+        return None
+    return data
+
+
+def load_artifact(path: str) -> Artifact:
+    kind = artifact_format(path)
+    if kind == "compiled":
+        from zoo.models import load_model
+
+        model = load_model(path)
+        score = model.predict if model.classes_ is None else model.predict_proba
+        return Artifact(
+            path, score, model.feature_names, model.n_features, model.classes_
+        )
+    if kind == "joblib":
+        import joblib
+
+        model = joblib.load(path)
+        classes = getattr(model, "classes_", None)
+        score = model.predict if classes is None else model.predict_proba
+        return Artifact(
+            path,
+            score,
+            getattr(model, "feature_names_in_", None),
+            getattr(model, "n_features_in_", None),
+            classes,
+            frame=True,
+        )
+    if kind == "xgboost":
+        import xgboost
+
+        booster = xgboost.Booster(model_file=path)
+        return Artifact(
+            path, booster.inplace_predict, booster.feature_names, booster.num_features()
+        )
+    if kind == "pmml":
+        from zoo.pmml import load_pmml
+
+        model = load_pmml(path)
+        score = model.predict if model.classes is None else model.predict_proba
+        return Artifact(path, score, model.feature_names, classes=model.classes)
+    raise ValueError(f"Artifact {path} not supported.")
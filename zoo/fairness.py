@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""Group fairness metrics of scored data sets, for many protected
+attributes and decision thresholds at once.
+
+Every group of a protected attribute is compared with the attribute's
+reference (privileged) group, at each threshold, a prediction being
+favorable when its score is at least the threshold:
+
+    spd   statistical parity difference, selection rate - reference's
+    di    disparate impact, selection rate / reference's
+    eod   equal opportunity difference, true positive rate - reference's
+    aod   average odds difference, mean of the false and true positive
+          rate differences
+
+The rows are counted once per attribute with a single `np.bincount` over
+(group, label, threshold bin) cells, where the bin of a score is the number
+of thresholds it reaches; the confusion matrices of all groups at all
+thresholds follow from cumulative sums of those counts. Counts are
+additive, so chunks of a larger data set can be counted apart and summed.
+
+`PROTECTED` lists the protected attributes of the fairness projects, given
+as one column (its values are the groups, or its listed "groups" in that
+order) or as one-hot columns (their names are the groups).
+
+    python -m zoo.fairness scored.parquet -l Default? --favorable 0 \\
+        -s score --flip -p bias-loan -t 0.3 -t 0.5 -t 0.7
+"""
+import logging
+from typing import Dict, Sequence, Tuple
+
+import click
+import numpy as np
+import pandas as pd
+
+from zoo.frames import read_frame, write_frame
+
+logger = logging.getLogger(__name__)
+
+PROTECTED = {
+    "law-data": {
+        "race": {
+            "columns": [
+                "Amerindian",
+                "Asian",
+                "Black",
+                "Hispanic",
+                "Mexican",
+                "Other",
+                "Puertorican",
+                "White",
+            ],
+            "reference": "White",
+        },
+        "sex": {"columns": ["female", "male"], "reference": "male"},
+    },
+    "bias-loan": {
+        "Male?": {"columns": ["Male?"], "groups": [0, 1], "reference": 1},
+        "Partnered?": {"columns": ["Partnered?"], "groups": [0, 1], "reference": 1},
+    },
+    "credit-bias": {
+        "Gender": {
+            "columns": ["Gender"],
+            "groups": ["Male", "Female", "Unknown"],
+            "reference": "Male",
+        },
+        "AgeGroup": {
+            "columns": ["AgeGroup"],
+            "groups": ["Under 40", "Over 40"],
+            "reference": "Over 40",
+        },
+    },
+}
+
+
+def encode_groups(frame: pd.DataFrame, spec: dict) -> Tuple[np.ndarray, list]:
+    """Group codes (-1 for rows without a group) and group names of one
+    protected attribute of `frame`.
+    """
+    columns = [column for column in spec["columns"] if column in frame.columns]
+    if not columns:
+        raise KeyError(f"None of the columns {spec['columns']} is in the data.")
+    if len(spec["columns"]) == 1 and "groups" in spec:
+        codes = pd.Categorical(frame[columns[0]], categories=spec["groups"]).codes
+        return codes.astype(np.int64), list(spec["groups"])
+    if len(spec["columns"]) == 1:
+        codes, uniques = pd.factorize(frame[columns[0]], sort=True)
+        return codes.astype(np.int64), list(uniques)
+    hot = frame[columns].to_numpy()
+    codes = np.where(hot.max(axis=1) > 0, hot.argmax(axis=1), -1)
+    return codes.astype(np.int64), columns
+
+
+def reference_code(groups: list, reference) -> int:
+    for code, group in enumerate(groups):
+        if group == reference or str(group) == str(reference):
+            return code
+    raise KeyError(f"Reference group {reference} not found in {groups}.")
+
+
+def threshold_cells(
+    labels: np.ndarray, scores: np.ndarray, thresholds: np.ndarray
+) -> np.ndarray:
+    """The (label, threshold bin) cell of every row, label * (T + 1) + bin."""
+    bins = np.searchsorted(thresholds, scores, side="right")
+    return np.asarray(labels, dtype=np.int64) * (len(thresholds) + 1) + bins
+
+
+def group_counts(
+    codes: np.ndarray, n_groups: int, cells: np.ndarray, n_thresholds: int
+) -> np.ndarray:
+    """Rows per group, label and threshold bin: (groups, 2, T + 1). Rows with
+    a group code of -1 are not counted.
+    """
+    width = 2 * (n_thresholds + 1)
+    counts = np.bincount((codes + 1) * width + cells, minlength=(n_groups + 1) * width)
+    return counts.reshape(n_groups + 1, 2, n_thresholds + 1)[1:]
+
+
+def group_rates(counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """Size, selection rate and true and false positive rates of every
+    group at every threshold (groups x T) from `group_counts`.
+    """
+    # favorable predictions at threshold k: the rows of bins k + 1 and up
+    predicted = np.cumsum(counts[..., ::-1], axis=-1)[..., ::-1][..., 1:]
+    totals = counts.sum(axis=-1)
+    size = totals.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "rows": np.repeat(size[:, None], predicted.shape[-1], axis=1),
+            "selection_rate": predicted.sum(axis=1) / size[:, None],
+            "tpr": predicted[:, 1] / totals[:, 1, None],
+            "fpr": predicted[:, 0] / totals[:, 0, None],
+        }
+
+
+def compare_groups(
+    rates: Dict[str, np.ndarray], reference: int
+) -> Dict[str, np.ndarray]:
+    """The metrics of every group against the `reference` group."""
+    selection = rates["selection_rate"]
+    tpr, fpr = rates["tpr"], rates["fpr"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "spd": selection - selection[reference],
+            "di": selection / selection[reference],
+            "eod": tpr - tpr[reference],
+            "aod": ((fpr - fpr[reference]) + (tpr - tpr[reference])) / 2,
+        }
+
+
+def fairness_metrics(
+    labels: np.ndarray,
+    scores: np.ndarray,
+    groups: Dict[str, Tuple[np.ndarray, list, object]],
+    thresholds: Sequence[float],
+) -> pd.DataFrame:
+    """One row per attribute, group and threshold.
+
+    `labels` are 1 for the favorable outcome, `scores` those of the
+    favorable outcome, and `groups` maps every protected attribute to its
+    group codes, group names and reference group.
+    """
+    thresholds = np.sort(np.asarray(thresholds, dtype=np.float64))
+    cells = threshold_cells(labels, scores, thresholds)
+    frames = []
+    for attribute, (codes, names, reference) in groups.items():
+        counts = group_counts(codes, len(names), cells, len(thresholds))
+        rates = group_rates(counts)
+        metrics = compare_groups(rates, reference_code(names, reference))
+        shape = rates["rows"].shape
+        frames.append(
+            pd.DataFrame(
+                {
+                    "attribute": attribute,
+                    "group": np.repeat(np.asarray(names, dtype=object), shape[1]),
+                    "reference": str(reference),
+                    "threshold": np.tile(thresholds, shape[0]),
+                    **{name: values.ravel() for name, values in rates.items()},
+                    **{name: values.ravel() for name, values in metrics.items()},
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def fairness_report(
+    frame: pd.DataFrame,
+    label: str,
+    score: str,
+    attributes: Dict[str, dict],
+    thresholds: Sequence[float],
+    favorable=1,
+    flip: bool = False,
+) -> pd.DataFrame:
+    """`fairness_metrics` of a scored data set. `flip` tells that `score` is
+    the score of the unfavorable outcome.
+    """
+    outcome = frame[label]
+    if isinstance(favorable, str) and pd.api.types.is_numeric_dtype(outcome):
+        favorable = float(favorable)
+    labels = (outcome == favorable).to_numpy()
+    scores = frame[score].to_numpy(dtype=np.float64)
+    if flip:
+        scores = 1 - scores
+    # rows without a score are left out
+    scored = ~np.isnan(scores)
+    groups = {}
+    for attribute, spec in attributes.items():
+        codes, names = encode_groups(frame, spec)
+        groups[attribute] = (codes[scored], names, spec["reference"])
+    labels, scores = labels[scored], scores[scored]
+    return fairness_metrics(labels, scores, groups, thresholds)
+
+
+def parse_attribute(value: str) -> Tuple[str, dict]:
+    """COLUMN=REFERENCE, or NAME=REFERENCE:COLUMN,COLUMN,... for one-hot
+    columns.
+    """
+    name, _, reference = value.partition("=")
+    reference, _, columns = reference.partition(":")
+    if not reference:
+        raise click.BadParameter(f"{value} has no reference group.")
+    return name, {
+        "columns": columns.split(",") if columns else [name],
+        "reference": reference,
+    }
+
+
+@click.command()
+@click.argument("data", type=click.Path(exists=True, dir_okay=False))
+@click.option("-l", "--label", required=True, help="Column of the outcome.")
+@click.option("--favorable", default="1", help="Favorable value of the label.")
+@click.option("-s", "--score", required=True, help="Column of the scores.")
+@click.option(
+    "--flip", is_flag=True, help="The scores are of the unfavorable outcome."
+)
+@click.option(
+    "-p",
+    "--project",
+    type=click.Choice(list(PROTECTED)),
+    help="Protected attributes of a fairness project.",
+)
+@click.option(
+    "-a",
+    "--attribute",
+    "attributes",
+    multiple=True,
+    help="COLUMN=REFERENCE (or NAME=REFERENCE:COLUMN,... for one-hot columns), "
+    "can be repeated.",
+)
+@click.option(
+    "-t",
+    "--threshold",
+    "thresholds",
+    type=float,
+    multiple=True,
+    default=[0.5],
+    help="Can be repeated.",
+)
+@click.option("-o", "--output", type=click.Path(), help="Metrics file.")
+def main(
+    data,
+    label,
+    favorable,
+    score,
+    flip,
+    project,
+    attributes,
+    thresholds,
+    output,
+):
+    """Computes the group fairness metrics of the scored data set DATA."""
+    protected: Dict[str, dict] = dict(PROTECTED.get(project, {}))
+    protected.update(parse_attribute(value) for value in attributes)
+    if not protected:
+        raise click.UsageError("Give a --project or an --attribute.")
+    frame = read_frame(data)
+    try:
+        report = fairness_report(
+            frame, label, score, protected, thresholds, favorable, flip
+        )
+    except KeyError as e:
+        raise click.ClickException(str(e))
+    logger.info(f"{len(frame)} rows, {len(protected)} attributes")
+    with pd.option_context("display.width", 160, "display.max_rows", None):
+        click.echo(report.to_string(index=False, float_format="{:.3f}".format))
+    if output:
+        write_frame(report, output)
+        logger.info(f"Metrics written to {output}")
+
+
+if __name__ == "__main__":
+    log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
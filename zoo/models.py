@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""Compiled, memory-mappable model artifacts.
+
+A pickled scikit-learn forest cannot be shared between processes: even when
+it is loaded with `joblib.load(..., mmap_mode="r")`, every tree copies its
+node arrays into its own heap buffers. `compile_model` flattens a fitted
+forest into a few contiguous arrays (see `zoo.trees.TreeEnsemble`) that
+`save_model` writes uncompressed, so that `load_model` can memory-map them
+and N scoring processes share one page-cache copy of the model.
+
+    python -m zoo.models bias-loan/models/bias-loan.joblib \\
+        -c bias-loan/data/processed/inputs.csv
+"""
+import logging
+import os
+import time
+from typing import List, Optional
+
+import click
+import joblib
+import numpy as np
+import pandas as pd
+
+from zoo.trees import LEAF, TreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+# version 2: leaves are their own children
+LAYOUT = "zoo.trees/2"
+SUFFIX = ".trees.joblib"
+
+
+class CompiledModel:
+    """A scikit-learn forest or tree compiled into a `TreeEnsemble`, with the
+    `predict` / `predict_proba` interface of the original estimator.
+    """
+
+    def __init__(
+        self,
+        ensemble: TreeEnsemble,
+        classes: Optional[np.ndarray] = None,
+        feature_names: Optional[List[str]] = None,
+        n_features: Optional[int] = None,
+    ):
+        self.ensemble = ensemble
+        self.classes_ = None if classes is None else np.asarray(classes)
+        self.feature_names = feature_names
+        self.n_features = n_features
+
+    def _matrix(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame) and self.feature_names is not None:
+            # selecting the columns costs more than scoring a few rows
+            if list(X.columns) != self.feature_names:
+                X = X[self.feature_names]
+        # scikit-learn compares float32 inputs with its thresholds
+        return np.asarray(X, dtype=np.float32)
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.classes_ is None:
+            raise ValueError("predict_proba requires a classifier.")
+        return self.ensemble.predict(self._matrix(X))
+
+    def predict(self, X) -> np.ndarray:
+        prediction = self.ensemble.predict(self._matrix(X))
+        if self.classes_ is not None:
+            return self.classes_[prediction.argmax(axis=1)]
+        if prediction.shape[1] == 1:
+            return prediction[:, 0]
+        return prediction
+
+
+def _final_estimator(estimator):
+    """Unwraps a pipeline whose only non-passthrough step is the model."""
+    from sklearn.pipeline import Pipeline
+
+    if isinstance(estimator, Pipeline):
+        steps = [step for _, step in estimator.steps[:-1]]
+        if any(step not in (None, "passthrough") for step in steps):
+            raise ValueError("Pipelines with transformers are not supported.")
+        return _final_estimator(estimator.steps[-1][1])
+    return estimator
+
+
+def from_sklearn(estimator) -> TreeEnsemble:
+    """Compiles a fitted scikit-learn random forest, extra-trees model or
+    single decision tree.
+
+    Classifier leaves hold the class probabilities of their tree, regressor
+    leaves the predicted targets (one per output). Only single-output
+    classifiers are supported.
+    """
+    from sklearn.base import is_classifier
+    from sklearn.ensemble import (
+        ExtraTreesClassifier,
+        ExtraTreesRegressor,
+        RandomForestClassifier,
+        RandomForestRegressor,
+    )
+    from sklearn.tree import BaseDecisionTree
+    from sklearn.tree._tree import TREE_LEAF
+
+    forests = (
+        RandomForestClassifier,
+        RandomForestRegressor,
+        ExtraTreesClassifier,
+        ExtraTreesRegressor,
+    )
+    if isinstance(estimator, forests):
+        estimators = estimator.estimators_
+    elif isinstance(estimator, BaseDecisionTree):
+        estimators = [estimator]
+    else:
+        raise ValueError(f"Estimator {type(estimator).__name__} not supported.")
+    classifier = is_classifier(estimator)
+    if classifier and estimator.n_outputs_ > 1:
+        raise ValueError("Multi-output classifiers are not supported.")
+
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in (tree_estimator.tree_ for tree_estimator in estimators):
+        leaf = tree.children_left == TREE_LEAF
+        feature.append(np.where(leaf, LEAF, tree.feature))
+        threshold.append(np.where(leaf, np.nan, tree.threshold))
+        index = np.arange(tree.node_count) + offset
+        left.append(np.where(leaf, index, tree.children_left + offset))
+        right.append(np.where(leaf, index, tree.children_right + offset))
+        if classifier:
+            counts = tree.value[:, 0, :]
+            total = counts.sum(axis=1, keepdims=True)
+            value.append(counts / np.where(total == 0, 1, total))
+        else:
+            value.append(tree.value[:, :, 0])
+        roots.append(offset)
+        offset += tree.node_count
+
+    return TreeEnsemble(
+        np.concatenate(feature),
+        np.concatenate(threshold),
+        np.concatenate(left),
+        np.concatenate(right),
+        np.concatenate(value),
+        roots,
+        max_depth=max(e.tree_.max_depth for e in estimators),
+    )
+
+
+def compile_model(estimator) -> CompiledModel:
+    from sklearn.base import is_classifier
+
+    estimator = _final_estimator(estimator)
+    feature_names = getattr(estimator, "feature_names_in_", None)
+    return CompiledModel(
+        from_sklearn(estimator),
+        classes=estimator.classes_ if is_classifier(estimator) else None,
+        feature_names=None if feature_names is None else list(feature_names),
+        n_features=estimator.n_features_in_,
+    )
+
+
+def save_model(model: CompiledModel, path: str) -> str:
+    """Writes a compiled model without compression, so that every node
+    array can be memory-mapped by `load_model`.
+    """
+    artifact = {
+        "layout": LAYOUT,
+        "ensemble": model.ensemble.to_arrays(),
+        "classes": model.classes_,
+        "feature_names": model.feature_names,
+        "n_features": model.n_features,
+    }
+    joblib.dump(artifact, path, compress=0)
+    return path
+
+
+def load_model(path: str, mmap_mode: Optional[str] = "r"):
+    """Loads a model artifact.
+
+    Compiled artifacts come back as a `CompiledModel` whose node arrays are
+    read-only memory maps of the file (with the default `mmap_mode`); any
+    other joblib file is returned as it was pickled. Artifacts of an older
+    layout have to be compiled again.
+    """
+    artifact = joblib.load(path, mmap_mode=mmap_mode)
+    if not (isinstance(artifact, dict) and "layout" in artifact):
+        return artifact
+    if artifact["layout"] != LAYOUT:
+        raise ValueError(
+            f"{path} has layout {artifact['layout']}, expected {LAYOUT}; "
+            "compile it again with python -m zoo.models."
+        )
+    return CompiledModel(
+        TreeEnsemble(**artifact["ensemble"]),
+        classes=artifact["classes"],
+        feature_names=artifact["feature_names"],
+        n_features=artifact["n_features"],
+    )
+
+
+def compiled_path(model_path: str) -> str:
+    root, _ = os.path.splitext(model_path)
+    return root + SUFFIX
+
+
+@click.command()
+@click.argument("model_path", type=click.Path(exists=True))
+@click.option("-o", "--output", type=click.Path(), help=f"Defaults to *{SUFFIX}.")
+@click.option(
+    "-c",
+    "--check",
+    type=click.Path(exists=True),
+    help="Data set used to compare the compiled and original predictions.",
+)
+def main(model_path, output, check):
+    """Compiles the forest or tree in a joblib artifact into a memory-mappable
+    one.
+    """
+    estimator = joblib.load(model_path)
+    start = time.perf_counter()
+    model = compile_model(estimator)
+    output = save_model(model, output or compiled_path(model_path))
+    logger.info(
+        f"Compiled {model.ensemble.n_trees} trees "
+        f"({len(model.ensemble.feature)} nodes) into {output} "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
+
+    if check:
+        inputs = pd.read_csv(check)
+        if model.feature_names is None:
+            inputs = inputs.iloc[:, : model.n_features].to_numpy()
+        compiled = load_model(output)
+        if model.classes_ is None:
+            difference = np.abs(compiled.predict(inputs) - estimator.predict(inputs))
+        else:
+            difference = np.abs(
+                compiled.predict_proba(inputs) - estimator.predict_proba(inputs)
+            )
+        logger.info(f"Max absolute difference on {check}: {difference.max():.3g}")
+
+
+if __name__ == "__main__":
+    log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
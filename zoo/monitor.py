@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""Fairness and accuracy of scored traffic over sliding windows.
+
+`FairnessMonitor` keeps the confusion counts (label x decision) of every
+group of the protected attributes, and of all rows, in one vector per
+batch. `update` counts a batch with one `np.bincount` per attribute (see
+`zoo.fairness`) and adds it to a running total, which is stored in a ring
+buffer of the last `capacity` batches. The counts of the last k batches
+are the running total minus the one stored k batches ago, so a window of
+any length up to `capacity` is queried in constant time, however long the
+history. With a `half_life` (in batches) the monitor also keeps
+exponentially decayed counts.
+
+`metrics` turns counts into the accuracy, selection rate, statistical
+parity difference (spd), disparate impact ratio (dir) and equal
+opportunity difference (eod) of every group against its attribute's
+reference group.
+
+    monitor = FairnessMonitor(PROTECTED["credit-bias"], capacity=1000)
+    monitor.update_frame(batch, "PaidLoan", "score")
+    monitor.metrics(window=100)
+
+    python -m zoo.monitor scored.csv -l PaidLoan -s score -p credit-bias \\
+        --batch_rows 1000 -w 10 -w 100 --half_life 50
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import click
+import numpy as np
+import pandas as pd
+
+from zoo.fairness import (
+    PROTECTED,
+    encode_groups,
+    group_counts,
+    parse_attribute,
+    reference_code,
+    threshold_cells,
+)
+from zoo.frames import read_frame
+
+logger = logging.getLogger(__name__)
+
+# pseudo attribute of a single group with every row
+ALL = "(all)"
+
+
+class FairnessMonitor:
+    def __init__(
+        self,
+        attributes: Dict[str, dict],
+        threshold: float = 0.5,
+        capacity: int = 1000,
+        half_life: Optional[float] = None,
+    ):
+        """`attributes` as in `zoo.fairness.PROTECTED`; their groups must be
+        known up front, from their "groups" or their one-hot columns.
+        """
+        self.attributes = dict(attributes)
+        self.threshold = np.array([threshold], dtype=np.float64)
+        self.groups: Dict[str, list] = {ALL: ["all"]}
+        self.references: Dict[str, int] = {ALL: 0}
+        for name, spec in self.attributes.items():
+            groups = spec.get("groups", spec["columns"])
+            if len(groups) < 2:
+                raise ValueError(f"The groups of {name} are not known.")
+            self.groups[name] = list(groups)
+            self.references[name] = reference_code(groups, spec["reference"])
+        # every attribute has (groups, label, decision) cells in the count
+        # vectors, from its offset on
+        self.offsets: Dict[str, int] = {}
+        size = 0
+        for name, groups in self.groups.items():
+            self.offsets[name] = size
+            size += len(groups) * 4
+
+        self.capacity = capacity
+        self.batches = 0
+        self.total = np.zeros(size, dtype=np.int64)
+        # running totals after each of the last `capacity` batches; slot
+        # b % (capacity + 1) holds the total after batch b
+        self._history = np.zeros((capacity + 1, size), dtype=np.int64)
+        self.decay = None if half_life is None else 0.5 ** (1 / half_life)
+        self.decayed = np.zeros(size, dtype=np.float64)
+        self._lock = threading.Lock()
+
+    def update(
+        self,
+        labels: np.ndarray,
+        scores: np.ndarray,
+        codes: Dict[str, np.ndarray],
+    ):
+        """Counts one batch: favorable `labels` (0/1), `scores` of the
+        favorable outcome and the group codes of every attribute (-1 for
+        rows without a group). Rows without a score are left out.
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        scored = ~np.isnan(scores)
+        labels, scores = np.asarray(labels)[scored], scores[scored]
+        cells = threshold_cells(labels, scores, self.threshold)
+        counts = np.empty_like(self.total)
+        for name, groups in self.groups.items():
+            if name == ALL:
+                group_codes = np.zeros(len(cells), dtype=np.int64)
+            else:
+                group_codes = np.asarray(codes[name])[scored]
+            offset = self.offsets[name]
+            counts[offset : offset + len(groups) * 4] = group_counts(
+                group_codes, len(groups), cells, 1
+            ).ravel()
+        with self._lock:
+            self.total += counts
+            self.batches += 1
+            self._history[self.batches % (self.capacity + 1)] = self.total
+            if self.decay is not None:
+                self.decayed *= self.decay
+                self.decayed += counts
+
+    def update_frame(
+        self, frame: pd.DataFrame, label: str, score: str, favorable=1, flip=False
+    ):
+        """Counts one batch of a scored data set, as `zoo.fairness` reads
+        them. The batch must have every column of the attributes: a missing
+        one-hot column would move its rows to another group or to none.
+        """
+        for name, spec in self.attributes.items():
+            missing = [c for c in spec["columns"] if c not in frame.columns]
+            if missing:
+                raise KeyError(f"The batch has no columns {missing} of {name}.")
+        labels = (frame[label] == favorable).to_numpy()
+        scores = frame[score].to_numpy(dtype=np.float64)
+        if flip:
+            scores = 1 - scores
+        codes = {
+            name: encode_groups(frame, spec)[0]
+            for name, spec in self.attributes.items()
+        }
+        self.update(labels, scores, codes)
+
+    def counts(self, window: Optional[int] = None) -> np.ndarray:
+        """Counts of the last `window` batches (all of them by default)."""
+        with self._lock:
+            if window is None or window >= self.batches:
+                return self.total.copy()
+            if window > self.capacity:
+                raise ValueError(f"Windows are at most {self.capacity} batches.")
+            start = self._history[(self.batches - window) % (self.capacity + 1)]
+            return self.total - start
+
+    def decayed_counts(self) -> np.ndarray:
+        if self.decay is None:
+            raise ValueError("The monitor has no half-life.")
+        with self._lock:
+            return self.decayed.copy()
+
+    def metrics(
+        self, window: Optional[int] = None, decayed: bool = False
+    ) -> pd.DataFrame:
+        """One row per attribute and group, for the last `window` batches or
+        from the decayed counts.
+        """
+        counts = self.decayed_counts() if decayed else self.counts(window)
+        frames = []
+        for name, groups in self.groups.items():
+            offset = self.offsets[name]
+            # (groups, label, decision)
+            c = counts[offset : offset + len(groups) * 4].reshape(-1, 2, 2)
+            rows = c.sum(axis=(1, 2))
+            reference = self.references[name]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                accuracy = (c[:, 0, 0] + c[:, 1, 1]) / rows
+                selection = c[:, :, 1].sum(axis=1) / rows
+                tpr = c[:, 1, 1] / c[:, 1].sum(axis=1)
+                frames.append(
+                    pd.DataFrame(
+                        {
+                            "attribute": name,
+                            "group": groups,
+                            "reference": groups[reference],
+                            "rows": rows,
+                            "accuracy": accuracy,
+                            "selection_rate": selection,
+                            "spd": selection - selection[reference],
+                            "dir": selection / selection[reference],
+                            "eod": tpr - tpr[reference],
+                        }
+                    )
+                )
+        return pd.concat(frames, ignore_index=True)
+
+
+@click.command()
+@click.argument("data", type=click.Path(exists=True, dir_okay=False))
+@click.option("-l", "--label", required=True, help="Column of the outcome.")
+@click.option("--favorable", default="1", help="Favorable value of the label.")
+@click.option("-s", "--score", required=True, help="Column of the scores.")
+@click.option(
+    "--flip", is_flag=True, help="The scores are of the unfavorable outcome."
+)
+@click.option(
+    "-p",
+    "--project",
+    type=click.Choice(list(PROTECTED)),
+    help="Protected attributes of a fairness project.",
+)
+@click.option(
+    "-a",
+    "--attribute",
+    "attributes",
+    multiple=True,
+    help="NAME=REFERENCE:COLUMN,... for one-hot columns, can be repeated.",
+)
+@click.option("-t", "--threshold", type=float, default=0.5)
+@click.option("--batch_rows", type=int, default=1000, help="Rows per batch.")
+@click.option(
+    "-w",
+    "--window",
+    "windows",
+    type=int,
+    multiple=True,
+    default=[10, 100],
+    help="Window in batches, can be repeated.",
+)
+@click.option("--half_life", type=float, help="Half-life of decayed counts.")
+@click.option("--every", type=int, default=100, help="Report every N batches.")
+def main(
+    data,
+    label,
+    favorable,
+    score,
+    flip,
+    project,
+    attributes,
+    threshold,
+    batch_rows,
+    windows,
+    half_life,
+    every,
+):
+    """Replays the scored data set DATA in batches through a monitor and
+    logs the accuracy and the spd and dir of every group over each window.
+    """
+    protected: Dict[str, dict] = dict(PROTECTED.get(project, {}))
+    protected.update(parse_attribute(value) for value in attributes)
+    if not protected:
+        raise click.UsageError("Give a --project or an --attribute.")
+    frame = read_frame(data)
+    if pd.api.types.is_numeric_dtype(frame[label]):
+        favorable = float(favorable)
+    try:
+        monitor = FairnessMonitor(protected, threshold, max(windows), half_life)
+    except (KeyError, ValueError) as e:
+        raise click.ClickException(str(e))
+
+    updating: List[float] = []
+    querying: List[float] = []
+    for batch, start in enumerate(range(0, len(frame), batch_rows), 1):
+        chunk = frame.iloc[start : start + batch_rows]
+        t0 = time.perf_counter()
+        try:
+            monitor.update_frame(chunk, label, score, favorable, flip)
+        except KeyError as e:
+            raise click.ClickException(str(e))
+        t1 = time.perf_counter()
+        for window in windows:
+            monitor.counts(window)
+        updating.append(t1 - t0)
+        querying.append((time.perf_counter() - t1) / len(windows))
+        if batch % every:
+            continue
+        for window in windows:
+            report = monitor.metrics(window)
+            overall = report.iloc[0]
+            summary = ", ".join(
+                f"{row.attribute}={row.group} spd {row.spd:+.3f} dir {row.dir:.2f}"
+                for row in report.itertuples()
+                if row.attribute != ALL and row.group != row.reference
+            )
+            logger.info(
+                f"batch {batch}, last {window}: accuracy {overall.accuracy:.3f}; "
+                f"{summary}"
+            )
+        if half_life is not None:
+            overall = monitor.metrics(decayed=True).iloc[0]
+            logger.info(f"batch {batch}, decayed: accuracy {overall.accuracy:.3f}")
+    logger.info(
+        f"{monitor.batches} batches of {batch_rows} rows: update "
+        f"{np.mean(updating) * 1e6:.0f} us, window counts "
+        f"{np.mean(querying) * 1e6:.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
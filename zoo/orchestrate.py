@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""Builds every project of the repository at once.
+
+Projects are the directories with a `pipeline.json` (see `zoo.pipeline`).
+Their stages form one dependency graph: a stage starts as soon as the stages
+it needs have finished and enough of the `--cores` budget is free, so
+independent projects run side by side and regenerating the zoo takes about
+as long as its slowest project. Exclusive stages (the pip installs) run
+alone. Up-to-date stages are skipped as in `zoo.pipeline`, and the report
+lists the wall time and peak RSS of every stage that ran.
+
+    python -m zoo.orchestrate --cores 8 -s requirements
+    python -m zoo.orchestrate credit-bias bias-loan -t train
+"""
+import json
+import logging
+import os
+import subprocess
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import click
+
+from zoo.pipeline import (
+    HashCache,
+    PipelineError,
+    command,
+    environment,
+    is_fresh,
+    load_pipeline,
+    parse_params,
+    plan,
+    stage_hash,
+    write_stamp,
+)
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+Task = Tuple[str, str]
+
+
+def discover(root: str = ROOT) -> List[str]:
+    """Directories below `root` that have a pipeline.json."""
+    return sorted(
+        name
+        for name in os.listdir(root)
+        if os.path.isfile(os.path.join(root, name, "pipeline.json"))
+    )
+
+
+class Orchestrator:
+    """Runs the stages of several projects on a shared core budget.
+
+    Every stage is a child process; `os.wait4` reaps whichever finishes
+    first and returns its resource usage, whose `ru_maxrss` is the peak RSS
+    of the stage (worker processes that a stage forks itself are not
+    included).
+    """
+
+    def __init__(
+        self,
+        projects: Iterable[str],
+        targets: Iterable[str] = (),
+        params: Optional[Dict[str, str]] = None,
+        cores: Optional[int] = None,
+        skip: Iterable[str] = (),
+        force: bool = False,
+        root: str = ROOT,
+    ):
+        self.cores = cores or os.cpu_count() or 1
+        self.skip = set(skip)
+        self.force = force
+        self.directories = {p: os.path.join(root, p) for p in projects}
+        self.stages: Dict[Task, dict] = {}
+        self.needs: Dict[Task, List[Task]] = {}
+        self.caches = {p: HashCache(d) for p, d in self.directories.items()}
+
+        targets = list(targets)
+        for project, directory in self.directories.items():
+            stages = load_pipeline(directory, params)["stages"]
+            wanted = [target for target in targets if target in stages]
+            if targets and not wanted:
+                # none of the targets is a stage of this project
+                continue
+            for name in plan(stages, wanted):
+                task = (project, name)
+                self.stages[task] = stages[name]
+                self.needs[task] = [(project, need) for need in stages[name]["needs"]]
+
+    def _status(self, task: Task) -> Optional[str]:
+        """"skipped" when the stage does not have to run, None otherwise."""
+        project, name = task
+        if name in self.skip:
+            return "skipped"
+        stage, cache = self.stages[task], self.caches[project]
+        digest = stage_hash(stage, cache)
+        stage["hash"] = digest
+        directory = self.directories[project]
+        if not self.force and is_fresh(directory, stage, digest, cache):
+            return "skipped"
+        return None
+
+    def run(self) -> List[dict]:
+        pending = list(self.stages)
+        # the Popen objects are kept so that subprocess never reaps the
+        # stages behind the back of os.wait4
+        running: Dict[int, Tuple[Task, int, float, subprocess.Popen, str]] = {}
+        records: Dict[Task, dict] = {}
+        free = self.cores
+        # an exclusive stage is running
+        alone = False
+
+        def record(task, status, **values):
+            records[task] = {"project": task[0], "stage": task[1], "status": status}
+            records[task].update(values)
+
+        start = time.perf_counter()
+        try:
+            while pending or running:
+                for task in list(pending):
+                    states = [
+                        records.get(need, {}).get("status") for need in self.needs[task]
+                    ]
+                    if any(state in ("failed", "blocked") for state in states):
+                        record(task, "blocked")
+                        pending.remove(task)
+                        continue
+                    if not all(state in ("ran", "skipped") for state in states):
+                        continue
+                    status = self._status(task)
+                    if status is not None:
+                        logger.info(f"{task[0]}/{task[1]}: up to date")
+                        record(task, status)
+                        pending.remove(task)
+                        continue
+                    cores = min(self.stages[task]["cores"], self.cores)
+                    exclusive = self.stages[task]["exclusive"]
+                    if running and (exclusive or alone or cores > free):
+                        continue
+                    process, log_path = self._start(task, cores)
+                    running[process.pid] = (
+                        task,
+                        cores,
+                        time.perf_counter(),
+                        process,
+                        log_path,
+                    )
+                    free -= cores
+                    alone = exclusive
+                    pending.remove(task)
+
+                if not running:
+                    continue
+                pid, status, usage = os.wait4(-1, 0)
+                if pid not in running:
+                    continue
+                task, cores, started, process, log_path = running.pop(pid)
+                process.returncode = os.waitstatus_to_exitcode(status)
+                free += cores
+                alone = False
+                values = {
+                    "seconds": time.perf_counter() - started,
+                    "peak_mib": usage.ru_maxrss / 1024,
+                    "cores": cores,
+                }
+                project, name = task
+                if process.returncode == 0:
+                    stage = self.stages[task]
+                    directory, cache = self.directories[project], self.caches[project]
+                    write_stamp(directory, stage, stage["hash"], cache)
+                    logger.info(f"{project}/{name}: done in {values['seconds']:.1f} s")
+                    record(task, "ran", **values)
+                else:
+                    logger.error(
+                        f"{project}/{name}: failed with exit status "
+                        f"{process.returncode}, see {log_path}"
+                    )
+                    record(task, "failed", **values)
+        finally:
+            for _, _, _, process, _ in running.values():
+                process.kill()
+                process.wait()
+            for cache in self.caches.values():
+                cache.save()
+
+        self.wall = time.perf_counter() - start
+        return [records[task] for task in self.stages]
+
+    def _start(self, task: Task, cores: int) -> Tuple[subprocess.Popen, str]:
+        """Starts a stage with its output sent to .pipeline/<stage>.log."""
+        project, name = task
+        directory = self.directories[project]
+        log_path = os.path.join(directory, ".pipeline", f"{name}.log")
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        logger.info(f"{project}/{name}: running on {cores} core(s), log in {log_path}")
+        with open(log_path, "w") as log:
+            process = subprocess.Popen(
+                command(self.stages[task]),
+                cwd=directory,
+                env=environment(directory, cores),
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+        return process, log_path
+
+
+def report(records: List[dict], wall: float) -> str:
+    lines = [
+        f"{'project':<28}{'stage':<14}{'status':<10}{'cores':>6}"
+        f"{'wall (s)':>10}{'peak (MiB)':>12}"
+    ]
+    for r in records:
+        ran = "seconds" in r
+        lines.append(
+            f"{r['project']:<28}{r['stage']:<14}{r['status']:<10}"
+            f"{r['cores'] if ran else '':>6}"
+            f"{r['seconds'] if ran else 0:>10.1f}"
+            f"{r['peak_mib'] if ran else 0:>12.0f}"
+        )
+    serial = sum(r.get("seconds", 0) for r in records)
+    lines.append(f"wall time {wall:.1f} s, sum of stage times {serial:.1f} s")
+    return "\n".join(lines)
+
+
+@click.command()
+@click.argument("projects", nargs=-1)
+@click.option(
+    "-j",
+    "--cores",
+    type=int,
+    help="Total core budget shared by the running stages (all cores by default).",
+)
+@click.option(
+    "-t",
+    "--target",
+    "targets",
+    multiple=True,
+    help="Stage to build in every project that has it, can be repeated.",
+)
+@click.option("-p", "--param", "params", multiple=True, help="NAME=VALUE override.")
+@click.option("-s", "--skip", multiple=True, help="Stage to leave out.")
+@click.option("-f", "--force", is_flag=True, help="Run every stage.")
+@click.option("-o", "--output", type=click.Path(), help="JSON report.")
+def main(projects, cores, targets, params, skip, force, output):
+    """Builds PROJECTS (every project with a pipeline.json by default)."""
+    try:
+        orchestrator = Orchestrator(
+            projects or discover(),
+            targets,
+            parse_params(params),
+            cores,
+            skip,
+            force,
+        )
+    except PipelineError as e:
+        raise click.ClickException(str(e))
+    records = orchestrator.run()
+    click.echo(report(records, orchestrator.wall))
+    if output:
+        with open(output, "w") as f:
+            json.dump({"wall": orchestrator.wall, "stages": records}, f, indent=2)
+    if any(r["status"] in ("failed", "blocked") for r in records):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""Incremental runner for the data -> features -> train stages of a project.
+
+Each project describes its stages in a `pipeline.json`:
+
+    {
+      "params": {"data_format": "csv"},
+      "stages": {
+        "data": {
+          "cmd": "{python} src/data/make_dataset.py data/raw data/processed",
+          "deps": ["data/raw", "src/data"],
+          "outs": ["data/processed/inputs.{data_format}"],
+          "needs": ["requirements"]
+        }
+      }
+    }
+
+Stages can also declare the number of `cores` they use when they run next
+to other stages (see `zoo.orchestrate`, default 1), and that they are
+`exclusive`: they run alone, as the pip installs of the `requirements`
+stages must, since every project installs into the same site-packages.
+
+`{name}` placeholders are filled from `params` (which the command line can
+override) and `{python}` is the running interpreter. A stage is skipped when
+the hash of its command and of the content of its `deps` (files or whole
+directories) matches one recorded after a successful run, and its `outs`
+are unchanged since. Stamps and a stat-keyed cache of file hashes
+live in the project's `.pipeline` directory.
+
+    python -m zoo.pipeline run credit-bias train -p data_format=parquet
+    python -m zoo.pipeline status credit-bias
+"""
+import hashlib
+import json
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+import click
+
+logger = logging.getLogger(__name__)
+
+SPEC = "pipeline.json"
+STATE = ".pipeline"
+IGNORED = ("__pycache__", ".ipynb_checkpoints")
+KEEP_RUNS = 8
+THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "LOKY_MAX_CPU_COUNT",
+)
+
+
+class PipelineError(Exception):
+    pass
+
+
+class HashCache:
+    """sha256 of files, recomputed only when their size or mtime change."""
+
+    def __init__(self, project_dir: str):
+        self.path = os.path.join(project_dir, STATE, "hashes.json")
+        self.project_dir = project_dir
+        self.entries: Dict[str, list] = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def _file(self, path: str) -> str:
+        stat = os.stat(path)
+        key = os.path.relpath(path, self.project_dir)
+        entry = self.entries.get(key)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.entries[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def hash(self, relative_path: str) -> Optional[str]:
+        """Hash of a file or of every file below a directory, None when the
+        path does not exist.
+        """
+        path = os.path.join(self.project_dir, relative_path)
+        if os.path.isfile(path):
+            return self._file(path)
+        if not os.path.isdir(path):
+            return None
+        digest = hashlib.sha256()
+        for root, directories, files in os.walk(path):
+            directories[:] = sorted(d for d in directories if d not in IGNORED)
+            for name in sorted(files):
+                if name.endswith((".pyc", ".pyo")):
+                    continue
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path).encode())
+                digest.update(self._file(file_path).encode())
+        return digest.hexdigest()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f)
+
+
+def load_pipeline(project_dir: str, params: Optional[Dict[str, str]] = None) -> dict:
+    """Reads `pipeline.json` and fills the placeholders of every stage."""
+    with open(os.path.join(project_dir, SPEC)) as f:
+        spec = json.load(f)
+    values = {**spec.get("params", {}), **(params or {})}
+
+    stages = {}
+    for name, stage in spec["stages"].items():
+        try:
+            stages[name] = {
+                "name": name,
+                # the interpreter is not part of the stage hash
+                "cmd": stage["cmd"].format(python="{python}", **values),
+                "deps": [dep.format(**values) for dep in stage.get("deps", [])],
+                "outs": [out.format(**values) for out in stage.get("outs", [])],
+                "needs": stage.get("needs", []),
+                "cores": int(stage.get("cores", 1)),
+                "exclusive": bool(stage.get("exclusive", False)),
+            }
+        except KeyError as e:
+            raise PipelineError(f"Stage {name} uses unknown parameter {e}.")
+    for stage in stages.values():
+        for need in stage["needs"]:
+            if need not in stages:
+                raise PipelineError(f"Stage {stage['name']} needs unknown {need}.")
+    return {"params": values, "stages": stages}
+
+
+def plan(stages: Dict[str, dict], targets: Iterable[str] = ()) -> List[str]:
+    """Topological order of `targets` (all stages by default) and of every
+    stage they need.
+    """
+    order: List[str] = []
+    visiting = set()
+
+    def visit(name):
+        if name not in stages:
+            raise PipelineError(f"Unknown stage {name}.")
+        if name in order:
+            return
+        if name in visiting:
+            raise PipelineError(f"Stage {name} depends on itself.")
+        visiting.add(name)
+        for need in stages[name]["needs"]:
+            visit(need)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in targets or stages:
+        visit(name)
+    return order
+
+
+def stage_hash(stage: dict, cache: HashCache) -> str:
+    state = {
+        "cmd": stage["cmd"],
+        "deps": {dep: cache.hash(dep) for dep in stage["deps"]},
+        "outs": stage["outs"],
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+
+def _stamp_path(project_dir: str, name: str) -> str:
+    return os.path.join(project_dir, STATE, f"{name}.json")
+
+
+def read_stamp(project_dir: str, name: str) -> Optional[dict]:
+    path = _stamp_path(project_dir, name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_stamp(project_dir: str, stage: dict, digest: str, cache: HashCache):
+    """Records a successful run. The last `KEEP_RUNS` hashes of a stage are
+    kept, so that switching back to earlier parameters (say, the data
+    format) does not rerun a stage whose outputs are still there.
+    """
+    runs = (read_stamp(project_dir, stage["name"]) or {}).get("runs", {})
+    runs.pop(digest, None)
+    runs[digest] = {
+        "outs": {out: cache.hash(out) for out in stage["outs"]},
+        "finished": time.time(),
+    }
+    runs = dict(list(runs.items())[-KEEP_RUNS:])
+    os.makedirs(os.path.join(project_dir, STATE), exist_ok=True)
+    with open(_stamp_path(project_dir, stage["name"]), "w") as f:
+        json.dump({"runs": runs}, f, indent=2)
+
+
+def is_fresh(project_dir: str, stage: dict, digest: str, cache: HashCache) -> bool:
+    stamp = read_stamp(project_dir, stage["name"])
+    recorded = (stamp or {}).get("runs", {}).get(digest)
+    if recorded is None:
+        return False
+    return all(
+        recorded["outs"].get(out) is not None
+        and cache.hash(out) == recorded["outs"][out]
+        for out in stage["outs"]
+    )
+
+
+def command(stage: dict) -> List[str]:
+    return shlex.split(stage["cmd"].format(python=sys.executable))
+
+
+def environment(project_dir: str, cores: Optional[int] = None) -> Dict[str, str]:
+    """Environment of a stage: the project is on the PYTHONPATH so that its
+    `src` package can be imported, and `cores` (when given) caps the threads
+    of OpenMP/BLAS libraries and the `n_jobs=-1` of joblib.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in [os.path.abspath(project_dir), env.get("PYTHONPATH")] if path
+    )
+    if cores is not None:
+        for variable in THREAD_VARIABLES:
+            env[variable] = str(cores)
+    return env
+
+
+def run_stage(project_dir: str, stage: dict) -> subprocess.CompletedProcess:
+    """Runs the command of a stage from the project directory."""
+    return subprocess.run(
+        command(stage), cwd=project_dir, env=environment(project_dir)
+    )
+
+
+def run(
+    project_dir: str,
+    targets: Iterable[str] = (),
+    params: Optional[Dict[str, str]] = None,
+    force: bool = False,
+    skip: Iterable[str] = (),
+    dry_run: bool = False,
+) -> List[dict]:
+    """Runs the stages that `targets` need, skipping the up-to-date ones.
+
+    Returns one record per stage with its status ("skipped", "ran" or
+    "would run") and wall time.
+    """
+    pipeline = load_pipeline(project_dir, params)
+    stages = pipeline["stages"]
+    cache = HashCache(project_dir)
+    records = []
+    try:
+        for name in plan(stages, targets):
+            stage = stages[name]
+            if name in skip:
+                records.append({"stage": name, "status": "skipped", "seconds": 0.0})
+                continue
+            digest = stage_hash(stage, cache)
+            if not force and is_fresh(project_dir, stage, digest, cache):
+                logger.info(f"{name}: up to date")
+                records.append({"stage": name, "status": "skipped", "seconds": 0.0})
+                continue
+            if dry_run:
+                logger.info(f"{name}: would run {shlex.join(command(stage))}")
+                records.append({"stage": name, "status": "would run", "seconds": 0.0})
+                continue
+
+            logger.info(f"{name}: running {shlex.join(command(stage))}")
+            start = time.perf_counter()
+            result = run_stage(project_dir, stage)
+            elapsed = time.perf_counter() - start
+            if result.returncode != 0:
+                raise PipelineError(
+                    f"Stage {name} failed with exit status {result.returncode}."
+                )
+            write_stamp(project_dir, stage, digest, cache)
+            logger.info(f"{name}: done in {elapsed:.1f} s")
+            records.append({"stage": name, "status": "ran", "seconds": elapsed})
+    finally:
+        cache.save()
+    return records
+
+
+def parse_params(values) -> Dict[str, str]:
+    params = {}
+    for value in values:
+        name, separator, setting = value.partition("=")
+        if not separator:
+            raise click.BadParameter(f"{value} is not NAME=VALUE.")
+        params[name] = setting
+    return params
+
+
+@click.group()
+def cli():
+    """Content-hashed, incremental pipeline runner."""
+
+
+@cli.command("run")
+@click.argument("project_dir", type=click.Path(exists=True, file_okay=False))
+@click.argument("targets", nargs=-1)
+@click.option("-p", "--param", "params", multiple=True, help="NAME=VALUE override.")
+@click.option("-f", "--force", is_flag=True, help="Run every stage.")
+@click.option("-s", "--skip", multiple=True, help="Stage to leave out.")
+@click.option("-n", "--dry_run", is_flag=True, help="Only report what would run.")
+def run_command(project_dir, targets, params, force, skip, dry_run):
+    """Runs TARGETS (every stage by default) of PROJECT_DIR and the stages
+    they need, skipping those whose inputs have not changed.
+    """
+    try:
+        run(project_dir, targets, parse_params(params), force, skip, dry_run)
+    except PipelineError as e:
+        raise click.ClickException(str(e))
+
+
+@cli.command()
+@click.argument("project_dir", type=click.Path(exists=True, file_okay=False))
+@click.option("-p", "--param", "params", multiple=True, help="NAME=VALUE override.")
+def status(project_dir, params):
+    """Shows which stages of PROJECT_DIR are up to date."""
+    stages = load_pipeline(project_dir, parse_params(params))["stages"]
+    cache = HashCache(project_dir)
+    for name in plan(stages):
+        stage = stages[name]
+        if read_stamp(project_dir, name) is None:
+            state = "never run"
+        elif is_fresh(project_dir, stage, stage_hash(stage, cache), cache):
+            state = "up to date"
+        else:
+            state = "changed"
+        click.echo(f"{name:>16}: {state}")
+    cache.save()
+
+
+if __name__ == "__main__":
+    log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    cli()
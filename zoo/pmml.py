@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""Pure-Python scoring of PMML tree ensembles.
+
+`load_pmml` compiles the `TreeModel` segments of a PMML `MiningModel` (or a
+single `TreeModel`) into a `zoo.trees.TreeEnsemble`, which scores batches
+with vectorised NumPy traversal and does not need a JVM-based PMML engine.
+
+    python -m zoo.pmml minimal-numerical/models/model.pmml \\
+        minimal-numerical/data/processed/inputs.csv predictions.csv
+"""
+import logging
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+import click
+import numpy as np
+import pandas as pd
+
+from zoo.frames import read_frame
+from zoo.trees import LEAF, TreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+AGGREGATIONS = {
+    "average": "average",
+    "weightedAverage": "weightedAverage",
+    "sum": "sum",
+}
+
+
+def _tag(element) -> str:
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def _children(element, tag: str) -> list:
+    return [child for child in element if _tag(child) == tag]
+
+
+def _child(element, tag: str):
+    children = _children(element, tag)
+    return children[0] if children else None
+
+
+def _predicate(node):
+    for child in node:
+        if _tag(child) in ("True", "False", "SimplePredicate", "CompoundPredicate"):
+            return child
+    raise ValueError("Node without a predicate.")
+
+
+class _TreeCompiler:
+    """Appends PMML `Node` trees to a set of flat node arrays.
+
+    A PMML node sends a row to its first child whose predicate is true; if
+    none is, the node's own score is returned (`returnLastPrediction`, the
+    strategy used by the compacted JPMML trees). Every child test becomes
+    one `<=` split whose false branch moves on to the next sibling.
+    """
+
+    def __init__(self, fields: Dict[str, int], classes: Optional[List[str]]):
+        self.fields = fields
+        self.classes = classes
+        self.feature: List[int] = []
+        self.threshold: List[float] = []
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.value: List[np.ndarray] = []
+
+    def _append(self, feature, threshold, left, right, value) -> int:
+        self.feature.append(feature)
+        self.threshold.append(threshold)
+        self.left.append(left)
+        self.right.append(right)
+        self.value.append(value)
+        return len(self.feature) - 1
+
+    def _leaf(self, node) -> int:
+        if self.classes is None:
+            value = np.array([float(node.get("score", "nan"))])
+        else:
+            value = np.zeros(len(self.classes))
+            distribution = _children(node, "ScoreDistribution")
+            for score in distribution:
+                index = self.classes.index(score.get("value"))
+                # record counts are normalised below when no confidence is given
+                value[index] = float(
+                    score.get("confidence")
+                    or score.get("probability")
+                    or score.get("recordCount")
+                )
+            if distribution and value.sum() > 0:
+                value /= value.sum()
+            elif node.get("score") is not None:
+                value[self.classes.index(node.get("score"))] = 1.0
+            else:
+                value[:] = np.nan
+        index = len(self.feature)
+        return self._append(LEAF, np.nan, index, index, value)
+
+    def _split(self, predicate):
+        """Returns (feature, threshold, negated) so that the predicate is
+        `x[feature] <= threshold`, or its negation when `negated`.
+        """
+        if _tag(predicate) != "SimplePredicate":
+            raise ValueError(f"Predicate {_tag(predicate)} not supported.")
+        feature = self.fields[predicate.get("field")]
+        operator = predicate.get("operator")
+        threshold = float(predicate.get("value"))
+        if operator == "lessOrEqual":
+            return feature, threshold, False
+        elif operator == "greaterThan":
+            return feature, threshold, True
+        elif operator == "lessThan":
+            return feature, np.nextafter(threshold, -np.inf), False
+        elif operator == "greaterOrEqual":
+            return feature, np.nextafter(threshold, -np.inf), True
+        raise ValueError(f"Operator {operator} not supported.")
+
+    def compile(self, node) -> int:
+        children = _children(node, "Node")
+        if not children:
+            return self._leaf(node)
+        return self._chain(node, children)
+
+    def _chain(self, node, children) -> int:
+        if not children:
+            return self._leaf(node)
+        child, siblings = children[0], children[1:]
+        predicate = _predicate(child)
+        if _tag(predicate) == "True":
+            return self.compile(child)
+        if _tag(predicate) == "False":
+            return self._chain(node, siblings)
+
+        feature, threshold, negated = self._split(predicate)
+        taken = self.compile(child)
+        # a binary split whose second child tests the complement needs no
+        # extra test and no fall-back leaf
+        complement = (feature, threshold, not negated)
+        if (
+            len(siblings) == 1
+            and _tag(_predicate(siblings[0])) == "SimplePredicate"
+            and self._split(_predicate(siblings[0])) == complement
+        ):
+            other = self.compile(siblings[0])
+        else:
+            other = self._chain(node, siblings)
+        return self._split_node(feature, threshold, negated, taken, other)
+
+    def _split_node(self, feature, threshold, negated, taken, other) -> int:
+        left, right = (other, taken) if negated else (taken, other)
+        n_outputs = 1 if self.classes is None else len(self.classes)
+        return self._append(feature, threshold, left, right, np.zeros(n_outputs))
+
+
+class PMMLModel:
+    """A PMML tree model compiled into a `TreeEnsemble`."""
+
+    def __init__(
+        self,
+        ensemble: TreeEnsemble,
+        feature_names: List[str],
+        float_fields: List[bool],
+        target: str,
+        classes: Optional[List[str]] = None,
+    ):
+        self.ensemble = ensemble
+        self.feature_names = feature_names
+        self.float_fields = np.asarray(float_fields, dtype=bool)
+        self.target = target
+        self.classes = classes
+
+    def _matrix(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_names].to_numpy(dtype=np.float64)
+        X = np.array(X, dtype=np.float64)
+        # fields declared as "float" are compared in single precision
+        X[:, self.float_fields] = X[:, self.float_fields].astype(np.float32)
+        return X
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self.classes is None:
+            raise ValueError("predict_proba requires a classification model.")
+        return self.ensemble.predict(self._matrix(X))
+
+    def predict(self, X) -> np.ndarray:
+        prediction = self.ensemble.predict(self._matrix(X))
+        if self.classes is None:
+            return prediction[:, 0]
+        return np.asarray(self.classes)[prediction.argmax(axis=1)]
+
+
+def load_pmml(path: str) -> PMMLModel:
+    root = ET.parse(path).getroot()
+    data_fields = {
+        field.get("name"): field
+        for field in _children(_child(root, "DataDictionary"), "DataField")
+    }
+
+    model = _child(root, "MiningModel")
+    if model is None:
+        model = _child(root, "TreeModel")
+    if model is None:
+        raise ValueError("Only MiningModel and TreeModel documents are supported.")
+
+    schema = _children(_child(model, "MiningSchema"), "MiningField")
+    target = next(f.get("name") for f in schema if f.get("usageType") == "target")
+    feature_names = [
+        f.get("name") for f in schema if f.get("usageType", "active") == "active"
+    ]
+    float_fields = [
+        data_fields[name].get("dataType") == "float" for name in feature_names
+    ]
+    fields = {name: index for index, name in enumerate(feature_names)}
+
+    # derived fields that only reference (and cast) an input field
+    transformations = _child(model, "LocalTransformations")
+    if transformations is not None:
+        for derived in _children(transformations, "DerivedField"):
+            reference = _child(derived, "FieldRef")
+            if reference is None:
+                raise ValueError(f"Derived field {derived.get('name')} not supported.")
+            fields[derived.get("name")] = fields[reference.get("field")]
+
+    classes = None
+    if model.get("functionName") == "classification":
+        values = _children(data_fields[target], "Value")
+        classes = [value.get("value") for value in values]
+
+    if _tag(model) == "TreeModel":
+        trees, weights, aggregation = [model], [1.0], "average"
+    else:
+        segmentation = _child(model, "Segmentation")
+        method = segmentation.get("multipleModelMethod")
+        if method not in AGGREGATIONS:
+            raise ValueError(f"Segmentation {method} not supported.")
+        aggregation = AGGREGATIONS[method]
+        segments = _children(segmentation, "Segment")
+        trees = [_child(segment, "TreeModel") for segment in segments]
+        if any(tree is None for tree in trees):
+            raise ValueError("Only TreeModel segments are supported.")
+        weights = [float(segment.get("weight", 1)) for segment in segments]
+
+    compiler = _TreeCompiler(fields, classes)
+    roots = [compiler.compile(_child(tree, "Node")) for tree in trees]
+    ensemble = TreeEnsemble(
+        compiler.feature,
+        compiler.threshold,
+        compiler.left,
+        compiler.right,
+        np.vstack(compiler.value),
+        roots,
+        weights=weights if aggregation == "weightedAverage" else None,
+        aggregation=aggregation,
+    )
+    return PMMLModel(ensemble, feature_names, float_fields, target, classes)
+
+
+@click.command()
+@click.argument("model_path", type=click.Path(exists=True))
+@click.argument("input_data", type=click.Path(exists=True))
+@click.argument("output_data", type=click.Path())
+@click.option(
+    "-r",
+    "--reference",
+    type=click.Path(exists=True),
+    help="joblib model to compare the PMML predictions against.",
+)
+def main(model_path, input_data, output_data, reference):
+    """Scores `input_data` with a PMML tree ensemble."""
+    start = time.perf_counter()
+    model = load_pmml(model_path)
+    logger.info(
+        f"Compiled {model.ensemble.n_trees} trees "
+        f"({len(model.ensemble.feature)} nodes, depth {model.ensemble.max_depth}) "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
+
+    inputs = read_frame(input_data)
+    start = time.perf_counter()
+    if model.classes is None:
+        predictions = model.predict(inputs)[:, None]
+        columns = [model.target]
+    else:
+        predictions = model.predict_proba(inputs)
+        columns = [f"P({model.target}={c})" for c in model.classes]
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Scored {len(inputs)} rows in {elapsed:.2f} s "
+        f"({len(inputs) / elapsed:.0f} rows/s)"
+    )
+    pd.DataFrame(predictions, columns=columns).to_csv(output_data, index=False)
+
+    if reference:
+        import joblib
+
+        estimator = joblib.load(reference)
+        features = inputs[model.feature_names]
+        if model.classes is None:
+            expected = estimator.predict(features).reshape(len(inputs), -1)
+        else:
+            expected = estimator.predict_proba(features)
+        logger.info(
+            f"Max absolute difference with {reference}: "
+            f"{np.abs(expected - predictions).max():.3g}"
+        )
+
+
+if __name__ == "__main__":
+    log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""Local HTTP inference server that scores concurrent requests in batches.
+
+Every model has a queue and a scoring thread. The thread takes the oldest
+request, waits up to `--window_ms` for more (or until `--max_rows` rows are
+queued), scores all their rows with one call to the model and hands every
+request its slice of the result. A flood of single-row requests thus costs
+one vectorized call per batch instead of one per row. Requests are never
+split, so a batch can go over `--max_rows` by its last request.
+
+    POST /models/<name>/predict   {"rows": [[...], ...]} or
+                                  {"instances": [{"feature": value}, ...]}
+    GET  /models                  names, formats, features and classes
+    GET  /metrics                 queue depth, batch-size histogram, cache
+                                  counters and request latency of every
+                                  model
+
+Models are the artifacts of the projects' `models` directories (see
+`zoo.artifacts`), named `<project>/<file name>`.
+
+    python -m zoo.serve bias-loan credit-bias --window_ms 2 --max_rows 512
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import click
+import numpy as np
+
+from zoo.artifacts import Artifact, find_artifacts, load_artifact
+from zoo.cache import CachedModel
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LATENCY_SAMPLES = 4096
+
+
+class Request:
+    def __init__(self, rows: np.ndarray):
+        self.rows = rows
+        self.arrived = time.perf_counter()
+        self.done = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[Exception] = None
+
+
+class MicroBatcher:
+    """Scores the requests of one model in batches, on its own thread."""
+
+    def __init__(
+        self, artifact: Artifact, window_ms: float = 2.0, max_rows: int = 512
+    ):
+        self.artifact = artifact
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self.queue: "queue.Queue[Request]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.queued_rows = 0
+        # batches by size: bucket i counts the sizes in (2**(i-1), 2**i]
+        buckets = int(np.ceil(np.log2(max(max_rows, 1)))) + 2
+        self.histogram = np.zeros(buckets, dtype=np.int64)
+        self.latencies = np.zeros(LATENCY_SAMPLES)
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.score_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, rows: np.ndarray) -> np.ndarray:
+        """Queues `rows` and blocks until they are scored."""
+        request = Request(rows)
+        with self.lock:
+            self.queued_rows += len(rows)
+        self.queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self) -> List[Request]:
+        batch = [self.queue.get()]
+        rows = len(batch[0].rows)
+        deadline = batch[0].arrived + self.window
+        while rows < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    request = self.queue.get(timeout=remaining)
+                else:
+                    # past the window, only what is already queued joins
+                    request = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            rows += len(request.rows)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            rows = np.concatenate([request.rows for request in batch])
+            start = time.perf_counter()
+            try:
+                result = self.artifact.score(rows)
+            except Exception as e:  # reported to every request of the batch
+                result, error = None, e
+            else:
+                error = None
+            finished = time.perf_counter()
+
+            offset = 0
+            for request in batch:
+                if error is None:
+                    request.result = result[offset : offset + len(request.rows)]
+                else:
+                    request.error = error
+                offset += len(request.rows)
+                request.done.set()
+
+            with self.lock:
+                self.queued_rows -= len(rows)
+                self.batches += 1
+                self.rows += len(rows)
+                self.score_seconds += finished - start
+                bucket = int(np.ceil(np.log2(len(rows))))
+                self.histogram[min(bucket, len(self.histogram) - 1)] += 1
+                for request in batch:
+                    self.latencies[self.requests % LATENCY_SAMPLES] = (
+                        finished - request.arrived
+                    )
+                    self.requests += 1
+
+    def metrics(self) -> dict:
+        with self.lock:
+            latencies = self.latencies[: min(self.requests, LATENCY_SAMPLES)] * 1000
+            edges = [2**i for i in range(len(self.histogram) - 1)]
+            return {
+                "queue_depth": self.queue.qsize(),
+                "queued_rows": self.queued_rows,
+                "requests": self.requests,
+                "rows": self.rows,
+                "batches": self.batches,
+                "mean_batch_rows": self.rows / self.batches if self.batches else 0.0,
+                "batch_rows_histogram": {
+                    **{f"<={edge}": int(n) for edge, n in zip(edges, self.histogram)},
+                    f">{edges[-1]}": int(self.histogram[-1]),
+                },
+                "score_ms_per_batch": (
+                    self.score_seconds / self.batches * 1000 if self.batches else 0.0
+                ),
+                "cache": (
+                    self.artifact.info()
+                    if isinstance(self.artifact, CachedModel)
+                    else None
+                ),
+                "latency_ms": {
+                    "p50": float(np.percentile(latencies, 50)) if len(latencies) else 0,
+                    "p99": float(np.percentile(latencies, 99)) if len(latencies) else 0,
+                    "max": float(latencies.max()) if len(latencies) else 0,
+                },
+            }
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 resets connections under concurrent clients
+    request_queue_size = 128
+
+    def __init__(self, address, batchers: Dict[str, MicroBatcher]):
+        super().__init__(address, Handler)
+        self.batchers = batchers
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: Server
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def _reply(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._reply(
+                200,
+                {name: b.metrics() for name, b in self.server.batchers.items()},
+            )
+        elif self.path == "/models":
+            self._reply(
+                200,
+                {
+                    name: {
+                        "format": b.artifact.format,
+                        "features": b.artifact.feature_names,
+                        "n_features": b.artifact.n_features,
+                        "classes": b.artifact.classes,
+                    }
+                    for name, b in self.server.batchers.items()
+                },
+            )
+        else:
+            self._reply(404, {"error": f"Unknown path {self.path}."})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        prefix, suffix = "/models/", "/predict"
+        if not (self.path.startswith(prefix) and self.path.endswith(suffix)):
+            self._reply(404, {"error": f"Unknown path {self.path}."})
+            return
+        name = self.path[len(prefix) : -len(suffix)]
+        batcher = self.server.batchers.get(name)
+        if batcher is None:
+            self._reply(404, {"error": f"Unknown model {name}."})
+            return
+        try:
+            rows = parse_rows(json.loads(body), batcher.artifact)
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+        try:
+            result = batcher.submit(rows)
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+            return
+        self._reply(200, {"predictions": result.tolist()})
+
+
+def parse_rows(body: dict, artifact: Artifact) -> np.ndarray:
+    """The rows of a request body as a 2-d float array in feature order."""
+    if "instances" in body:
+        if artifact.feature_names is None:
+            raise ValueError("This model takes rows, not named instances.")
+        rows = [
+            [instance[name] for name in artifact.feature_names]
+            for instance in body["instances"]
+        ]
+    else:
+        rows = body["rows"]
+    rows = np.asarray(rows, dtype=np.float64)
+    if rows.ndim == 1:
+        rows = rows[None, :]
+    if rows.ndim != 2 or len(rows) == 0:
+        raise ValueError("Expected a non-empty list of rows.")
+    if artifact.n_features is not None and rows.shape[1] != artifact.n_features:
+        raise ValueError(
+            f"Expected {artifact.n_features} features, got {rows.shape[1]}."
+        )
+    return rows
+
+
+def model_paths(targets) -> Dict[str, str]:
+    """Model names and artifact paths for project directories or files."""
+    paths = {}
+    for target in targets:
+        if os.path.isdir(target):
+            found = find_artifacts(target)
+        else:
+            found = [target]
+        for path in found:
+            models_dir = os.path.dirname(os.path.abspath(path))
+            project = os.path.basename(os.path.dirname(models_dir))
+            paths[f"{project}/{os.path.basename(path)}"] = path
+    return paths
+
+
+@click.command()
+@click.argument("targets", nargs=-1)
+@click.option("--host", default="127.0.0.1", help="Interface to listen on.")
+@click.option("--port", type=int, default=8000)
+@click.option(
+    "--window_ms",
+    type=float,
+    default=2.0,
+    help="Longest wait for more requests after the first one of a batch.",
+)
+@click.option("--max_rows", type=int, default=512, help="Rows per batch.")
+@click.option(
+    "--cache_rows",
+    type=int,
+    default=0,
+    help="Predictions memoized per model (see zoo.cache), 0 to disable.",
+)
+def main(targets, host, port, window_ms, max_rows, cache_rows):
+    """Serves the model artifacts of TARGETS, project directories or
+    artifact files (every project by default).
+    """
+    if not targets:
+        targets = [
+            os.path.join(ROOT, name)
+            for name in sorted(os.listdir(ROOT))
+            if os.path.isdir(os.path.join(ROOT, name, "models"))
+        ]
+    batchers = {}
+    for name, path in model_paths(targets).items():
+        try:
+            artifact = load_artifact(path)
+        except Exception as e:
+            logger.warning(f"Skipping {name}: {e}")
+            continue
+        if cache_rows > 0:
+            artifact = CachedModel(artifact, cache_rows)
+        batchers[name] = MicroBatcher(artifact, window_ms, max_rows)
+        logger.info(f"Serving {name} ({artifact.format})")
+    if not batchers:
+        raise click.ClickException("No model to serve.")
+
+    server = Server((host, port), batchers)
+    logger.info(f"Listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
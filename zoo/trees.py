@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from typing import Dict, Optional
+
+import numpy as np
+
+LEAF = -1
+
+# upper bound on the (rows x trees) node-index matrix scored at once
+BLOCK_NODES = 1 << 22
+
+
+class TreeEnsemble:
+    """A tree ensemble compiled into flat node arrays.
+
+    Node `i` sends a row to `left[i]` when `x[feature[i]] <= threshold[i]`
+    and to `right[i]` otherwise. Leaves have `feature[i] == LEAF`, are their
+    own children (so that a row can take more steps than its path has) and
+    hold their prediction in `value[i]`, a vector of `n_outputs` values
+    (class probabilities or regression targets). `roots` holds the index of the
+    first node of every tree, and the tree predictions are combined with
+    `aggregation` ("average", "weightedAverage" or "sum").
+
+    Missing values are not handled specially: NaN fails every `<=` test and
+    follows the right branch.
+
+    Arrays that already have the right dtype are used without a copy, so an
+    ensemble can run directly on read-only memory-mapped arrays.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+        aggregation: str = "average",
+        max_depth: Optional[int] = None,
+    ):
+        if aggregation not in ("average", "weightedAverage", "sum"):
+            raise ValueError(f"Aggregation {aggregation} not supported.")
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64).reshape(len(self.feature), -1)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.weights = (
+            np.ones(len(self.roots)) if weights is None else np.asarray(weights, float)
+        )
+        self.aggregation = aggregation
+        self.max_depth = self._max_depth() if max_depth is None else int(max_depth)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_outputs(self) -> int:
+        return self.value.shape[1]
+
+    def to_arrays(self) -> Dict[str, object]:
+        """Returns the constructor arguments, `TreeEnsemble(**to_arrays())`."""
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "value": self.value,
+            "roots": self.roots,
+            "weights": self.weights,
+            "aggregation": self.aggregation,
+            "max_depth": self.max_depth,
+        }
+
+    def _max_depth(self) -> int:
+        depth = 0
+        nodes = self.roots
+        while True:
+            nodes = nodes[self.feature[nodes] != LEAF]
+            if not len(nodes):
+                return depth
+            nodes = np.concatenate([self.left[nodes], self.right[nodes]])
+            depth += 1
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Returns the (rows, trees) matrix of leaf indices reached by `X`.
+
+        All (row, tree) pairs move down one level per step, with a handful
+        of NumPy gathers on flat arrays whatever the number of trees. Pairs
+        that reached a leaf loop on it; once they are a quarter of the pairs
+        still moving they are set aside, so that deep unbalanced trees do
+        not cost their maximum depth for every row.
+        """
+        X = np.ascontiguousarray(X)
+        if X.dtype not in (np.float32, np.float64):
+            X = X.astype(np.float64)
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        leaves = np.empty(n_rows * self.n_trees, dtype=np.intp)
+        # position of every moving pair in `leaves`, its node and the offset
+        # of its row in `flat`
+        position = np.arange(len(leaves))
+        nodes = np.tile(self.roots.astype(np.intp), n_rows)
+        offsets = np.repeat(np.arange(n_rows) * n_features, self.n_trees)
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            done = feature == LEAF
+            finished = np.count_nonzero(done)
+            if finished == len(nodes):
+                break
+            if finished * 4 > len(nodes):
+                leaves[position[done]] = nodes[done]
+                moving = ~done
+                position, nodes = position[moving], nodes[moving]
+                offsets, feature = offsets[moving], feature[moving]
+            # leaves compare with a NaN threshold, go right and stay put
+            go_left = flat[offsets + feature] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        leaves[position] = nodes
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Returns the aggregated (rows, n_outputs) prediction for `X`."""
+        X = np.asarray(X, dtype=np.float64)
+        out = np.empty((len(X), self.n_outputs))
+        block = max(1, BLOCK_NODES // self.n_trees)
+        for start in range(0, len(X), block):
+            leaves = self.apply(X[start : start + block])
+            if self.aggregation == "sum":
+                out[start : start + block] = self.value[leaves].sum(axis=1)
+            else:
+                weighted = np.einsum("ntk,t->nk", self.value[leaves], self.weights)
+                out[start : start + block] = weighted / self.weights.sum()
+        return out
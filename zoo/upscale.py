@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""Generates larger versions of the processed data sets of a project.
+
+`Synthesizer.fit` learns a Gaussian copula from the data sets of a
+`data/processed` directory (the inputs and outputs of one row are modelled
+together): the marginal distribution of every column, its share of missing
+values, and the correlations of the normal scores of all columns. Columns
+with few distinct values (flags, codes, categories, class labels) keep
+exactly those values and their frequencies; the others are drawn from their
+empirical quantiles. The samples have the same columns, order and dtypes as
+the originals.
+
+Rows are generated in chunks of `--chunksize`, each from its own
+`numpy.random.SeedSequence.spawn` stream, by `--jobs` processes that write
+one part file per chunk; the parts are then joined in order. The output
+only depends on the seed and the chunk size, not on the number of jobs.
+
+    python -m zoo.upscale minimal-numerical/data/processed --factor 1000
+    python -m zoo.upscale credit-bias/data/processed -n train --rows 10000000 -d parquet
+"""
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import click
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from zoo.frames import (
+    FORMATS,
+    find_frame,
+    frame_path,
+    join_parts,
+    read_frame,
+    write_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_CATEGORIES = 64
+QUANTILES = 1025
+
+
+def _normal_scores(ranks: np.ndarray, n: int) -> np.ndarray:
+    return ndtri((ranks - 0.5) / n)
+
+
+class Synthesizer:
+    """Gaussian copula over the columns of a data frame.
+
+    `columns` maps every column to its model: {"kind": "discrete", "values",
+    "cdf"} or {"kind": "continuous", "quantiles"}, plus its "dtype", its
+    pandas "categories" (for categorical columns) and its "missing" share.
+    """
+
+    def __init__(self, columns: Dict[str, dict], correlation: np.ndarray):
+        self.columns = columns
+        self.correlation = correlation
+        self._cholesky = np.linalg.cholesky(correlation)
+
+    @classmethod
+    def fit(
+        cls,
+        df: pd.DataFrame,
+        max_categories: int = MAX_CATEGORIES,
+        quantiles: int = QUANTILES,
+    ) -> "Synthesizer":
+        columns = {}
+        scores = np.zeros((len(df), df.shape[1]))
+        for j, name in enumerate(df.columns):
+            series = df[name]
+            present = series.notna().to_numpy()
+            values = series[present]
+            model = {
+                "dtype": series.dtype,
+                "missing": 1 - present.mean(),
+                "categories": None,
+            }
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                model["categories"] = series.cat.categories
+                values = values.astype(object)
+            numeric = pd.api.types.is_numeric_dtype(values) and not (
+                pd.api.types.is_bool_dtype(values)
+            )
+            if len(values) == 0:
+                model.update(kind="discrete", values=np.array([np.nan]), cdf=[1.0])
+            elif numeric and values.nunique() > max_categories:
+                x = values.to_numpy(dtype=float)
+                probabilities = np.linspace(0, 1, quantiles)
+                model.update(
+                    kind="continuous", quantiles=np.quantile(x, probabilities)
+                )
+                ranks = pd.Series(x).rank(method="average").to_numpy()
+                scores[present, j] = _normal_scores(ranks, len(x))
+            else:
+                codes, uniques = pd.factorize(values, sort=numeric)
+                counts = np.bincount(codes, minlength=len(uniques))
+                cdf = np.cumsum(counts) / counts.sum()
+                model.update(kind="discrete", values=np.asarray(uniques), cdf=cdf)
+                # every category scores at the middle of its slice of the cdf
+                middle = cdf - counts / counts.sum() / 2
+                scores[present, j] = ndtri(middle)[codes]
+            columns[name] = model
+
+        correlation = np.corrcoef(scores, rowvar=False) if len(df) > 1 else None
+        return cls(columns, _nearest_correlation(correlation, df.shape[1]))
+
+    def sample(self, rows: int, rng: np.random.Generator) -> pd.DataFrame:
+        z = rng.standard_normal((rows, len(self.columns))) @ self._cholesky.T
+        u = ndtr(z)
+        data = {}
+        for j, (name, model) in enumerate(self.columns.items()):
+            if model["kind"] == "continuous":
+                grid = np.linspace(0, 1, len(model["quantiles"]))
+                values = np.interp(u[:, j], grid, model["quantiles"])
+            else:
+                index = np.searchsorted(model["cdf"], u[:, j], side="right")
+                values = model["values"][np.minimum(index, len(model["cdf"]) - 1)]
+            data[name] = self._restore(values, model, rng)
+        return pd.DataFrame(data)
+
+    @staticmethod
+    def _restore(values: np.ndarray, model: dict, rng: np.random.Generator):
+        missing = rng.random(len(values)) < model["missing"]
+        dtype = model["dtype"]
+        if model["categories"] is not None:
+            values = pd.Categorical(values, categories=model["categories"])
+            values[missing] = np.nan
+            return values
+        if pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_bool_dtype(
+            dtype
+        ):
+            if model["kind"] == "continuous":
+                values = np.rint(values)
+            if not missing.any():
+                return values.astype(dtype)
+            values = values.astype(float)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            values = values.astype(dtype)
+            values[missing] = np.datetime64("NaT")
+            return values
+        elif not pd.api.types.is_numeric_dtype(dtype):
+            values = values.astype(object)
+            values[missing] = None
+            return values
+        else:
+            values = values.astype(dtype)
+        if missing.any():
+            values = values.astype(float)
+            values[missing] = np.nan
+        return values
+
+
+def _nearest_correlation(correlation: Optional[np.ndarray], size: int) -> np.ndarray:
+    """A positive definite correlation matrix close to `correlation`;
+    constant columns (NaN correlations) are independent of the others.
+    """
+    if correlation is None:
+        return np.eye(size)
+    correlation = np.atleast_2d(np.nan_to_num(correlation))
+    np.fill_diagonal(correlation, 1.0)
+    eigenvalues, eigenvectors = np.linalg.eigh(correlation)
+    eigenvalues = np.maximum(eigenvalues, 1e-6)
+    correlation = (eigenvectors * eigenvalues) @ eigenvectors.T
+    scale = np.sqrt(np.diag(correlation))
+    return correlation / np.outer(scale, scale)
+
+
+def rank_correlation_error(original: pd.DataFrame, synthetic: pd.DataFrame) -> float:
+    """Largest absolute difference between the Spearman correlations of
+    the numeric columns of two data frames.
+    """
+    numeric = [
+        name
+        for name in original.columns
+        if pd.api.types.is_numeric_dtype(original[name])
+        and original[name].nunique() > 1
+    ]
+    if len(numeric) < 2:
+        return 0.0
+    before = original[numeric].astype(float).corr(method="spearman").to_numpy()
+    after = synthetic[numeric].astype(float).corr(method="spearman").to_numpy()
+    return float(np.nanmax(np.abs(before - after)))
+
+
+def _write_chunk(
+    synthesizer: Synthesizer,
+    rows: int,
+    seed: np.random.SeedSequence,
+    splits: Dict[str, List[str]],
+    paths: Dict[str, str],
+):
+    sample = synthesizer.sample(rows, np.random.default_rng(seed))
+    for name, columns in splits.items():
+        write_frame(sample[columns], paths[name], header=False)
+
+
+def upscale(
+    input_dir: str,
+    output_dir: str,
+    names: Sequence[str] = ("inputs", "outputs"),
+    rows: Optional[int] = None,
+    factor: Optional[float] = None,
+    data_format: str = "csv",
+    chunksize: int = 100_000,
+    jobs: Optional[int] = None,
+    seed: int = 0,
+) -> Dict[str, str]:
+    """Writes `rows` (or `factor` times as many as the originals) synthetic
+    rows of the `names` data sets of `input_dir` to `output_dir`.
+    """
+    frames = {name: read_frame(find_frame(input_dir, name)) for name in names}
+    lengths = {len(df) for df in frames.values()}
+    if len(lengths) != 1:
+        raise ValueError(f"{', '.join(names)} do not have the same number of rows.")
+    original = pd.concat(
+        [df.reset_index(drop=True) for df in frames.values()], axis=1
+    )
+    splits = {name: list(df.columns) for name, df in frames.items()}
+
+    start = time.perf_counter()
+    synthesizer = Synthesizer.fit(original)
+    logger.info(
+        f"Fitted {original.shape[1]} columns on {len(original)} rows "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
+    rows = rows if rows is not None else int(round(len(original) * factor))
+    sizes = [chunksize] * (rows // chunksize)
+    if rows % chunksize:
+        sizes.append(rows % chunksize)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    os.makedirs(output_dir, exist_ok=True)
+    parts_dir = tempfile.mkdtemp(dir=output_dir, prefix=".parts-")
+    parts = [
+        {
+            name: os.path.join(parts_dir, f"{name}-{i:05d}{FORMATS[data_format]}")
+            for name in names
+        }
+        for i in range(len(sizes))
+    ]
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(jobs) as executor:
+            futures = [
+                executor.submit(_write_chunk, synthesizer, size, s, splits, paths)
+                for size, s, paths in zip(sizes, seeds, parts)
+            ]
+            for future in futures:
+                future.result()
+        outputs = {}
+        for name in names:
+            outputs[name] = join_parts(
+                [paths[name] for paths in parts],
+                frame_path(output_dir, name, data_format),
+                splits[name],
+            )
+    finally:
+        shutil.rmtree(parts_dir)
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Wrote {rows} rows in {len(sizes)} chunks in {elapsed:.1f} s "
+        f"({rows / elapsed:.0f} rows/s)"
+    )
+
+    check = synthesizer.sample(min(rows, 100_000), np.random.default_rng(seed))
+    logger.info(
+        "Largest Spearman correlation difference to the original: "
+        f"{rank_correlation_error(original, check):.3f}"
+    )
+    return outputs
+
+
+@click.command()
+@click.argument("input_dir", type=click.Path(exists=True, file_okay=False))
+@click.option(
+    "-o",
+    "--output_dir",
+    type=click.Path(file_okay=False),
+    help="Directory of the synthetic data sets (data/upscaled by default).",
+)
+@click.option(
+    "-n",
+    "--name",
+    "names",
+    multiple=True,
+    default=["inputs", "outputs"],
+    help="Data set of INPUT_DIR, can be repeated; all of them have one row per "
+    "example and are upscaled together.",
+)
+@click.option("--factor", type=float, help="Size of the output over the input.")
+@click.option("--rows", type=int, help="Number of rows of the output.")
+@click.option(
+    "-d",
+    "--data_format",
+    type=click.Choice(list(FORMATS)),
+    default="csv",
+    help="File format of the synthetic data sets.",
+)
+@click.option("--chunksize", type=int, default=100_000, help="Rows per chunk.")
+@click.option("-j", "--jobs", type=int, help="Processes (all cores by default).")
+@click.option("--seed", type=int, default=0)
+def main(
+    input_dir, output_dir, names, factor, rows, data_format, chunksize, jobs, seed
+):
+    """Writes a larger synthetic copy of the data sets of INPUT_DIR, with
+    the same columns, dtypes, marginals and correlations.
+    """
+    if (factor is None) == (rows is None):
+        raise click.UsageError("Give one of --factor and --rows.")
+    if output_dir is None:
+        data_dir = os.path.dirname(os.path.abspath(input_dir))
+        output_dir = os.path.join(data_dir, "upscaled")
+    try:
+        upscale(
+            input_dir,
+            output_dir,
+            names,
+            rows,
+            factor,
+            data_format,
+            chunksize,
+            jobs,
+            seed,
+        )
+    except (FileNotFoundError, ValueError) as e:
+        raise click.ClickException(str(e))
+
+
+if __name__ == "__main__":
+    log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Copies the zoo modules that the projects share into every project:
+
+    zoo/frames.py   src/data/formats.py     every project
+    zoo/export.py   src/models/export.py    the projects that export models
+
+The projects are installed and run on their own, so they cannot import the
+zoo; each gets a copy instead, marked as generated. Edit the zoo module and
+run this again rather than editing a copy.
+
+    python -m zoo.vendor
+    python -m zoo.vendor --check
+"""
+import logging
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import click
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# source: (copy in a project, projects that get it, or None for all)
+VENDORED: Dict[str, Tuple[str, Optional[List[str]]]] = {
+    os.path.join("zoo", "frames.py"): (os.path.join("src", "data", "formats.py"), None),
+    os.path.join("zoo", "export.py"): (
+        os.path.join("src", "models", "export.py"),
+        [
+            "credit-bias",
+            "credit-card-approval",
+            "minimal-numerical",
+            "mobile-price",
+            "real-estate-price",
+        ],
+    ),
+}
+HEADER = "# Generated from {source} by `python -m zoo.vendor`, do not edit.\n"
+
+
+def vendored(source: str) -> str:
+    """The content of every copy of `source`: the source with the header
+    after its coding line.
+    """
+    with open(os.path.join(ROOT, source)) as f:
+        coding, rest = f.read().split("\n", 1)
+    header = HEADER.format(source=source.replace(os.sep, "/"))
+    return f"{coding}\n{header}{rest}"
+
+
+def copies(source: str) -> Dict[str, str]:
+    """Project names and the paths of their copies of `source`."""
+    target, projects = VENDORED[source]
+    if projects is None:
+        projects = [
+            name
+            for name in sorted(os.listdir(ROOT))
+            if os.path.isdir(os.path.join(ROOT, name, os.path.dirname(target)))
+        ]
+    return {name: os.path.join(ROOT, name, target) for name in projects}
+
+
+def stale(source: str, content: str) -> Dict[str, str]:
+    """The copies of `source` that differ from `content`."""
+    found = {}
+    for name, path in copies(source).items():
+        current = None
+        if os.path.exists(path):
+            with open(path) as f:
+                current = f.read()
+        if current != content:
+            found[name] = path
+    return found
+
+
+@click.command()
+@click.option(
+    "--check", is_flag=True, help="Only report the copies that are out of date."
+)
+def main(check):
+    """Writes (or checks) the shared modules of every project."""
+    failed = False
+    for source in VENDORED:
+        content = vendored(source)
+        outdated = stale(source, content)
+        total = len(copies(source))
+        if check:
+            for name, path in outdated.items():
+                logger.error(f"{os.path.relpath(path, ROOT)} differs from {source}")
+            if outdated:
+                failed = True
+            else:
+                logger.info(f"{total} copies match {source}")
+            continue
+        for path in outdated.values():
+            with open(path, "w") as f:
+                f.write(content)
+            logger.info(f"Wrote {os.path.relpath(path, ROOT)}")
+        logger.info(f"{len(outdated)} of {total} copies of {source} updated")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    log_fmt = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()